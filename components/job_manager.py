@@ -0,0 +1,123 @@
+import contextlib
+import threading
+import uuid
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Estados de un trabajo
+PENDIENTE = "pendiente"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+CANCELADO = "cancelado"
+ERROR = "error"
+ESTADOS_FINALES = {COMPLETADO, CANCELADO, ERROR}
+
+
+class SolveJob:
+    """Trabajo de optimización en segundo plano"""
+
+    def __init__(self, descripcion: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.descripcion = descripcion
+        self.estado = PENDIENTE
+        self.avance: Optional[Dict] = None      # último aviso del solver
+        self.resultado = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.creado = datetime.now()
+        self.terminado: Optional[datetime] = None
+        self.future = None
+
+    def report(self, info: Dict):
+        """Callback de avance para los backends (progress_callback)"""
+        self.avance = info
+
+    @property
+    def finalizado(self) -> bool:
+        return self.estado in ESTADOS_FINALES
+
+
+class JobManager:
+    """
+    Ejecuta resoluciones en un pool de hilos, fuera del hilo del script de
+    Streamlit. Las páginas guardan el id del trabajo en session_state y
+    consultan su estado en cada rerun; cancelar activa el `cancel_event` que
+    los backends revisan (CPLEX aborta la búsqueda en el siguiente aviso).
+
+    Las funciones que se envían no deben llamar a `st.*`: corren en otro hilo.
+    Los trabajos de un mismo `grupo` (p. ej. la planta) corren uno tras otro:
+    comparten el modelo persistente y el solution.json de la planta.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="solve")
+        self.jobs: Dict[str, SolveJob] = {}
+        self._lock = threading.Lock()
+        self._grupos: Dict[str, threading.Lock] = {}
+
+    def _grupo_lock(self, grupo: Optional[str]):
+        if grupo is None:
+            return contextlib.nullcontext()
+        with self._lock:
+            return self._grupos.setdefault(grupo, threading.Lock())
+
+    def submit(self, fn: Callable, descripcion: str = "", grupo: Optional[str] = None,
+               **kwargs) -> str:
+        """
+        Encola `fn(progress_callback=..., cancel_event=..., **kwargs)` y
+        devuelve el id del trabajo. Si otro trabajo del mismo `grupo` está
+        corriendo, éste queda pendiente hasta que termine.
+        """
+        job = SolveJob(descripcion)
+        candado = self._grupo_lock(grupo)
+
+        def ejecutar():
+            with candado:
+                if job.cancel_event.is_set():
+                    job.estado = CANCELADO
+                    job.terminado = datetime.now()
+                    return
+                job.estado = EJECUTANDO
+                try:
+                    job.resultado = fn(progress_callback=job.report,
+                                       cancel_event=job.cancel_event, **kwargs)
+                    job.estado = CANCELADO if job.cancel_event.is_set() else COMPLETADO
+                except Exception as e:
+                    job.error = str(e)
+                    job.estado = ERROR
+                finally:
+                    job.terminado = datetime.now()
+
+        with self._lock:
+            self.jobs[job.id] = job
+        job.future = self.executor.submit(ejecutar)
+        return job.id
+
+    def get(self, job_id: Optional[str]) -> Optional[SolveJob]:
+        if job_id is None:
+            return None
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Pide cancelar el trabajo; devuelve False si ya había terminado"""
+        job = self.get(job_id)
+        if job is None or job.finalizado:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def forget(self, job_id: str):
+        """Elimina un trabajo terminado del registro"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.finalizado:
+                del self.jobs[job_id]
+
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Un único JobManager por servidor, compartido entre sesiones"""
+    return JobManager()
@@ -7,7 +7,10 @@ from datetime import datetime
 
 # Importar el módulo del modelo existente
 sys.path.append(str(Path(__file__).parent.parent / "scripts"))
-from scripts.model import Processing, build_model
+from scripts.model import Processing, load_plan, presolve_instance, presolve_summary
+from scripts.feasibility import capacity_check, capacity_summary
+from scripts.solvers import get_backend, default_backend, greedy_result, DEFAULT_TIMELIMIT, DEFAULT_MIPGAP
+from components.job_manager import get_job_manager
 
 class ModelRunner:
     """Clase para ejecutar el modelo de optimización"""
@@ -17,7 +20,12 @@ class ModelRunner:
         self.model = None
         self.solution = None
 
-    def initialize_from_dataframes(self, dataframes: Dict[str, pd.DataFrame]) -> bool:
+    def initialize_from_dataframes(
+        self,
+        dataframes: Dict[str, pd.DataFrame],
+        df_demanda: Optional[pd.DataFrame] = None,
+        planta: Optional[str] = None
+    ) -> bool:
         """Inicializa el Processing desde los DataFrames cargados"""
         try:
             # Mapear nombres de hojas a nombres esperados
@@ -33,12 +41,18 @@ class ModelRunner:
                 st.error("Faltan algunos DataFrames necesarios")
                 return False
 
+            if df_demanda is None or planta is None:
+                st.error("Faltan la demanda y/o la planta a optimizar")
+                return False
+
             self.processing = Processing(
                 df_turnos=df_turnos,
                 df_disponibilidad_maquinas=df_disponibilidad,
                 df_setup=df_setup,
                 df_duracion_turno_dia=df_duracion,
-                df_productividad_maquina_caja=df_productividad
+                df_productividad_maquina_caja=df_productividad,
+                df_demanda=df_demanda,
+                planta=planta
             )
 
             return True
@@ -60,7 +74,7 @@ class ModelRunner:
             Tturn_dt = self.processing.process_turn_duration()
             Prod, Tipo, M, B = self.processing.process_productividad_y_tipo()
 
-            D = sorted(T_turnos.keys())
+            D = self.processing.getDays()
             S_segmentos = [1, 2]
 
             params = {
@@ -86,62 +100,86 @@ class ModelRunner:
         self,
         params: Dict,
         Dem: Dict,
-        Tturn: float = 8.0,
+        Tturn=None,
         enforce_tipo: bool = True,
         Tseg: Optional[float] = None,
         restrict_w_by_tipo: bool = True,
-        time_limit: int = 60,
-        mip_gap: float = 0.01
+        time_limit: int = DEFAULT_TIMELIMIT,
+        mip_gap: float = DEFAULT_MIPGAP,
+        backend: Optional[str] = None,
+        mip_start=None,
+        pool_size: int = 1
     ) -> Tuple[bool, Optional[Dict]]:
-        """Construye y resuelve el modelo de optimización"""
+        """
+        Construye y resuelve el modelo de optimización.
+
+        `backend` elige el motor ('highs' en proceso o 'cplex' local, ver
+        scripts/solvers.py; por defecto CPLEX si está instalado, que es el
+        único que reporta avance durante la búsqueda). `Tturn` puede ser None (usa Tturn_dt de los
+        parámetros), un número de horas por turno o un dict {(d,t): horas}.
+        `mip_start` es un plan previo (ruta a un solution.json o dict
+        {'x','y','T'}) que se usa como arranque en caliente (sólo 'cplex').
+        Con `pool_size`=K > 1 (sólo 'cplex') la misma resolución junta hasta
+        K-1 planes alternativos con asignaciones distintas: quedan en
+        results['alternativas'], cada uno con la estructura de results.
+        """
 
         try:
-            with st.spinner("🔨 Construyendo modelo..."):
-                mdl, x, y, Tsetup = build_model(
-                    M=params['M'],
-                    B=params['B'],
-                    D=params['D'],
-                    T_turnos=params['T_turnos'],
-                    S_segmentos=params['S_segmentos'],
-                    Disp=params['Disp'],
-                    Prod=params['Prod'],
-                    Tipo=params['Tipo'],
-                    Setup=params['Setup'],
-                    Dem=Dem,
-                    Tturn=Tturn,
-                    enforce_tipo=enforce_tipo,
-                    Tseg=Tseg,
-                    restrict_w_by_tipo=restrict_w_by_tipo
-                )
+            model_params = self._model_params(params, Dem, Tturn, enforce_tipo=enforce_tipo)
+
+            # Chequeo de capacidad: si la demanda no cabe, ni construimos el modelo
+            capacidad = capacity_check(**model_params, enforce_tipo=enforce_tipo, Tseg=Tseg)
+            if not capacidad['factible']:
+                self.show_capacity(capacidad)
+                return False, None
 
-                # Configurar parámetros del solver
-                mdl.parameters.timelimit = time_limit
-                mdl.parameters.mip.tolerances.mipgap = mip_gap
+            solver = get_backend(backend or default_backend())
+            if isinstance(mip_start, (str, Path)):
+                mip_start = load_plan(mip_start)
+
+            # Plan greedy inmediato: el solver lo usa como MIP start y respaldo
+            heuristica = greedy_result(model_params, enforce_tipo=enforce_tipo, Tseg=Tseg,
+                                       restrict_w_by_tipo=restrict_w_by_tipo)
+            if heuristica.has_solution:
+                st.info(f"⚡ Plan heurístico: {heuristica.objective:.2f} h de setup "
+                        f"({1000 * heuristica.solve_time:.0f} ms). Optimizando...")
 
             with st.spinner("⚙️ Resolviendo modelo..."):
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
-                # Simular progreso (CPLEX no proporciona callbacks fáciles en Streamlit)
-                import time
-                for i in range(100):
-                    time.sleep(time_limit / 100)
-                    progress_bar.progress(i + 1)
-                    status_text.text(f"Optimizando... {i + 1}%")
+                # Avance real del solver: la barra sigue el tiempo consumido
+                # sobre el límite y el texto muestra incumbente, cota, gap y nodos
+                def on_progress(info):
+                    progress_bar.progress(min(int(100 * info['tiempo'] / max(time_limit, 1e-9)), 100))
+                    status_text.text(self.format_progress(info))
 
-                sol = mdl.solve(log_output=False)
+                result = solver.solve(
+                    model_params,
+                    timelimit=time_limit,
+                    mipgap=mip_gap,
+                    enforce_tipo=enforce_tipo,
+                    Tseg=Tseg,
+                    restrict_w_by_tipo=restrict_w_by_tipo,
+                    mip_start=mip_start,
+                    progress_callback=on_progress,
+                    pool_size=pool_size
+                )
 
                 progress_bar.empty()
                 status_text.empty()
 
-            if sol is None:
+            if not result.has_solution:
                 st.error("❌ Modelo infactible. Revisa las restricciones.")
                 return False, None
 
             # Extraer resultados
-            results = self._extract_solution(mdl, x, y, Tsetup, params, Dem)
+            results = self._extract_solution(result, params, Dem)
+            results['alternativas'] = [self._extract_solution(alt, params, Dem)
+                                       for alt in result.alternatives]
             results['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+            self.model = result
             self.solution = results
 
             return True, results
@@ -152,28 +190,136 @@ class ModelRunner:
             st.error(traceback.format_exc())
             return False, None
 
-    def _extract_solution(self, mdl, x, y, Tsetup, params, Dem) -> Dict:
-        """Extrae la solución del modelo en un formato estructurado"""
+    def submit(
+        self,
+        params: Dict,
+        Dem: Dict,
+        Tturn=None,
+        enforce_tipo: bool = True,
+        Tseg: Optional[float] = None,
+        restrict_w_by_tipo: bool = True,
+        time_limit: int = DEFAULT_TIMELIMIT,
+        mip_gap: float = DEFAULT_MIPGAP,
+        backend: Optional[str] = None,
+        mip_start=None,
+        pool_size: int = 1
+    ) -> str:
+        """
+        Igual que build_and_solve, pero en segundo plano: devuelve el id del
+        trabajo en el JobManager (components/job_manager.py). Al terminar,
+        `job.resultado` tiene el mismo dict que build_and_solve (o None si
+        no hubo solución). Lanza ValueError si la demanda excede la capacidad
+        (scripts/feasibility.py), sin encolar nada.
+        """
+        model_params = self._model_params(params, Dem, Tturn, enforce_tipo=enforce_tipo)
+        capacidad = capacity_check(**model_params, enforce_tipo=enforce_tipo, Tseg=Tseg)
+        if not capacidad['factible']:
+            raise ValueError(capacity_summary(capacidad))
+        if isinstance(mip_start, (str, Path)):
+            mip_start = load_plan(mip_start)
+        backend = backend or default_backend()
+
+        def trabajo(progress_callback=None, cancel_event=None):
+            result = get_backend(backend).solve(
+                model_params,
+                timelimit=time_limit,
+                mipgap=mip_gap,
+                enforce_tipo=enforce_tipo,
+                Tseg=Tseg,
+                restrict_w_by_tipo=restrict_w_by_tipo,
+                mip_start=mip_start,
+                progress_callback=progress_callback,
+                cancel_event=cancel_event,
+                pool_size=pool_size
+            )
+            if not result.has_solution:
+                return None
+            results = self._extract_solution(result, params, Dem)
+            results['alternativas'] = [self._extract_solution(alt, params, Dem)
+                                       for alt in result.alternatives]
+            results['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            return results
+
+        return get_job_manager().submit(trabajo, descripcion=f"ModelRunner · {backend}")
+
+    @staticmethod
+    def format_progress(info: Dict) -> str:
+        """Texto de avance del solver (ver scripts/solvers.SolverProgressListener)"""
+        def num(valor, fmt):
+            return "—" if valor is None else format(valor, fmt)
+
+        return (f"Optimizando... {info['tiempo']:.1f} s | "
+                f"incumbente: {num(info['incumbente'], '.2f')} | "
+                f"cota: {num(info['cota'], '.2f')} | "
+                f"gap: {num(None if info['gap'] is None else 100 * info['gap'], '.2f')} % | "
+                f"nodos: {num(info['nodos'], 'd')}")
+
+    @staticmethod
+    def show_capacity(capacidad: Dict):
+        """Muestra en la página las celdas (día, caja) y días que no alcanzan"""
+        st.error(f"❌ La demanda excede la capacidad ({capacidad['tiempo_ms']:.0f} ms de chequeo): "
+                 f"{len(capacidad['celdas'])} celdas (día, caja) y "
+                 f"{len(capacidad['dias'])} días sin horas suficientes.")
+        if capacidad['celdas']:
+            st.dataframe(pd.DataFrame(capacidad['celdas']), use_container_width=True, hide_index=True)
+        if capacidad['dias']:
+            st.dataframe(pd.DataFrame(capacidad['dias']), use_container_width=True, hide_index=True)
+
+    @staticmethod
+    def _model_params(params: Dict, Dem: Dict, Tturn=None, presolve: bool = True,
+                      enforce_tipo: bool = True) -> Dict:
+        """
+        Arma los argumentos de build_model a partir de extract_parameters(),
+        podados con presolve_instance si presolve=True (mismo óptimo)
+        """
+        if Tturn is None:
+            Tturn = params['Tturn_dt']
+        elif isinstance(Tturn, (int, float)):
+            Tturn = {(d, t): float(Tturn) for d in params['D'] for t in params['T_turnos'].get(d, [])}
+
+        model_params = {
+            'M': params['M'],
+            'B': params['B'],
+            'D': params['D'],
+            'T_turnos': params['T_turnos'],
+            'S_segmentos': params['S_segmentos'],
+            'Disp': params['Disp'],
+            'Prod': params['Prod'],
+            'Tipo': params['Tipo'],
+            'Setup': params['Setup'],
+            'Dem': Dem,
+            'Tturn': Tturn
+        }
+        if presolve:
+            model_params, reporte = presolve_instance(**model_params, enforce_tipo=enforce_tipo)
+            print(presolve_summary(reporte))
+        return model_params
+
+    def _extract_solution(self, result, params, Dem) -> Dict:
+        """Extrae la solución (SolveResult) en un formato estructurado"""
 
         from itertools import product
 
         M = params['M']
         B = params['B']
         D = params['D']
-        T_turnos = params['T_turnos']
-        S_segmentos = params['S_segmentos']
         Prod = params['Prod']
 
+        x = result.values['x']
+        y = result.values['y']
+        Tsetup = result.values['T']
+
         # Información general
-        obj_value = mdl.objective_value
-        total_prod_h = sum(v.solution_value for v in y.values())
-        total_setup_h = sum(v.solution_value for v in Tsetup.values())
+        obj_value = result.objective
+        total_prod_h = sum(y.values())
+        total_setup_h = sum(Tsetup.values())
 
-        # Asignaciones activas (x = 1)
+        # Asignaciones activas (x = 1). Los diccionarios de variables son
+        # dispersos: sólo contienen combinaciones compatibles y con demanda.
         asignaciones = []
-        for m, b, d, t, s in product(M, B, D, T_turnos, S_segmentos):
-            if x[(m, b, d, t, s)].solution_value > 0.5:  # Binario
-                horas = y[(m, b, d, t, s)].solution_value
+        for (m, b, d, t, s), valor in x.items():
+            if valor > 0.5:  # Binario
+                horas = y[(m, b, d, t, s)]
                 cajas = horas * Prod.get((m, b), 0)
 
                 asignaciones.append({
@@ -188,8 +334,7 @@ class ModelRunner:
 
         # Setup por turno
         setups = []
-        for m, d, t in product(M, D, T_turnos):
-            setup_time = Tsetup[(m, d, t)].solution_value
+        for (m, d, t), setup_time in Tsetup.items():
             if setup_time > 0.01:
                 setups.append({
                     'Maquina': m,
@@ -198,14 +343,21 @@ class ModelRunner:
                     'TiempoSetup': round(setup_time, 2)
                 })
 
+        # Agregados de producción por (d,b) y horas por (m,d)
+        producido_db = {}
+        horas_md = {}
+        for (m, b, d, t, s), horas in y.items():
+            producido_db[(d, b)] = producido_db.get((d, b), 0.0) + horas * Prod.get((m, b), 0)
+            horas_md[(m, d)] = horas_md.get((m, d), 0.0) + horas
+        setup_md = {}
+        for (m, d, t), horas in Tsetup.items():
+            setup_md[(m, d)] = setup_md.get((m, d), 0.0) + horas
+
         # Verificar demanda
         demanda_cumplida = []
         for b, d in product(B, D):
-            producido = sum(
-                y[(m, b, d, t, s)].solution_value * Prod.get((m, b), 0)
-                for m in M for t in T_turnos for s in S_segmentos
-            )
-            demandado = Dem.get((b, d), 0)
+            producido = producido_db.get((d, b), 0.0)
+            demandado = Dem.get((d, b), 0)
 
             demanda_cumplida.append({
                 'TipoCaja': b,
@@ -219,14 +371,8 @@ class ModelRunner:
         # Utilización de máquinas
         utilizacion = []
         for m, d in product(M, D):
-            total_horas = sum(
-                y[(m, b, d, t, s)].solution_value
-                for b in B for t in T_turnos for s in S_segmentos
-            )
-            setup_horas = sum(
-                Tsetup[(m, d, t)].solution_value
-                for t in T_turnos
-            )
+            total_horas = horas_md.get((m, d), 0.0)
+            setup_horas = setup_md.get((m, d), 0.0)
 
             utilizacion.append({
                 'Maquina': m,
@@ -244,7 +390,15 @@ class ModelRunner:
             'setups': setups,
             'demanda': demanda_cumplida,
             'utilizacion': utilizacion,
-            'parametros': params
+            'parametros': params,
+            'solver': {
+                'backend': result.backend,
+                'estado': result.status_string,
+                'gap': result.gap,
+                'tiempo_resolucion_s': round(result.solve_time, 3),
+                'tiempo_primera_solucion_s': result.first_incumbent_time,
+                'variables_mip_start': result.mip_start_vars
+            }
         }
 
         return results
@@ -271,4 +425,21 @@ class ModelRunner:
         - Items procesados: {len(results['demanda'])}
         """
 
+        solver = results.get('solver')
+        if solver:
+            summary += f"""
+        **Solver ({solver['backend']}):**
+        - Tiempo de resolución: {solver['tiempo_resolucion_s']} s
+        - Primera solución entera: {solver['tiempo_primera_solucion_s']} s
+        - Gap final: {solver['gap']}
+        - Variables x desde el plan anterior: {solver['variables_mip_start']}
+        """
+
+        alternativas = results.get('alternativas')
+        if alternativas:
+            objetivos = ", ".join(f"{alt['objetivo']} h" for alt in alternativas)
+            summary += f"""
+        **Planes alternativos ({len(alternativas)}):** {objetivos}
+        """
+
         return summary
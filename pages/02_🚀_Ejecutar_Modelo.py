@@ -4,7 +4,11 @@ import streamlit as st
 import pandas as pd
 import subprocess
 import sys
-from run_model import run
+import time
+from run_model import run, run_local, run_batch, run_heuristic, read_inputs, build_params, check_capacity
+from components.model_runner import ModelRunner
+from components.job_manager import get_job_manager, COMPLETADO, CANCELADO
+from scripts.solvers import cplex_available
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 from styles.common_styles import configure_page
@@ -13,6 +17,14 @@ from utils import show_logo
 # Configurar página
 configure_page("Ejecutar Modelo", "🚀", "wide")
 
+
+def run_watson(planta, mip_start_path=None, progress_callback=None, cancel_event=None):
+    """
+    Adapta `run` a la firma de los trabajos (Watson ML no reporta avance).
+    Devuelve el `SolveResult` del job (estado, objetivo, gap y tiempo).
+    """
+    return run(planta, mip_start_path=mip_start_path, cancel_event=cancel_event)
+
 # Sidebar
 with st.sidebar:
     show_logo()
@@ -163,42 +175,171 @@ if plantas_disponibles:
 
     st.subheader("2️⃣ Ejecutar Optimización")
 
+    # El primer motor es el local por defecto: CPLEX si está instalado
+    MOTORES = {}
+    if cplex_available():
+        MOTORES["Local (CPLEX)"] = "cplex"
+    MOTORES["Local (HiGHS)"] = "highs"
+    MOTORES["Watson ML (CPLEX)"] = "watson"
+    motor = st.radio(
+        "Motor de resolución:",
+        list(MOTORES),
+        horizontal=True,
+        key="motor_selector",
+        help="Local resuelve en este servidor sin subir nada a la nube (CPLEX informa "
+             "incumbente, cota, gap y nodos mientras resuelve); Watson ML empaqueta el "
+             "modelo y lo ejecuta con CPLEX en IBM Cloud"
+    )
+    if MOTORES[motor] == "highs":
+        st.caption("ℹ️ HiGHS no informa avance mientras resuelve: incumbente, cota, gap y "
+                   "nodos se muestran sólo al terminar.")
+    elif MOTORES[motor] == "watson":
+        st.caption("ℹ️ Watson ML no informa avance del solver: sólo el estado del job.")
+
+    # Arranque en caliente: sólo con CPLEX (local, o en Watson ML vía el
+    # mip_start.json del paquete) y si el último solution.json es de esta planta
+    plan_previo_ok = (MOTORES[motor] in ("cplex", "watson")
+                      and Path("solution.json").exists()
+                      and st.session_state.get('ultima_planta') == planta_seleccionada)
+    usar_plan_previo = st.checkbox(
+        "Partir del plan anterior (MIP start)",
+        value=plan_previo_ok,
+        disabled=not plan_previo_ok,
+        help="Usa el último solution.json de esta planta como solución inicial. "
+             "Sólo con los motores CPLEX; HiGHS no admite MIP start y resuelve siempre en frío."
+    )
+
+    # La resolución corre en segundo plano (components/job_manager.py): el id
+    # del trabajo queda en session_state y la página consulta su estado.
+    jobs = get_job_manager()
+    job = jobs.get(st.session_state.get('job_id'))
+    en_curso = job is not None and not job.finalizado
+
     col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
 
     with col_btn2:
-        if st.button("▶️ Ejecutar Modelo de Optimización", type="primary", use_container_width=True):
+        if st.button("▶️ Ejecutar Modelo de Optimización", type="primary",
+                     use_container_width=True, disabled=en_curso):
             planta = st.session_state['planta_seleccionada']
+            mip_start_path = "solution.json" if usar_plan_previo else None
+
+            # Parámetros de la planta para el chequeo de capacidad y la
+            # heurística; si fallan, el trabajo reporta el error
+            try:
+                params = build_params(*read_inputs(), planta)
+                capacidad = check_capacity(planta, params=params)
+            except Exception:
+                params, capacidad = None, None
+
+            if capacidad is not None and not capacidad['factible']:
+                # La demanda no cabe: se muestran las celdas y no se envía nada
+                ModelRunner.show_capacity(capacidad)
+            else:
+                # Plan greedy instantáneo (scripts/heuristic.py) para mostrar
+                # mientras corre el solver; no bloquea la ejecución si falla
+                try:
+                    heuristica = run_heuristic(planta, params=params)
+                    st.session_state['job_heuristica'] = {
+                        'objetivo': heuristica.objective,
+                        'estado': heuristica.status_string,
+                        'tiempo_ms': 1000 * heuristica.solve_time,
+                    }
+                except Exception:
+                    st.session_state['job_heuristica'] = None
+
+                # Ejecutar run_model.py (local o Watson ML)
+                if MOTORES[motor] == "watson":
+                    job_id = jobs.submit(run_watson, descripcion=f"Watson ML · {planta}",
+                                         grupo=planta, planta=planta, mip_start_path=mip_start_path)
+                else:
+                    job_id = jobs.submit(run_local, descripcion=f"{motor} · {planta}",
+                                         grupo=planta, planta=planta, backend=MOTORES[motor],
+                                         mip_start_path=mip_start_path)
+                st.session_state['job_id'] = job_id
+                st.session_state['job_planta'] = planta
+                st.session_state['job_lote'] = False
+                st.rerun()
+
+        # Lote: todas las plantas de la hoja Planta en paralelo, cada una en outputs/batch/<planta>
+        if st.button("🏭 Ejecutar todas las plantas", use_container_width=True, disabled=en_curso,
+                     help="Optimiza todas las plantas en paralelo; los resultados quedan en outputs/batch/<planta>"):
+            job_id = jobs.submit(run_batch, descripcion=f"Lote · {motor}", engine=MOTORES[motor])
+            st.session_state['job_id'] = job_id
+            st.session_state['job_planta'] = "todas las plantas"
+            st.session_state['job_lote'] = True
+            st.session_state['job_heuristica'] = None
+            st.rerun()
+
+    # Estado del trabajo en segundo plano
+    if job is not None:
+        planta_job = st.session_state.get('job_planta', 'N/A')
+        es_lote = st.session_state.get('job_lote', False)
+
+        heuristica = st.session_state.get('job_heuristica')
+        if heuristica is not None:
+            if heuristica['objetivo'] is not None:
+                st.info(f"⚡ Plan inmediato (heurística): **{heuristica['objetivo']:.2f} h** de setup, "
+                        f"calculado en {heuristica['tiempo_ms']:.0f} ms. El solver parte de este plan "
+                        f"y lo usa como respaldo si no encuentra solución a tiempo.")
+            else:
+                st.info(f"⚡ La heurística no cubrió toda la demanda ({heuristica['estado']}).")
+
+        if not job.finalizado:
+            st.info(f"🔄 Optimizando planta **{planta_job}** ({job.descripcion}, trabajo `{job.id}`: {job.estado})")
+            if job.avance and es_lote:
+                st.progress(job.avance['plantas_listas'] / job.avance['plantas'])
+                st.text(f"Plantas terminadas: {job.avance['plantas_listas']} de {job.avance['plantas']}")
+            elif job.avance:
+                st.text(ModelRunner.format_progress(job.avance))
+            if job.cancel_event.is_set():
+                st.warning("⏹️ Cancelación solicitada, esperando al solver...")
+            elif st.button("⏹️ Cancelar", key="cancelar_job"):
+                jobs.cancel(job.id)
+                st.rerun()
+
+            # Sondeo: vuelve a ejecutar la página en 1 s sin bloquear el servidor
+            time.sleep(1)
+            st.rerun()
+
+        elif job.estado == COMPLETADO and es_lote:
+            # Mapa planta -> resultado de run_batch
+            st.success(f"✅ Lote terminado: {len(job.resultado)} plantas")
+            st.dataframe(pd.DataFrame.from_dict(job.resultado, orient="index"), use_container_width=True)
+
+        elif job.estado == COMPLETADO:
+            result = job.resultado
+            primera_vez = st.session_state.get('job_adjunto') != job.id
+            if primera_vez:
+                # Adjuntar el resultado a la sesión una sola vez
+                st.session_state['job_adjunto'] = job.id
+                st.session_state['ultima_ejecucion'] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+                st.session_state['modelo_ejecutado'] = True
+                st.session_state['ultima_planta'] = planta_job
+
+            if result is not None:
+                col_r1, col_r2, col_r3 = st.columns(3)
+                col_r1.metric("Resolución", f"{result.solve_time:.1f} s")
+                if result.first_incumbent_time is not None:
+                    col_r2.metric("Primera solución", f"{result.first_incumbent_time:.1f} s")
+                if result.gap is not None:
+                    col_r3.metric("Gap final", f"{100 * result.gap:.2f} %")
+
+            # Verificar archivos de salida
+            if Path("solution.json").exists():
+                st.success("✅ solution.json generado")
+
+            if Path("log.txt").exists():
+                st.success("✅ log.txt generado")
+
+            if primera_vez:
+                st.balloons()
+            st.info("👉 Ve a la página **Resultados** para ver el análisis detallado")
+
+        elif job.estado == CANCELADO:
+            st.warning(f"⏹️ Optimización de **{planta_job}** cancelada")
 
-            st.info(f"🔄 Iniciando optimización para planta: **{planta}**")
-
-            # Contenedor de progreso
-            progress_container = st.container()
-
-            with progress_container:
-                with st.spinner("Procesando datos y ejecutando modelo..."):
-                    try:
-                        # Ejecutar run_model.py
-                        result = run(planta)
-
-                        # Verificar resultado
-
-                            # Guardar en session state
-                        st.session_state['ultima_ejecucion'] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
-                        st.session_state['modelo_ejecutado'] = True
-                        st.session_state['ultima_planta'] = planta
-
-                            # Verificar archivos de salida
-                        if Path("solution.json").exists():
-                            st.success("✅ solution.json generado")
-
-                        if Path("log.txt").exists():
-                            st.success("✅ log.txt generado")
-
-                        st.balloons()
-                        st.info("👉 Ve a la página **Resultados** para ver el análisis detallado")
-
-                    except Exception as e:
-                        st.error(f"❌ Error inesperado: {str(e)}")
+        else:
+            st.error(f"❌ Error inesperado: {job.error}")
 
     # Información del proceso
     with st.expander("ℹ️ ¿Qué hace el modelo?", expanded=False):
@@ -224,6 +365,10 @@ if plantas_disponibles:
            - `solution.json`: Solución óptima
            - `log.txt`: Registro de ejecución
 
+        Con los motores **Local (CPLEX)** y **Local (HiGHS)** los pasos 2 y 3 se
+        reemplazan por una resolución en este mismo servidor; el `solution.json`
+        tiene el mismo formato.
+
         **Tiempo estimado:** 2-5 minutos
         """)
 
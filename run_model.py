@@ -1,222 +1,580 @@
-import tarfile
-from ibm_watson_machine_learning import APIClient
-import time
-import time, json, base64
-
-def run(planta):
-    import pandas as pd
-    from pathlib import Path
-    EXCEL_PATH = Path("inputs/Parametros.xlsx")   # ajusta si lo tienes en otra ruta
-    OUT_DIR = Path("inputs/csv")                  # generaremos aquí los CSV
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Mapea: nombre de hoja -> nombre de archivo CSV
-    SHEETS = {
-        "Turnos": "Turnos.csv",
-        "Disponibilidad Maquinas": "Disponibilidad_Maquinas.csv",
-        "Productividad Máquina_Caja": "Productividad_Maquina_Caja.csv",
-        "Tiempo de Setup por máquina": "Tiempo_de_Setup_por_maquina.csv",
-        "Duracion Turno": "Duracion_Turno.csv",
-    }
-
-    # Lee y exporta cada hoja a CSV (UTF-8 con BOM para Excel-friendly)
-    for sheet, csv_name in SHEETS.items():
-        print(f"Convirtiendo hoja '{sheet}' -> {csv_name}")
-        df = pd.read_excel(EXCEL_PATH, sheet_name=sheet, dtype=str)
-        # Limpieza opcional: normaliza espacios y NaN
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        df.to_csv(OUT_DIR / csv_name, index=False, encoding="utf-8-sig")
-    print("Listo. CSVs en:", OUT_DIR.resolve())
-    import pandas as pd
-    from pathlib import Path
-
-    EXCEL_PATH = Path("inputs/Parametros.xlsx")   # ajusta si lo tienes en otra ruta
-    OUT_DIR = Path("inputs/csv")                  # generaremos aquí los CSV
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    demanda = pd.read_excel("inputs/Libro7.xlsx")
-    demanda.to_csv("inputs/csv/demanda.csv")
-    # Mapea: nombre de hoja -> nombre de archivo CSV
-    SHEETS = {
-        "Turnos": "Turnos.csv",
-        "Disponibilidad Maquinas": "Disponibilidad_Maquinas.csv",
-        "Productividad Máquina_Caja": "Productividad_Maquina_Caja.csv",
-        "Tiempo de Setup por máquina": "Tiempo_de_Setup_por_maquina.csv",
-        "Duracion Turno": "Duracion_Turno.csv",
-    }
-
-    # Lee y exporta cada hoja a CSV (UTF-8 con BOM para Excel-friendly)
-    for sheet, csv_name in SHEETS.items():
-        print(f"Convirtiendo hoja '{sheet}' -> {csv_name}")
-        df = pd.read_excel(EXCEL_PATH, sheet_name=sheet, dtype=str)
-        # Limpieza opcional: normaliza espacios y NaN
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        df.to_csv(OUT_DIR / csv_name, index=False, encoding="utf-8-sig")
-    print("Listo. CSVs en:", OUT_DIR.resolve())
-    WML_API_KEY = "kI0O5Y3O037SXJ3_1wiDBKFABLKAIrEaAsicdjI0Hu0t"
-    SPACE_ID = "5b4f04fa-0a13-4793-8922-e0228341aa72"
-    WML_URL = "https://us-south.ml.cloud.ibm.com"
-    # empaquetado_tar.py (o integra estos fragmentos en tu script actual)
-    import os, tarfile
-    from pathlib import Path
-
-    MODEL_TAR = "modelo.tar.gz"
-
-    def reset(tarinfo):
-        tarinfo.uid = tarinfo.gid = 0
-        tarinfo.uname = tarinfo.gname = "root"
-        return tarinfo
-    df_planta = pd.DataFrame({'PLANTA': [planta]})
-    df_planta.to_csv("inputs/csv/planta.csv")
-    # Archivos a incluir en la RAÍZ del tar
-    FILES_TO_ADD = [
-        ("./scripts/model.py", "model.py"),
-        ("./inputs/csv/Turnos.csv", "Turnos.csv"),
-        ("./inputs/csv/Disponibilidad_Maquinas.csv", "Disponibilidad_Maquinas.csv"),
-        ("./inputs/csv/Productividad_Maquina_Caja.csv", "Productividad_Maquina_Caja.csv"),
-        ("./inputs/csv/Tiempo_de_Setup_por_maquina.csv", "Tiempo_de_Setup_por_maquina.csv"),
-        ("./inputs/csv/Duracion_Turno.csv", "Duracion_Turno.csv"),
-        ("./inputs/csv/demanda.csv", "demanda.csv"),
-        ("./inputs/csv/planta.csv", "planta.csv")
-    ]
-
-    if os.path.exists(MODEL_TAR):
-        os.remove(MODEL_TAR)
-
-    with tarfile.open(MODEL_TAR, "w:gz") as tar:
-        for src, arc in FILES_TO_ADD:
-            if not Path(src).exists():
-                raise FileNotFoundError(f"Falta el archivo: {src}")
-            tar.add(src, arcname=arc, filter=reset)
-
-    # (opcional) Verifica contenido del tar
-    with tarfile.open(MODEL_TAR, "r:gz") as t:
-        print("[TAR] Contenido:", t.getnames())
-
-    MODEL_NAME = "modelo-cajas"
-    DEPLOYMENT_NAME = "Modelo Transportistas Deployment"
-
-    # ---------------- Utils ----------------
-    def b64_to_file(b64_content, path):
-        with open(path, "wb") as f:
-            f.write(base64.b64decode(b64_content))
-
-    def print_if_exists(path, max_chars=2000):
-        if os.path.exists(path):
-            print("\n===== {} =====".format(path))
-            with open(path, "r", errors="ignore") as f:
-                text = f.read()
-            print(text[:max_chars] + ("\n...[truncado]..." if len(text) > max_chars else ""))
-
-    # ---------------- Cliente WML ----------------
-    client = APIClient({"apikey": WML_API_KEY, "url": WML_URL})
-    client.set.default_space(SPACE_ID)
-
-    # -------- Software spec y subida de modelo --------
-    spec_id = client.software_specifications.get_id_by_name("do_20.1")
-    meta = {
-        client.repository.ModelMetaNames.NAME: MODEL_NAME,
-        client.repository.ModelMetaNames.TYPE: "do-docplex_20.1",
-        client.repository.ModelMetaNames.SOFTWARE_SPEC_UID: spec_id,
-    }
-    model_details = client.repository.store_model(model=MODEL_TAR, meta_props=meta)
-    model_uid = client.repository.get_model_id(model_details)
-    print("Modelo subido. UID:", model_uid)
-
-    # -------- Despliegue --------
-    deploy_props = {
-        client.deployments.ConfigurationMetaNames.NAME: DEPLOYMENT_NAME,
-        client.deployments.ConfigurationMetaNames.DESCRIPTION: "Modelo de DO",
-        client.deployments.ConfigurationMetaNames.BATCH: {},
-        client.deployments.ConfigurationMetaNames.HARDWARE_SPEC: {"name": "S", "num_nodes": 1},
-    }
-    deployment_details = client.deployments.create(model_uid, meta_props=deploy_props)
-    deployment_uid = client.deployments.get_id(deployment_details)
-    print("Despliegue creado. UID:", deployment_uid)
-
-    # -------- Payload con LOG como output + JSON results --------
-    solve_payload = {
-        "solve_parameters": {
-            "oaas.logAttachmentName": "log.txt",     # nombre del log
-            "oaas.logTailEnabled": "true",
-            "oaas.resultsFormat": "JSON"             # JSON facilita parsear solution.json
-        },
-        client.deployments.DecisionOptimizationMetaNames.INPUT_DATA: [
-            # Si tu model.py espera archivos, puedes omitir aquí si los empaquetaste en el tar.
-            # Si prefieres inyectar: {"id":"Parametros.xlsx","values": base64.b64encode(open("inputs/Parametros.xlsx","rb").read()).decode()}
-        ],
-        client.deployments.DecisionOptimizationMetaNames.OUTPUT_DATA: [
-            {"id": "solution.json"},     # solución
-            {"id": "log.txt"},           # <--- forzamos que el log se publique como output
-            {"id": ".*\\.txt"},          # cualquier otro log de texto
-            {"id": ".*"}                 # y cualquier otro adjunto por si acaso
-        ]
-    }
-
-    # -------- Crear job --------
-    job_details = client.deployments.create_job(deployment_uid, solve_payload)
-    job_uid = client.deployments.get_job_uid(job_details)
-    print("Job UID:", job_uid)
-
-    # -------- Polling --------
-    terminal_states = {"completed", "failed", "canceled", "error", "unknown"}
-    while True:
-        state = job_details["entity"]["decision_optimization"]["status"]["state"]
-        print(state + "...")
-        if state in terminal_states:
-            break
-        time.sleep(5)
-        job_details = client.deployments.get_job_details(job_uid)
-
-    # -------- Estado del solver --------
-    solve_state = job_details["entity"]["decision_optimization"].get("solve_state", {})
-    solve_status = solve_state.get("solve_status", "n/a")
-    print("Estado del trabajo (solve_status):", solve_status)
-
-    # -------- Descargar outputs (incluye log.txt si existe) --------
-    outputs = job_details["entity"]["decision_optimization"].get("output_data", [])
-    saved = []
-    for outp in outputs:
-        out_id = outp.get("id")
-        content_b64 = outp.get("content")
-        if content_b64:
-            # Normalmente 'content' viene en base64 cuando el archivo es "pequeño/inline"
-            local_name = out_id if out_id else "output.bin"
-            # Evita path traversal
-            local_name = os.path.basename(local_name)
-            try:
-                b64_to_file(content_b64, local_name)
-                saved.append(local_name)
-            except Exception as e:
-                print(f"No pude guardar {local_name}: {e}")
-
-    # -------- A veces los logs aparecen en 'attachments' --------
-    attachments = job_details["entity"]["decision_optimization"].get("attachments", [])
-    for att in attachments:
-        # Cuando el cliente los devuelve inline, suele venir 'content' base64;
-        # si solo viene un 'href', el SDK los descarga automáticamente en output_data,
-        # pero intentamos capturarlo por si está inline aquí.
-        att_id = att.get("id", "attachment")
-        if "content" in att:
-            local_name = os.path.basename(att_id)
-            try:
-                b64_to_file(att["content"], local_name)
-                saved.append(local_name)
-            except Exception as e:
-                print(f"No pude guardar adjunto {local_name}: {e}")
-
-    if saved:
-        print("Archivos de salida guardados:", saved)
-
-    # -------- Mostrar log si está --------
-    for candidate in ["log.txt", "job.log", "solve.log"]:
-        if os.path.exists(candidate):
-            print_if_exists(candidate, max_chars=4000)
-
-    # -------- Guardar solution.json si existiera --------
-    if os.path.exists("solution.json"):
-        try:
-            with open("solution.json", "r") as f:
-                sol = json.load(f)
-            print("\nsolution.json cargado correctamente.")
-        except Exception as e:
-            print("solution.json no es JSON válido (o resultados estaban en XML).", e)
\ No newline at end of file
+import tarfile
+import time
+import time, json, base64
+import io
+
+# Hojas de Parametros.xlsx -> CSV que lee model.py en Watson ML
+SHEETS = {
+    "Turnos": "Turnos.csv",
+    "Disponibilidad Maquinas": "Disponibilidad_Maquinas.csv",
+    "Productividad Máquina_Caja": "Productividad_Maquina_Caja.csv",
+    "Tiempo de Setup por máquina": "Tiempo_de_Setup_por_maquina.csv",
+    "Duracion Turno": "Duracion_Turno.csv",
+}
+
+# Hojas de Parametros.xlsx -> argumento de Processing
+SHEET_ARGS = {
+    "Turnos": "df_turnos",
+    "Disponibilidad Maquinas": "df_disponibilidad_maquinas",
+    "Productividad Máquina_Caja": "df_productividad_maquina_caja",
+    "Tiempo de Setup por máquina": "df_setup",
+    "Duracion Turno": "df_duracion_turno_dia",
+}
+
+
+def read_inputs(excel_path="inputs/Parametros.xlsx", demanda_path="inputs/Libro7.xlsx"):
+    """
+    Lee una sola vez las hojas de parámetros (como texto y sin espacios, igual
+    que los CSV de Watson ML) y la demanda. Devuelve (tablas, demanda) con
+    tablas = {hoja: DataFrame}, incluida la hoja "Planta".
+    """
+    import pandas as pd
+
+    tablas = {}
+    for sheet in ["Planta"] + list(SHEETS):
+        df = pd.read_excel(excel_path, sheet_name=sheet, dtype=str)
+        # Limpieza opcional: normaliza espacios y NaN
+        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+        tablas[sheet] = df
+    demanda = pd.read_excel(demanda_path)
+    return tablas, demanda
+
+
+def partition_by_plant(tablas, demanda, plantas):
+    """
+    Parte cada tabla de parámetros (columna PLANTA) y la demanda (DES_PLANTA)
+    por planta, con un solo groupby por tabla.
+    Devuelve {planta: (tablas_planta, demanda_planta)}.
+    """
+    grupos = {sheet: dict(tuple(tablas[sheet].groupby("PLANTA"))) for sheet in SHEETS}
+    demanda_por_planta = dict(tuple(demanda.groupby("DES_PLANTA")))
+    partes = {}
+    for planta in plantas:
+        tablas_planta = {sheet: grupos[sheet].get(planta, tablas[sheet].iloc[0:0]) for sheet in SHEETS}
+        partes[planta] = (tablas_planta, demanda_por_planta.get(planta, demanda.iloc[0:0]))
+    return partes
+
+
+def export_csvs(tablas, demanda, planta, out_dir):
+    """Escribe los CSV que empaqueta `run` (hojas, demanda y planta) en out_dir."""
+    import pandas as pd
+    from pathlib import Path
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Exporta cada hoja a CSV (UTF-8 con BOM para Excel-friendly)
+    for sheet, csv_name in SHEETS.items():
+        print(f"Convirtiendo hoja '{sheet}' -> {csv_name}")
+        tablas[sheet].to_csv(out_dir / csv_name, index=False, encoding="utf-8-sig")
+    demanda.to_csv(out_dir / "demanda.csv")
+    pd.DataFrame({'PLANTA': [planta]}).to_csv(out_dir / "planta.csv")
+    print("Listo. CSVs en:", out_dir.resolve())
+
+
+def build_params(tablas, demanda, planta, presolve=True):
+    """
+    Arma con `Processing` los parámetros de build_model para una planta.
+    Con presolve=True se podan antes con `presolve_instance` (mismo óptimo).
+    """
+    import pandas as pd
+    from scripts.model import Processing, presolve_instance, presolve_summary
+
+    # Igual que en Watson ML: las hojas pasan por CSV (todo texto, sin espacios)
+    args = {arg: pd.read_csv(io.StringIO(tablas[sheet].to_csv(index=False)))
+            for sheet, arg in SHEET_ARGS.items()}
+    proc = Processing(df_demanda=demanda, planta=planta, **args)
+    T_turnos = proc.process_turnos()
+    Prod, Tipo, M, B = proc.process_productividad_y_tipo()
+    params = {
+        'M': M, 'B': B, 'D': proc.getDays(),
+        'T_turnos': T_turnos, 'S_segmentos': [1, 2],
+        'Disp': proc.process_disponibilidad_maquinas(),
+        'Prod': Prod, 'Tipo': Tipo,
+        'Setup': proc.process_tiempo_setup(),
+        'Dem': proc.process_demanda(),
+        'Tturn': proc.process_turn_duration(),
+    }
+    if presolve:
+        params, reporte = presolve_instance(**params)
+        print(presolve_summary(reporte))
+    return params
+
+
+def check_capacity(planta, tablas=None, demanda=None, params=None):
+    """
+    Chequeo rápido de capacidad de la planta (scripts/feasibility.py), en
+    milisegundos y antes de construir o subir el modelo. Retorna el reporte de
+    `capacity_check` ('factible', 'celdas', 'dias', 'tiempo_ms').
+    """
+    from scripts.feasibility import capacity_check, capacity_summary
+
+    if params is None:
+        if tablas is None:
+            tablas, demanda = read_inputs()
+        params = build_params(tablas, demanda, planta)
+    reporte = capacity_check(**params, enforce_tipo=True)
+    print(capacity_summary(reporte))
+    return reporte
+
+
+def _require_capacity(planta, reporte):
+    """Corta la corrida si la demanda no cabe en la capacidad de la planta."""
+    if not reporte['factible']:
+        raise ValueError(f"La demanda de {planta} excede la capacidad: "
+                         f"{len(reporte['celdas'])} celdas (día, caja) y "
+                         f"{len(reporte['dias'])} días sin horas suficientes.")
+
+
+# solve_status de Decision Optimization -> estado de SolveResult
+WATSON_STATUS = {
+    "optimal_solution": "optimal",
+    "feasible_solution": "feasible",
+    "infeasible_solution": "infeasible",
+    "infeasible_or_unbounded_solution": "infeasible",
+}
+
+
+def _watson_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _watson_result(job_details, solution_path, elapsed):
+    """
+    Resume un job terminado de Watson ML como `SolveResult`: estado (de
+    solve_status), objetivo y gap (del header de solution.json o de los KPIs
+    de avance), tiempo de resolución (running_at -> completed_at; si no
+    vienen, `elapsed`) y el plan de solution.json si se descargó.
+    """
+    from datetime import datetime
+    from pathlib import Path
+    from scripts.model import load_plan
+    from scripts.solvers import SolveResult
+
+    do = job_details["entity"]["decision_optimization"]
+    estado_job = do["status"]["state"]
+    solve_state = do.get("solve_state", {})
+    solve_status = solve_state.get("solve_status", "n/a")
+    kpis = solve_state.get("details", {})
+
+    header, values = {}, None
+    if Path(solution_path).exists():
+        try:
+            with open(solution_path, "r") as f:
+                header = json.load(f).get("CPLEXSolution", {}).get("header", {})
+            values = load_plan(solution_path)
+        except ValueError:
+            pass      # resultados en otro formato: sólo queda el resumen del job
+
+    objetivo = _watson_float(header.get("objectiveValue"))
+    if objetivo is None:
+        objetivo = _watson_float(kpis.get("PROGRESS_CURRENT_OBJECTIVE"))
+    gap = _watson_float(kpis.get("PROGRESS_GAP"))
+    if gap is None:
+        gap = _watson_float(header.get("mipRelativeGap"))
+
+    solve_time = elapsed
+    try:
+        inicio, fin = (datetime.fromisoformat(do["status"][k].replace("Z", "+00:00"))
+                       for k in ("running_at", "completed_at"))
+        solve_time = (fin - inicio).total_seconds()
+    except (KeyError, AttributeError, ValueError):
+        pass
+
+    status = WATSON_STATUS.get(solve_status, "no_solution")
+    if status in ("optimal", "feasible") and values is None:
+        status = "no_solution"
+    texto = f"Watson ML: {estado_job} ({solve_status})"
+    errores = do["status"].get("failure", {}).get("errors", [])
+    if errores:
+        texto += ": " + "; ".join(str(e.get("message", e)) for e in errores)
+    return SolveResult(status, objective=objetivo if values is not None else None,
+                       values=values, gap=gap, solve_time=solve_time, backend="watson",
+                       status_string=texto)
+
+
+def run(planta, mip_start_path=None, cancel_event=None, workdir=None, tablas=None, demanda=None):
+    """
+    Empaqueta el modelo con los datos de la planta y lo resuelve en Watson ML.
+
+    Sin `workdir` se usan inputs/csv, modelo.tar.gz y los archivos de salida
+    en el directorio actual; con `workdir` todo queda dentro de esa carpeta,
+    para que varias plantas corran en paralelo sin pisarse. `tablas` y
+    `demanda` (ver read_inputs / partition_by_plant) evitan releer el Excel.
+
+    Retorna un `SolveResult` (backend "watson") con el estado, objetivo, gap y
+    tiempo de resolución del job y el plan de solution.json (ver
+    `_watson_result`); si se cancela, uno con estado 'cancelled'.
+    """
+    from ibm_watson_machine_learning import APIClient
+    from pathlib import Path
+
+    base = Path(workdir) if workdir is not None else Path(".")
+    base.mkdir(parents=True, exist_ok=True)
+    OUT_DIR = base / "csv" if workdir is not None else Path("inputs/csv")  # generaremos aquí los CSV
+    if tablas is None:
+        tablas, demanda = read_inputs()
+    # Chequeo de capacidad local: no subimos un modelo que ya sabemos infactible
+    _require_capacity(planta, check_capacity(planta, tablas, demanda))
+    export_csvs(tablas, demanda, planta, OUT_DIR)
+    SPACE_ID = "5b4f04fa-0a13-4793-8922-e0228341aa72"
+    WML_URL = "https://us-south.ml.cloud.ibm.com"
+    # empaquetado_tar.py (o integra estos fragmentos en tu script actual)
+    import os, tarfile
+    from pathlib import Path
+
+    # La API key no va en el código: se lee del entorno
+    WML_API_KEY = os.environ.get("WML_API_KEY")
+    if not WML_API_KEY:
+        raise RuntimeError("Falta la API key de Watson ML: define la variable de entorno WML_API_KEY.")
+
+    MODEL_TAR = str(base / "modelo.tar.gz")
+
+    def reset(tarinfo):
+        tarinfo.uid = tarinfo.gid = 0
+        tarinfo.uname = tarinfo.gname = "root"
+        return tarinfo
+    # Archivos a incluir en la RAÍZ del tar
+    FILES_TO_ADD = [("./scripts/model.py", "model.py")]
+    for csv_name in list(SHEETS.values()) + ["demanda.csv", "planta.csv"]:
+        FILES_TO_ADD.append((str(OUT_DIR / csv_name), csv_name))
+    # Plan anterior como arranque en caliente (model.py lo lee si existe)
+    if mip_start_path is not None and Path(mip_start_path).exists():
+        FILES_TO_ADD.append((str(mip_start_path), "mip_start.json"))
+
+    if os.path.exists(MODEL_TAR):
+        os.remove(MODEL_TAR)
+
+    with tarfile.open(MODEL_TAR, "w:gz") as tar:
+        for src, arc in FILES_TO_ADD:
+            if not Path(src).exists():
+                raise FileNotFoundError(f"Falta el archivo: {src}")
+            tar.add(src, arcname=arc, filter=reset)
+
+    # (opcional) Verifica contenido del tar
+    with tarfile.open(MODEL_TAR, "r:gz") as t:
+        print("[TAR] Contenido:", t.getnames())
+
+    MODEL_NAME = "modelo-cajas"
+    DEPLOYMENT_NAME = "Modelo Transportistas Deployment"
+
+    # ---------------- Utils ----------------
+    def b64_to_file(b64_content, path):
+        with open(path, "wb") as f:
+            f.write(base64.b64decode(b64_content))
+
+    def print_if_exists(path, max_chars=2000):
+        if os.path.exists(path):
+            print("\n===== {} =====".format(path))
+            with open(path, "r", errors="ignore") as f:
+                text = f.read()
+            print(text[:max_chars] + ("\n...[truncado]..." if len(text) > max_chars else ""))
+
+    # ---------------- Cliente WML ----------------
+    client = APIClient({"apikey": WML_API_KEY, "url": WML_URL})
+    client.set.default_space(SPACE_ID)
+
+    # -------- Software spec y subida de modelo --------
+    spec_id = client.software_specifications.get_id_by_name("do_20.1")
+    meta = {
+        client.repository.ModelMetaNames.NAME: MODEL_NAME,
+        client.repository.ModelMetaNames.TYPE: "do-docplex_20.1",
+        client.repository.ModelMetaNames.SOFTWARE_SPEC_UID: spec_id,
+    }
+    model_details = client.repository.store_model(model=MODEL_TAR, meta_props=meta)
+    model_uid = client.repository.get_model_id(model_details)
+    print("Modelo subido. UID:", model_uid)
+
+    # -------- Despliegue --------
+    deploy_props = {
+        client.deployments.ConfigurationMetaNames.NAME: DEPLOYMENT_NAME,
+        client.deployments.ConfigurationMetaNames.DESCRIPTION: "Modelo de DO",
+        client.deployments.ConfigurationMetaNames.BATCH: {},
+        client.deployments.ConfigurationMetaNames.HARDWARE_SPEC: {"name": "S", "num_nodes": 1},
+    }
+    deployment_details = client.deployments.create(model_uid, meta_props=deploy_props)
+    deployment_uid = client.deployments.get_id(deployment_details)
+    print("Despliegue creado. UID:", deployment_uid)
+
+    # -------- Payload con LOG como output + JSON results --------
+    solve_payload = {
+        "solve_parameters": {
+            "oaas.logAttachmentName": "log.txt",     # nombre del log
+            "oaas.logTailEnabled": "true",
+            "oaas.resultsFormat": "JSON"             # JSON facilita parsear solution.json
+        },
+        client.deployments.DecisionOptimizationMetaNames.INPUT_DATA: [
+            # Si tu model.py espera archivos, puedes omitir aquí si los empaquetaste en el tar.
+            # Si prefieres inyectar: {"id":"Parametros.xlsx","values": base64.b64encode(open("inputs/Parametros.xlsx","rb").read()).decode()}
+        ],
+        client.deployments.DecisionOptimizationMetaNames.OUTPUT_DATA: [
+            {"id": "solution.json"},     # solución
+            {"id": "log.txt"},           # <--- forzamos que el log se publique como output
+            {"id": ".*\\.txt"},          # cualquier otro log de texto
+            {"id": ".*"}                 # y cualquier otro adjunto por si acaso
+        ]
+    }
+
+    # -------- Crear job --------
+    t_job = time.perf_counter()
+    job_details = client.deployments.create_job(deployment_uid, solve_payload)
+    job_uid = client.deployments.get_job_uid(job_details)
+    print("Job UID:", job_uid)
+
+    # -------- Polling --------
+    terminal_states = {"completed", "failed", "canceled", "error", "unknown"}
+    while True:
+        state = job_details["entity"]["decision_optimization"]["status"]["state"]
+        print(state + "...")
+        if state in terminal_states:
+            break
+        if cancel_event is not None and cancel_event.is_set():
+            # Cancelación pedida desde la app: se cancela el job en Watson ML
+            client.deployments.delete_job(job_uid)
+            print("Job cancelado:", job_uid)
+            from scripts.solvers import SolveResult
+            return SolveResult('cancelled', solve_time=time.perf_counter() - t_job,
+                               backend="watson", status_string="Watson ML: job cancelado")
+        time.sleep(5)
+        job_details = client.deployments.get_job_details(job_uid)
+
+    # -------- Estado del solver --------
+    solve_state = job_details["entity"]["decision_optimization"].get("solve_state", {})
+    solve_status = solve_state.get("solve_status", "n/a")
+    print("Estado del trabajo (solve_status):", solve_status)
+
+    # -------- Descargar outputs (incluye log.txt si existe) --------
+    outputs = job_details["entity"]["decision_optimization"].get("output_data", [])
+    saved = []
+    for outp in outputs:
+        out_id = outp.get("id")
+        content_b64 = outp.get("content")
+        if content_b64:
+            # Normalmente 'content' viene en base64 cuando el archivo es "pequeño/inline"
+            local_name = out_id if out_id else "output.bin"
+            # Evita path traversal
+            local_name = str(base / os.path.basename(local_name))
+            try:
+                b64_to_file(content_b64, local_name)
+                saved.append(local_name)
+            except Exception as e:
+                print(f"No pude guardar {local_name}: {e}")
+
+    # -------- A veces los logs aparecen en 'attachments' --------
+    attachments = job_details["entity"]["decision_optimization"].get("attachments", [])
+    for att in attachments:
+        # Cuando el cliente los devuelve inline, suele venir 'content' base64;
+        # si solo viene un 'href', el SDK los descarga automáticamente en output_data,
+        # pero intentamos capturarlo por si está inline aquí.
+        att_id = att.get("id", "attachment")
+        if "content" in att:
+            local_name = str(base / os.path.basename(att_id))
+            try:
+                b64_to_file(att["content"], local_name)
+                saved.append(local_name)
+            except Exception as e:
+                print(f"No pude guardar adjunto {local_name}: {e}")
+
+    if saved:
+        print("Archivos de salida guardados:", saved)
+
+    # -------- Mostrar log si está --------
+    for candidate in ["log.txt", "job.log", "solve.log"]:
+        if os.path.exists(base / candidate):
+            print_if_exists(str(base / candidate), max_chars=4000)
+
+    # -------- Guardar solution.json si existiera --------
+    if os.path.exists(base / "solution.json"):
+        try:
+            with open(base / "solution.json", "r") as f:
+                sol = json.load(f)
+            print("\nsolution.json cargado correctamente.")
+        except Exception as e:
+            print("solution.json no es JSON válido (o resultados estaban en XML).", e)
+
+    # -------- Resumen del job como SolveResult --------
+    result = _watson_result(job_details, base / "solution.json", time.perf_counter() - t_job)
+    print(f"[watson] estado: {result.status_string} | objetivo: {result.objective} | "
+          f"gap: {result.gap} | resolución: {result.solve_time:.2f}s")
+    return result
+
+
+def run_local(planta, backend=None, timelimit=60, mipgap=0.01, solution_path="solution.json",
+              persistent=True, mip_start_path=None, progress_callback=None,
+              cancel_event=None, tablas=None, demanda=None):
+    """
+    Resuelve el modelo en el proceso actual, sin Watson ML.
+
+    Lee los mismos insumos que `run` (inputs/Parametros.xlsx e inputs/Libro7.xlsx,
+    o `tablas`/`demanda` ya leídas), arma los parámetros con `Processing`,
+    resuelve con el backend indicado ('highs' o 'cplex', ver scripts/solvers.py;
+    por defecto `default_backend()`: CPLEX si está instalado)
+    y escribe `solution.json` con la misma estructura que devuelve Watson ML, de
+    modo que la página de Resultados no cambia.
+
+    Con persistent=True el modelo de la planta queda en memoria y, si sólo
+    cambian los valores de la demanda, la siguiente corrida actualiza R1 en
+    sitio y parte de la solución anterior (ver scripts/persistent.py).
+    `mip_start_path` apunta a un solution.json previo que se usa como
+    arranque en caliente (sólo con backend 'cplex'). `progress_callback(info)`
+    recibe el avance del solver (ver scripts/solvers.SolverProgressListener) y
+    `cancel_event` (threading.Event) permite cancelarlo; una corrida cancelada
+    no sobrescribe solution.json. Si la demanda excede la capacidad
+    (check_capacity) se lanza ValueError antes de construir el modelo.
+    """
+    from pathlib import Path
+    from scripts.model import load_plan
+    from scripts.persistent import solve_what_if
+    from scripts.solvers import default_backend, get_backend
+
+    if backend is None:
+        backend = default_backend()
+    if tablas is None:
+        tablas, demanda = read_inputs()
+    params = build_params(tablas, demanda, planta)
+    _require_capacity(planta, check_capacity(planta, params=params))
+
+    mip_start = None
+    if mip_start_path is not None and Path(mip_start_path).exists():
+        mip_start = load_plan(mip_start_path)
+
+    build_kwargs = dict(enforce_tipo=True, Tseg=None, restrict_w_by_tipo=True)
+    if persistent:
+        result = solve_what_if(planta, params, backend=backend, timelimit=timelimit,
+                               mipgap=mipgap, mip_start=mip_start,
+                               progress_callback=progress_callback,
+                               cancel_event=cancel_event, **build_kwargs)
+    else:
+        result = get_backend(backend).solve(params, timelimit=timelimit, mipgap=mipgap,
+                                            mip_start=mip_start,
+                                            progress_callback=progress_callback,
+                                            cancel_event=cancel_event, **build_kwargs)
+    print(f"[{backend}] estado: {result.status_string} | objetivo: {result.objective} | "
+          f"construcción: {result.build_time:.2f}s | resolución: {result.solve_time:.2f}s")
+    print(f"[{backend}] primera solución entera: {result.first_incumbent_time} s | "
+          f"gap final: {result.gap} | x desde el plan anterior: {result.mip_start_vars}")
+    if result.status != 'cancelled':
+        result.write_solution_json(solution_path)
+    return result
+
+
+def run_heuristic(planta, tablas=None, demanda=None, params=None):
+    """
+    Plan greedy instantáneo de la planta (scripts/heuristic.py), para mostrarlo
+    mientras corre el solver. Devuelve un `SolveResult` (backend "greedy").
+    `params` (ver build_params) evita rearmar los parámetros.
+    """
+    from scripts.solvers import greedy_result
+
+    if params is None:
+        if tablas is None:
+            tablas, demanda = read_inputs()
+        params = build_params(tablas, demanda, planta)
+    return greedy_result(params, enforce_tipo=True, Tseg=None, restrict_w_by_tipo=True)
+
+
+def _run_plant_local(args):
+    """Worker de run_batch: resuelve una planta en su carpeta y resume el resultado."""
+    planta, tablas, demanda, workdir, backend, timelimit, mipgap = args
+    from pathlib import Path
+
+    t0 = time.perf_counter()
+    solution_path = Path(workdir) / "solution.json"
+    result = run_local(planta, backend=backend, timelimit=timelimit, mipgap=mipgap,
+                       solution_path=str(solution_path), persistent=False,
+                       tablas=tablas, demanda=demanda)
+    return {
+        'estado': result.status,
+        'objetivo': result.objective,
+        'gap': result.gap,
+        'tiempo_s': round(time.perf_counter() - t0, 2),
+        'solution_path': str(solution_path) if solution_path.exists() else None,
+    }
+
+
+def _run_plant_watson(planta, tablas, demanda, workdir, cancel_event=None):
+    """Worker de run_batch para Watson ML (sólo espera E/S: corre en un hilo)."""
+    from pathlib import Path
+
+    t0 = time.perf_counter()
+    result = run(planta, cancel_event=cancel_event, workdir=workdir, tablas=tablas, demanda=demanda)
+    solution_path = Path(workdir) / "solution.json"
+    return {
+        'estado': result.status,
+        'objetivo': result.objective,
+        'gap': result.gap,
+        'tiempo_s': round(time.perf_counter() - t0, 2),
+        'solution_path': str(solution_path) if solution_path.exists() else None,
+    }
+
+
+def run_batch(plantas=None, engine="highs", workdir="outputs/batch", max_workers=None,
+              timelimit=60, mipgap=0.01, progress_callback=None, cancel_event=None):
+    """
+    Optimiza varias plantas a la vez (por defecto, todas las de la hoja Planta).
+
+    Lee el Excel una sola vez, parte todas las tablas y la demanda por planta
+    (partition_by_plant) y corre el pipeline de cada planta en paralelo, cada
+    una en su propia carpeta `workdir/<planta>` (CSV, tar, logs y
+    solution.json). Con engine="watson" cada planta es un job de Watson ML
+    (hilos: sólo esperan); con un backend local ('highs' o 'cplex') cada planta
+    se resuelve en su propio proceso.
+
+    `progress_callback` recibe {'plantas_listas', 'plantas'} cada vez que
+    termina una planta; `cancel_event` cancela las plantas aún no iniciadas (y
+    los jobs de Watson ML en curso).
+
+    Retorna {planta: {'estado', 'objetivo', 'gap', 'tiempo_s', 'solution_path',
+    'error'}}.
+    """
+    import multiprocessing
+    import os
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    from pathlib import Path
+
+    tablas, demanda = read_inputs()
+    if plantas is None:
+        plantas = tablas["Planta"]["PLANTA"].dropna().tolist()
+    partes = partition_by_plant(tablas, demanda, plantas)
+
+    workdirs = {}
+    for planta in plantas:
+        workdirs[planta] = Path(workdir) / str(planta)
+        workdirs[planta].mkdir(parents=True, exist_ok=True)
+
+    if max_workers is None:
+        max_workers = len(plantas) if engine == "watson" else min(len(plantas), os.cpu_count() or 1)
+    max_workers = max(max_workers, 1)
+
+    resultados = {}
+    if engine == "watson":
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {executor.submit(_run_plant_watson, planta, *partes[planta],
+                                   str(workdirs[planta]), cancel_event): planta
+                   for planta in plantas}
+    else:
+        # spawn: run_batch suele lanzarse desde un hilo de la app (JobManager)
+        executor = ProcessPoolExecutor(max_workers=max_workers,
+                                       mp_context=multiprocessing.get_context("spawn"))
+        futures = {executor.submit(_run_plant_local, (planta, *partes[planta], str(workdirs[planta]),
+                                                      engine, timelimit, mipgap)): planta
+                   for planta in plantas}
+
+    with executor:
+        for future in as_completed(futures):
+            planta = futures[future]
+            if cancel_event is not None and cancel_event.is_set():
+                for pendiente in futures:
+                    pendiente.cancel()
+            try:
+                resultados[planta] = dict(future.result(), error=None)
+            except Exception as e:
+                resultados[planta] = {'estado': 'error', 'objetivo': None, 'gap': None,
+                                      'tiempo_s': None, 'solution_path': None, 'error': str(e)}
+            if progress_callback is not None:
+                progress_callback({'plantas_listas': len(resultados), 'plantas': len(plantas)})
+
+    return resultados
+
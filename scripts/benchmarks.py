@@ -0,0 +1,487 @@
+"""
+Benchmarks de construcción/resolución del modelo de cajas sobre instancias
+sintéticas (ver `scripts/synthetic.py`).
+
+Uso:
+    python -m scripts.benchmarks r6
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+from scripts.model import build_model
+from scripts.synthetic import synthetic_params
+
+
+def bench_r6(n_cajas_list=(4, 8, 12, 16, 24, 32), n_maquinas=8, n_dias=3,
+             n_turnos=2, densidad_compat=0.8, seed=0):
+    """
+    Mide el costo de la fase R6 (setup con w) al crecer |B|.
+
+    Con las claves de w agrupadas por (m,d,t) el costo de R6 debe crecer en
+    forma lineal con el número de variables w: la columna `us_por_w` se
+    mantiene aproximadamente constante.
+    """
+    rows = []
+    for n_cajas in n_cajas_list:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  n_turnos=n_turnos, densidad_compat=densidad_compat,
+                                  sparsity=0.0, seed=seed)
+        timings = {}
+        t0 = time.perf_counter()
+        mdl, x, y, Tsetup, _ = build_model(**params, timings=timings)
+        total = time.perf_counter() - t0
+
+        n_w = mdl.number_of_variables - len(x) - len(y) - len(Tsetup)
+        rows.append({
+            'n_cajas': n_cajas,
+            'n_w': n_w,
+            'filas': mdl.number_of_constraints,
+            'R6_s': round(timings.get('R6', 0.0), 4),
+            'build_s': round(total, 4),
+            'us_por_w': round(1e6 * timings.get('R6', 0.0) / max(n_w, 1), 2),
+        })
+    return pd.DataFrame(rows)
+
+
+def bench_ir(sizes=((10, 10, 5), (20, 20, 7), (40, 30, 10)), seed=0):
+    """
+    Compara `build_model` contra la IR matricial (`build_ir`) y su carga en
+    bloque a docplex (`to_docplex`) para instancias (máquinas, cajas, días).
+    """
+    from scripts.matrix_ir import build_ir, to_docplex
+
+    rows = []
+    for n_maquinas, n_cajas, n_dias in sizes:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, sparsity=0.0, seed=seed)
+        t0 = time.perf_counter()
+        mdl, *_ = build_model(**params)
+        t_bm = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ir = build_ir(**params)
+        t_ir = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        to_docplex(ir)
+        t_load = time.perf_counter() - t0
+
+        rows.append({
+            'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}",
+            'columnas': ir.shape[1],
+            'filas_ir': ir.shape[0],
+            'filas_docplex': mdl.number_of_constraints,
+            'build_model_s': round(t_bm, 3),
+            'build_ir_s': round(t_ir, 3),
+            'to_docplex_s': round(t_load, 3),
+        })
+    return pd.DataFrame(rows)
+
+
+def bench_fast(sizes=((10, 10, 5), (20, 20, 7), (30, 25, 10)), seed=0):
+    """
+    Compara la construcción de depuración (checker + nombres) contra
+    `build_model(..., fast=True)`: tiempo total y memoria pico (tracemalloc,
+    vía `build_model(..., timings=..., memory=True)`).
+    """
+    rows = []
+    for n_maquinas, n_cajas, n_dias in sizes:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, sparsity=0.0, seed=seed)
+        fila = {'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}"}
+        for modo, fast in (('debug', False), ('fast', True)):
+            t0 = time.perf_counter()
+            mdl, *_ = build_model(**params, fast=fast)
+            fila[f'{modo}_s'] = round(time.perf_counter() - t0, 3)
+            del mdl
+
+            timings = {}
+            mdl, *_ = build_model(**params, fast=fast, timings=timings, memory=True)
+            fila[f'{modo}_MB'] = round(timings['memoria_pico_MB'], 1)
+            fila['filas'] = mdl.number_of_constraints
+            del mdl
+        rows.append(fila)
+    return pd.DataFrame(rows)
+
+
+def bench_what_if(n_maquinas=10, n_cajas=10, n_dias=5, n_escenarios=5,
+                  backend="highs", seed=0):
+    """
+    Escenarios what-if de demanda: reconstruir y resolver cada vez contra el
+    modelo persistente (`scripts/persistent.py`), que sólo actualiza R1.
+    """
+    import numpy as np
+    from scripts.persistent import PersistentModel
+    from scripts.solvers import get_backend
+
+    params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                              densidad_compat=0.8, seed=seed)
+    rng = np.random.default_rng(seed)
+    persistente = PersistentModel(params, backend=backend)
+    rows = []
+    for k in range(n_escenarios):
+        escenario = dict(params)
+        escenario['Dem'] = {key: (v * rng.uniform(0.8, 1.2) if v > 0 else 0.0)
+                            for key, v in params['Dem'].items()}
+        t0 = time.perf_counter()
+        r_frio = get_backend(backend).solve(escenario)
+        t_frio = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        persistente.update_demand(escenario['Dem'])
+        r_pers = persistente.solve()
+        t_pers = time.perf_counter() - t0
+
+        rows.append({
+            'escenario': k,
+            'obj_rebuild': r_frio.objective,
+            'obj_persistente': r_pers.objective,
+            'rebuild_s': round(t_frio, 3),
+            'persistente_s': round(t_pers, 3),
+        })
+    return pd.DataFrame(rows)
+
+
+def bench_symmetry(n_maquinas_list=(20, 24), n_clases=4, n_cajas=12, n_dias=1,
+                   backend="highs", timelimit=60, seed=0):
+    """
+    Plantas con muchas máquinas iguales (`n_clases` perfiles) y carga alta:
+    resolución con y sin ruptura de simetría (R7). Con el óptimo probado los
+    objetivos deben coincidir. HiGHS y CPLEX detectan simetrías por su cuenta,
+    así que R7 no siempre acelera: conviene medirlo en cada planta.
+    """
+    from scripts.model import machine_classes
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_maquinas in n_maquinas_list:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=1.0, n_clases=n_clases, carga=0.9,
+                                  sparsity=0.0, seed=seed)
+        clases = machine_classes(params['M'], params['B'], params['D'], params['Prod'],
+                                 params['Tipo'], params['Setup'], params['Disp'])
+        fila = {'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}",
+                'n_clases': sum(len(c) for c in clases.values())}
+        for modo, sb in (('base', False), ('sym', True)):
+            t0 = time.perf_counter()
+            r = get_backend(backend).solve(params, timelimit=timelimit, mipgap=0.0,
+                                           symmetry_breaking=sb)
+            fila[f'obj_{modo}'] = r.objective
+            fila[f'status_{modo}'] = r.status
+            fila[f'{modo}_s'] = round(time.perf_counter() - t0, 2)
+        rows.append(fila)
+    return pd.DataFrame(rows)
+
+
+def bench_pools(n_maquinas_list=(12, 24, 48), n_clases=3, n_cajas=8, n_dias=2,
+                timelimit=60, seed=0):
+    """
+    Formulación por pools de máquinas idénticas (`scripts/pools.py`) contra
+    la IR por máquina, ambas con HiGHS: tamaño, tiempo y objetivo.
+    """
+    from scripts.matrix_ir import build_ir
+    from scripts.pools import build_pool_ir, solve_pools
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_maquinas in n_maquinas_list:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=1.0, n_clases=n_clases, carga=0.95,
+                                  sparsity=0.0, seed=seed)
+        r_base = get_backend("highs").solve(params, timelimit=timelimit, mipgap=0.0)
+        r_pool = solve_pools(params, timelimit=timelimit, mipgap=0.0)
+        rows.append({
+            'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}",
+            'cols_base': build_ir(**params).shape[1],
+            'cols_pool': build_pool_ir(**params).shape[1],
+            'obj_base': r_base.objective,
+            'obj_pool': r_pool.objective,
+            'status_base': r_base.status,
+            'status_pool': r_pool.status,
+            'base_s': round(r_base.build_time + r_base.solve_time, 2),
+            'pool_s': round(r_pool.build_time + r_pool.solve_time, 2),
+        })
+    return pd.DataFrame(rows)
+
+
+def bench_setup(sizes=((3, 6, 2), (4, 8, 2), (6, 10, 2)), timelimit=60, seed=1):
+    """
+    Linealización del setup (R6): McCormick (3 filas por w) contra la
+    formulación de flujo (filas por caja y turno). Filas y tiempo de
+    `build_model`, cota de la relajación LP de la IR y resolución con HiGHS.
+    """
+    import numpy as np
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scripts.matrix_ir import build_ir
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_maquinas, n_cajas, n_dias in sizes:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, carga=0.7, sparsity=0.1, seed=seed)
+        fila = {'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}"}
+        for f, tag in (('mccormick', 'mcc'), ('flow', 'flow')):
+            t0 = time.perf_counter()
+            mdl, *_ = build_model(**params, fast=True, setup_formulation=f)
+            fila[f'build_{tag}_s'] = round(time.perf_counter() - t0, 3)
+            fila[f'filas_{tag}'] = mdl.number_of_constraints
+            del mdl
+
+            ir = build_ir(**params, setup_formulation=f)
+            lp = milp(ir.c, integrality=np.zeros_like(ir.integrality),
+                      bounds=Bounds(ir.col_lb, ir.col_ub),
+                      constraints=LinearConstraint(ir.A, ir.row_lb, ir.row_ub))
+            fila[f'lp_{tag}'] = round(lp.fun, 4) if lp.x is not None else None
+
+            r = get_backend("highs").solve(params, timelimit=timelimit, mipgap=0.0,
+                                           setup_formulation=f)
+            fila[f'obj_{tag}'] = r.objective
+            fila[f'solve_{tag}_s'] = round(r.solve_time, 2)
+        rows.append(fila)
+    return pd.DataFrame(rows)
+
+
+def bench_patterns(n_cajas_list=(8, 16, 32, 48), n_dias=1, timelimit=60, seed=1):
+    """
+    Formulación por patrones (scripts/patterns.py) contra el modelo actual al
+    crecer |B|: filas y columnas de la IR, tiempo de construcción y de
+    resolución con HiGHS y objetivo. Las máquinas crecen con |B|/2 para que
+    haya segmentos suficientes para todas las cajas con demanda.
+    """
+    from scripts.matrix_ir import build_ir
+    from scripts.patterns import build_pattern_ir, solve_patterns
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_cajas in n_cajas_list:
+        params = synthetic_params(n_maquinas=max(4, n_cajas // 2), n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, carga=0.6, sparsity=0.3, seed=seed)
+        t0 = time.perf_counter()
+        ir = build_ir(**params)
+        t1 = time.perf_counter()
+        pir = build_pattern_ir(**params)
+        t2 = time.perf_counter()
+        r_base = get_backend("highs").solve(params, timelimit=timelimit, mipgap=0.0, heuristic=False)
+        r_pat = solve_patterns(params, timelimit=timelimit, mipgap=0.0)
+        rows.append({
+            'n_cajas': n_cajas,
+            'filas_base': ir.shape[0],
+            'filas_patron': pir.shape[0],
+            'cols_base': ir.shape[1],
+            'cols_patron': pir.shape[1],
+            'build_base_s': round(t1 - t0, 3),
+            'build_patron_s': round(t2 - t1, 3),
+            'obj_base': r_base.objective,
+            'obj_patron': r_pat.objective,
+            'solve_base_s': round(r_base.solve_time, 2),
+            'solve_patron_s': round(r_pat.solve_time, 2),
+        })
+    return pd.DataFrame(rows)
+
+
+def bench_processing(sizes=((10, 10, 7), (25, 20, 14), (50, 40, 30)), seed=0):
+    """
+    Pipeline completo desde tablas sintéticas (`synthetic_tables`): tiempo de
+    Processing (build_params, como en run_local) y de `build_model`, y tamaño
+    del modelo resultante.
+    """
+    import contextlib
+    import io
+
+    from run_model import build_params
+    from scripts.synthetic import synthetic_tables
+
+    rows = []
+    for n_maquinas, n_cajas, n_dias in sizes:
+        tablas, demanda, _ = synthetic_tables(n_maquinas, n_cajas, n_dias, seed=seed)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):   # Processing imprime cada celda
+            params = build_params(tablas, demanda, "SINTETICA")
+        t1 = time.perf_counter()
+        mdl, *_ = build_model(**params, fast=True)
+        rows.append({
+            'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}",
+            'filas_tablas': sum(len(df) for df in tablas.values()) + len(demanda),
+            'processing_s': round(t1 - t0, 2),
+            'build_s': round(time.perf_counter() - t1, 2),
+            'variables': mdl.number_of_variables,
+            'restricciones': mdl.number_of_constraints,
+        })
+        del mdl
+    return pd.DataFrame(rows)
+
+
+def bench_segments(n_segmentos=(2, 3, 4, 5, 6), sizes=((6, 10, 2), (10, 16, 2)),
+                   timelimit=60, seed=1):
+    """
+    Modelo con |S| segmentos por turno (setups sólo entre segmentos
+    consecutivos): tamaño, tiempo de `build_model` y de la IR, y resolución
+    con HiGHS. Las columnas `cols_por_seg` y `filas_por_seg` (tamaño / |S|)
+    se mantienen aproximadamente constantes si el modelo escala en forma
+    lineal con |S|.
+    """
+    from scripts.matrix_ir import build_ir
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_maquinas, n_cajas, n_dias in sizes:
+        base = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                densidad_compat=0.8, carga=0.6, sparsity=0.1, seed=seed)
+        for n_s in n_segmentos:
+            params = {**base, 'S_segmentos': list(range(1, n_s + 1))}
+            t0 = time.perf_counter()
+            mdl, *_ = build_model(**params, fast=True)
+            t1 = time.perf_counter()
+            del mdl
+            ir = build_ir(**params)
+            t2 = time.perf_counter()
+            r = get_backend("highs").solve(params, timelimit=timelimit, mipgap=0.0)
+            rows.append({
+                'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}",
+                'segmentos': n_s,
+                'columnas': ir.shape[1],
+                'filas': ir.shape[0],
+                'cols_por_seg': round(ir.shape[1] / n_s),
+                'filas_por_seg': round(ir.shape[0] / n_s),
+                'build_s': round(t1 - t0, 3),
+                'build_ir_s': round(t2 - t1, 3),
+                'estado': r.status,
+                'objetivo': r.objective,
+                'solve_s': round(r.solve_time, 2),
+            })
+    return pd.DataFrame(rows)
+
+
+def bench_lazy(n_cajas_list=(8, 12, 16, 24), n_dias=1, timelimit=60, seed=1):
+    """
+    Generación perezosa de R6 (scripts/lazy.py) contra el modelo completo,
+    ambos con HiGHS: rondas, filas w >= x1 + x2 - 1 y cortes en estrella que
+    hicieron falta, tiempo y objetivo, con cada modo de `CORTES`. Si ambos
+    terminan en el óptimo los objetivos deben coincidir.
+    """
+    from scripts.lazy import CORTES, solve_lazy
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_cajas in n_cajas_list:
+        params = synthetic_params(n_maquinas=max(4, n_cajas // 2), n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, carga=0.6, sparsity=0.3, seed=seed)
+        r_base = get_backend("highs").solve(params, timelimit=timelimit, mipgap=0.0)
+        for cortes in CORTES:
+            t0 = time.perf_counter()
+            r_lazy, reporte = solve_lazy(params, timelimit=timelimit, mipgap=0.0, cortes=cortes)
+            if r_base.status == 'optimal' and r_lazy.status == 'optimal':
+                assert abs(r_lazy.objective - r_base.objective) <= 1e-4 * max(1.0, abs(r_base.objective)), \
+                    f"lazy ({cortes}) {r_lazy.objective} != base {r_base.objective} con n_cajas={n_cajas}"
+            rows.append({
+                'n_cajas': n_cajas,
+                'cortes': cortes,
+                'rondas': len(reporte['rondas']),
+                'filas_lazy': reporte['filas_lazy_agregadas'],
+                'filas_ge_total': reporte['filas_lazy_total'],
+                'fraccion': round(reporte['fraccion'], 3),
+                'cortes_estrella': reporte['cortes_agregados'],
+                'respaldo': reporte['respaldo_completo'],
+                'obj_base': r_base.objective,
+                'obj_lazy': r_lazy.objective,
+                'status_base': r_base.status,
+                'status_lazy': r_lazy.status,
+                'base_s': round(r_base.solve_time, 2),
+                'lazy_s': round(time.perf_counter() - t0, 2),
+            })
+    return pd.DataFrame(rows)
+
+
+def bench_lns(sizes=((12, 24, 2), (20, 30, 3)), tiempos=(15, 30, 60, 120), sub_timelimit=10,
+              seed=1):
+    """
+    Curvas de mejora en el tiempo: LNS (scripts/lns.py, vecindarios en
+    paralelo) contra la resolución monolítica con HiGHS. La monolítica se
+    corre una vez por tiempo límite de `tiempos`; para LNS se toma el mejor
+    objetivo de su curva hasta cada tiempo (None si aún no tenía plan).
+    """
+    from scripts.lns import curve_at, solve_lns
+    from scripts.solvers import get_backend
+
+    rows = []
+    for n_maquinas, n_cajas, n_dias in sizes:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, carga=0.6, sparsity=0.3, seed=seed)
+        _, curva = solve_lns(params, timelimit=max(tiempos), sub_timelimit=sub_timelimit, seed=seed)
+        obj_lns = curve_at(curva, tiempos)
+        for t, lns in zip(tiempos, obj_lns):
+            r = get_backend("highs").solve(params, timelimit=t, mipgap=0.01, heuristic=False)
+            rows.append({
+                'instancia': f"{n_maquinas}x{n_cajas}x{n_dias}",
+                'tiempo_s': t,
+                'obj_monolitico': r.objective,
+                'gap_monolitico': round(r.gap, 4) if r.gap is not None else None,
+                'obj_lns': lns,
+            })
+    return pd.DataFrame(rows)
+
+
+def bench_replan(n_dias_list=(7, 14, 28), n_caidas_list=(1, 2), n_maquinas=10, n_cajas=14,
+                 timelimit=30, seed=1):
+    """
+    Latencia de replanificar tras caídas de máquinas (scripts/replan.py)
+    contra volver a resolver todo el horizonte por días (`solve_by_day`) con
+    los datos nuevos. Las caídas son las `n_caidas` máquinas con más
+    producción el día 2 del plan, desde ese día.
+    """
+    from scripts.decomposition import solve_by_day
+    from scripts.replan import apply_delta, replan
+
+    rows = []
+    for n_dias in n_dias_list:
+        params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                                  densidad_compat=0.8, carga=0.5, sparsity=0.3, seed=seed)
+        plan = solve_by_day(**params, timelimit=timelimit, mipgap=0.0, backend="highs", max_workers=1)
+        carga = {m: sum(v for (mm, b, d, t, s), v in plan['y'].items() if mm == m and d == 2)
+                 for m in params['M']}
+        for n_caidas in n_caidas_list:
+            caidas = sorted(carga, key=carga.get, reverse=True)[:n_caidas]
+            delta = {'Disp': {(m, 2): 0 for m in caidas}}
+            r, reporte = replan(params, plan, delta, desde_dia=2, timelimit=timelimit)
+            nuevos, _, _ = apply_delta(params, delta, desde_dia=2)
+            completo = solve_by_day(**nuevos, timelimit=timelimit, mipgap=0.0, backend="highs",
+                                    max_workers=1)
+            dia = reporte['por_dia'][2]
+            rows.append({
+                'dias': n_dias,
+                'caidas': n_caidas,
+                'nivel': dia['nivel'],
+                'turnos_liberados': f"{dia['turnos_liberados']}/{dia['turnos_dia']}",
+                'obj_replan': r.objective,
+                'obj_completo': completo['objective'],
+                't_replan': round(reporte['tiempo_s'], 3),
+                't_completo': round(completo['time'], 3),
+            })
+    return pd.DataFrame(rows)
+
+
+BENCHMARKS = {
+    'r6': bench_r6,
+    'ir': bench_ir,
+    'fast': bench_fast,
+    'whatif': bench_what_if,
+    'symmetry': bench_symmetry,
+    'pools': bench_pools,
+    'setup': bench_setup,
+    'patterns': bench_patterns,
+    'processing': bench_processing,
+    'segments': bench_segments,
+    'lazy': bench_lazy,
+    'lns': bench_lns,
+    'replan': bench_replan,
+}
+
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(BENCHMARKS)
+    for nombre in nombres:
+        print(f"\n=== {nombre} ===")
+        print(BENCHMARKS[nombre]().to_string(index=False))
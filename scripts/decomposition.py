@@ -0,0 +1,147 @@
+"""
+Resolución descompuesta por día del modelo de cajas.
+
+Todas las familias de restricciones de `build_model` (R1 por (d,b), R2 por
+(m,d,t), R3–R6 por turno/segmento) están indexadas por un único día y el
+objetivo es una suma simple, por lo que el MIP se separa de forma exacta por
+día. Aquí se construye un sub-modelo por día, se resuelven en paralelo en un
+pool de procesos y se unen los valores de x/y/T en la misma forma de
+diccionario que entrega el modelo completo.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.solvers import get_backend
+
+
+def split_by_day(M, B, D, T_turnos, Disp, Dem, Tturn, d):
+    """Restringe los parámetros indexados por día al día `d`."""
+    return {
+        'D': [d],
+        'T_turnos': {d: list(T_turnos.get(d, []))},
+        'Disp': {(m, d): Disp[(m, d)] for m in M},
+        'Dem': {(d, b): Dem.get((d, b), 0.0) for b in B},
+        'Tturn': {(dd, t): h for (dd, t), h in Tturn.items() if dd == d},
+    }
+
+
+def _solve_day(args):
+    """Worker: construye y resuelve el sub-modelo de un día."""
+    d, params, build_kwargs, timelimit, mipgap, threads, backend = args
+
+    t0 = time.perf_counter()
+    result = get_backend(backend).solve(params, timelimit=timelimit, mipgap=mipgap,
+                                        threads=threads, **build_kwargs)
+    elapsed = time.perf_counter() - t0
+
+    values = result.values or {'x': {}, 'y': {}, 'T': {}}
+    return {
+        'dia': d,
+        'status': result.status,
+        'objective': result.objective,
+        'x': values['x'],
+        'y': values['y'],
+        'T': values['T'],
+        'time': elapsed,
+    }
+
+
+def solve_by_day(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    timelimit=60,
+    mipgap=0.01,
+    max_workers=None,
+    threads_per_day=1,
+    backend="cplex",
+    **build_kwargs
+):
+    """
+    Resuelve el modelo descompuesto en un sub-modelo por día.
+
+    Parámetros
+    ----------
+    M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem, Tturn :
+        los mismos argumentos que `build_model`.
+    timelimit, mipgap : parámetros del solver aplicados a cada sub-modelo.
+    max_workers : procesos del pool (por defecto min(|D|, núcleos)).
+        Con max_workers=1 se resuelve en serie en el proceso actual.
+    threads_per_day : hilos de CPLEX por sub-modelo (1 evita sobre-suscribir
+        la CPU cuando hay varios procesos).
+    backend : backend de `scripts.solvers` para cada sub-modelo ('cplex' o 'highs').
+    **build_kwargs : se pasan tal cual a `build_model`
+        (enforce_tipo, Tseg, restrict_w_by_tipo, ...).
+
+    Retorna
+    -------
+    dict con:
+      - 'x', 'y', 'T': {clave: valor} unidos sobre todos los días, con las
+        mismas claves que los diccionarios de variables de `build_model`.
+      - 'objective': suma de objetivos por día (None si algún día es infactible).
+      - 'status': 'optimal'/'feasible'/'infeasible'/'no_solution'
+        ('infeasible' sólo si algún día lo es; 'no_solution' si algún día
+        quedó sin plan por tiempo o cancelación).
+      - 'por_dia': {d: {'status', 'objective', 'time'}}.
+      - 'time': tiempo de pared total.
+    """
+    t0 = time.perf_counter()
+
+    tasks = []
+    for d in D:
+        params = dict(
+            M=M, B=B, S_segmentos=S_segmentos,
+            Prod=Prod, Tipo=Tipo, Setup=Setup,
+            **split_by_day(M, B, D, T_turnos, Disp, Dem, Tturn, d),
+        )
+        tasks.append((d, params, build_kwargs, timelimit, mipgap, threads_per_day, backend))
+
+    if max_workers is None:
+        max_workers = min(len(tasks), os.cpu_count() or 1)
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        day_results = [_solve_day(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            day_results = list(pool.map(_solve_day, tasks))
+
+    # --- Unir soluciones por día ---
+    x_val, y_val, T_val = {}, {}, {}
+    por_dia = {}
+    objective = 0.0
+    sin_plan = []
+    all_optimal = True
+    for res in day_results:
+        por_dia[res['dia']] = {
+            'status': res['status'],
+            'objective': res['objective'],
+            'time': res['time'],
+        }
+        if res['objective'] is None:
+            sin_plan.append(res['status'])
+            continue
+        if res['status'] != 'optimal':
+            all_optimal = False
+        objective += res['objective']
+        x_val.update(res['x'])
+        y_val.update(res['y'])
+        T_val.update(res['T'])
+
+    if sin_plan:
+        # Sólo es infactible si algún día lo es; si no, se acabó el tiempo
+        # (o se canceló) sin incumbente
+        status = 'infeasible' if 'infeasible' in sin_plan else 'no_solution'
+        objective = None
+    else:
+        status = 'optimal' if all_optimal else 'feasible'
+
+    return {
+        'x': x_val,
+        'y': y_val,
+        'T': T_val,
+        'objective': objective,
+        'status': status,
+        'por_dia': por_dia,
+        'time': time.perf_counter() - t0,
+    }
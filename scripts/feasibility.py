@@ -0,0 +1,112 @@
+"""
+Chequeo rápido de capacidad antes de construir o enviar el modelo.
+
+Son condiciones necesarias de factibilidad, calculadas con NumPy en
+milisegundos sobre Dem, Prod, Tipo, Disp y Tturn:
+
+  - por (día, caja): las cajas máximas si todas las máquinas compatibles
+    disponibles dedicaran el día completo a esa caja;
+  - por día: las horas-máquina mínimas para cubrir la demanda (cada caja en
+    su máquina más rápida) contra las horas disponibles.
+
+Si alguna falla el modelo es infactible y no vale la pena resolverlo. Pasar
+el chequeo no garantiza factibilidad (setups, un tipo por segmento, etc.).
+"""
+
+import time
+
+import numpy as np
+
+from scripts.model import align_Tturn, segment_lengths
+
+
+def capacity_check(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Dem, Tturn,
+    enforce_tipo=True,
+    Tseg=None,
+    tol=1e-6,
+    **_otros
+):
+    """
+    Chequea la capacidad con los mismos argumentos que `build_model` (Setup
+    y demás opciones se aceptan y se ignoran).
+
+    Retorna un dict con:
+      - 'factible': False si alguna celda o día no alcanza.
+      - 'celdas': [{'Dia', 'TipoCaja', 'Demanda', 'MaxCajas', 'Deficit'}]
+        con las celdas (d,b) cuya demanda supera la producción máxima.
+      - 'dias': [{'Dia', 'HorasRequeridas', 'HorasDisponibles'}] con los días
+        sin horas-máquina suficientes.
+      - 'tiempo_ms': duración del chequeo.
+    """
+    t0 = time.perf_counter()
+    M, B, D = list(M), list(B), list(D)
+    nM, nB, nD = len(M), len(B), len(D)
+    Tturn = align_Tturn(T_turnos, Tturn, default_hours=8.0)
+    seg_len = segment_lengths(D, T_turnos, S_segmentos, Tturn, Tseg)
+
+    prod = np.array([[Prod.get((m, b), 0.0) for b in B] for m in M], dtype=float).reshape(nM, nB)
+    if enforce_tipo:
+        compat = np.array([[Tipo.get((m, b), 0) == 1 for b in B] for m in M], dtype=bool).reshape(nM, nB)
+    else:
+        compat = prod > 0
+    disp = np.array([[Disp.get((m, d), 0) for d in D] for m in M], dtype=float).reshape(nM, nD)
+    dem = np.array([[Dem.get((d, b), 0.0) for b in B] for d in D], dtype=float).reshape(nD, nB)
+
+    # Horas productivas por (m,d,t): acotadas por R2 (Tturn·Disp) y por los
+    # segmentos; los días con menos turnos se rellenan con ceros
+    nT = max((len(T_turnos.get(d, [])) for d in D), default=0)
+    turno = np.zeros((nD, nT))
+    segmentos = np.zeros((nD, nT))
+    for i, d in enumerate(D):
+        for k, t in enumerate(T_turnos.get(d, [])):
+            turno[i, k] = Tturn[(d, t)]
+            segmentos[i, k] = sum(seg_len[(d, t, s)] for s in S_segmentos)
+    horas_md = np.minimum(disp[:, :, None] * turno[None], segmentos[None]).sum(axis=2)   # (m,d)
+    tasa = np.where(compat, prod, 0.0)                                # (m,b) cajas/h
+
+    # --- Por (día, caja): producción máxima ---
+    max_cajas = horas_md.T @ tasa                                     # (d,b)
+    falta = dem > max_cajas * (1 + tol) + tol
+    celdas = [
+        {'Dia': D[i], 'TipoCaja': B[j], 'Demanda': float(dem[i, j]),
+         'MaxCajas': round(float(max_cajas[i, j]), 2),
+         'Deficit': round(float(dem[i, j] - max_cajas[i, j]), 2)}
+        for i, j in zip(*np.nonzero(falta))
+    ]
+
+    # --- Por día: horas-máquina requeridas vs disponibles ---
+    disponible = (disp > 0)[:, :, None] & (tasa > 0)[:, None, :]     # (m,d,b)
+    mejor = np.where(disponible, tasa[:, None, :], 0.0).max(axis=0) if nM else np.zeros((nD, nB))
+    requeridas = np.divide(dem, mejor, out=np.zeros_like(dem), where=mejor > 0).sum(axis=1)
+    disponibles = horas_md.sum(axis=0)
+    dias = [
+        {'Dia': D[i], 'HorasRequeridas': round(float(requeridas[i]), 2),
+         'HorasDisponibles': round(float(disponibles[i]), 2)}
+        for i in np.flatnonzero(requeridas > disponibles * (1 + tol) + tol)
+    ]
+
+    return {
+        'factible': not celdas and not dias,
+        'celdas': celdas,
+        'dias': dias,
+        'tiempo_ms': 1000 * (time.perf_counter() - t0),
+    }
+
+
+def capacity_summary(reporte, max_celdas=10):
+    """Resumen legible del chequeo, una línea por celda o día que no alcanza."""
+    if reporte['factible']:
+        return f"[Capacidad] OK ({reporte['tiempo_ms']:.1f} ms)"
+    lineas = [f"[Capacidad] Demanda imposible de cubrir: {len(reporte['celdas'])} celdas (día, caja) "
+              f"y {len(reporte['dias'])} días sin horas suficientes ({reporte['tiempo_ms']:.1f} ms)"]
+    for c in reporte['celdas'][:max_celdas]:
+        lineas.append(f"  día {c['Dia']} · caja {c['TipoCaja']}: demanda {c['Demanda']:g}, "
+                      f"máximo {c['MaxCajas']:g} (faltan {c['Deficit']:g})")
+    if len(reporte['celdas']) > max_celdas:
+        lineas.append(f"  ... y {len(reporte['celdas']) - max_celdas} celdas más")
+    for d in reporte['dias']:
+        lineas.append(f"  día {d['Dia']}: requiere {d['HorasRequeridas']:g} h-máquina, "
+                      f"hay {d['HorasDisponibles']:g}")
+    return "\n".join(lineas)
@@ -0,0 +1,131 @@
+"""
+Heurística constructiva (greedy) para obtener un plan factible al instante.
+
+Por cada día reparte la demanda sobre las máquinas compatibles disponibles,
+de la más rápida a la más lenta:
+
+  1) Cada caja (primero las que tienen menos máquinas compatibles y luego
+     las de más horas) ocupa turnos libres manteniendo la misma caja en los
+     segmentos consecutivos, sin setup.
+  2) Lo que falte se produce en el próximo segmento libre de turnos ya
+     iniciados, eligiendo el menor setup desde la caja anterior y luego la
+     mayor productividad.
+
+El plan usa las claves de `build_model` ({'x','y','T'}, sólo valores no
+nulos) y sirve como MIP start (`add_plan_start`) o como respaldo cuando el
+solver termina sin incumbente.
+"""
+
+import numpy as np
+
+from scripts.model import align_Tturn, segment_lengths, setup_cost
+
+TOL = 1e-9
+
+
+def greedy_plan(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    enforce_tipo=True,
+    Tseg=None,
+    restrict_w_by_tipo=True
+):
+    """
+    Construye un plan greedy con los mismos argumentos que `build_model`.
+
+    Retorna (plan, faltante): plan = {'x','y','T'} y faltante = {(d,b): cajas}
+    con la demanda que no se pudo asignar (vacío si el plan es factible).
+    """
+    M, B = list(M), list(B)
+    nM, nB, nS = len(M), len(B), len(S_segmentos)
+    Tturn = align_Tturn(T_turnos, Tturn, default_hours=8.0)
+    seg_len = segment_lengths(D, T_turnos, S_segmentos, Tturn, Tseg)
+
+    prod = np.array([[Prod.get((m, b), 0.0) for b in B] for m in M], dtype=float).reshape(nM, nB)
+    if enforce_tipo:
+        compat = np.array([[Tipo.get((m, b), 0) == 1 for b in B] for m in M], dtype=bool).reshape(nM, nB)
+    else:
+        compat = prod > 0
+    compat &= prod > 0   # sin productividad la caja no avanza
+
+    plan = {'x': {}, 'y': {}, 'T': {}}
+    faltante = {}
+    for d in D:
+        dem = np.array([Dem.get((d, b), 0.0) for b in B], dtype=float)
+        disp = np.array([Disp[(m, d)] for m in M], dtype=float)
+        ok = compat & (disp > 0)[:, None] & (dem > 0)[None, :]
+
+        # Slots (máquina, turno) del día; los segmentos usados de cada slot
+        # son un prefijo (R5): usados[k] es el próximo segmento libre
+        turnos = list(T_turnos.get(d, []))
+        slot_m = np.repeat(np.flatnonzero(disp > 0), len(turnos))
+        slot_t = np.tile(np.array(turnos, dtype=np.int64), int((disp > 0).sum()))
+        H = np.array([Tturn[(d, t)] for t in slot_t], dtype=float) * disp[slot_m]
+        L = np.array([[seg_len[(d, t, s)] for s in S_segmentos] for t in slot_t],
+                     dtype=float).reshape(len(slot_t), nS)
+        nK = len(slot_m)
+        caja = -np.ones((nK, nS), dtype=np.int64)
+        horas_seg = np.zeros((nK, nS))
+        usados = np.zeros(nK, dtype=np.int64)
+        setup = np.zeros(nK)
+
+        rem = dem.copy()
+        p_max = np.where(ok, prod, 0.0).max(axis=0) if nM else np.zeros(nB)
+        horas = np.divide(rem, p_max, out=np.full(nB, np.inf), where=p_max > 0)
+        orden = [j for j in np.lexsort((-horas, ok.sum(axis=0))) if dem[j] > 0]
+
+        # --- 1) Turnos libres, misma caja en los segmentos consecutivos ---
+        for j in orden:
+            while rem[j] > TOL:
+                libres = np.flatnonzero((usados == 0) & ok[slot_m, j])
+                if len(libres) == 0:
+                    break
+                k = libres[np.argmax(prod[slot_m[libres], j])]
+                m, p = slot_m[k], prod[slot_m[k], j]
+                necesidad = rem[j] / p
+                c = setup_cost(Setup, Tipo, M[m], B[j], B[j], restrict_w_by_tipo)
+                for i in range(nS):
+                    costo = c if i > 0 else 0.0
+                    a = min(L[k, i], H[k] - horas_seg[k].sum() - setup[k] - costo, necesidad)
+                    if a <= TOL and i > 0:
+                        break
+                    caja[k, i], horas_seg[k, i] = j, max(a, 0.0)
+                    setup[k] += costo
+                    usados[k] = i + 1
+                    necesidad -= a
+                rem[j] = max(rem[j] - horas_seg[k].sum() * p, 0.0)
+
+        # --- 2) Próximo segmento libre de turnos iniciados, con setup ---
+        for j in orden:
+            while rem[j] > TOL:
+                cand = np.flatnonzero((usados > 0) & (usados < nS) & ok[slot_m, j])
+                costos = np.array([setup_cost(Setup, Tipo, M[slot_m[k]], B[caja[k, usados[k] - 1]], B[j],
+                                              restrict_w_by_tipo)
+                                   for k in cand])
+                holgura = (np.minimum(L[cand, usados[cand]],
+                                      H[cand] - horas_seg[cand].sum(axis=1) - setup[cand] - costos)
+                           if len(cand) else np.zeros(0))
+                sirve = holgura > TOL
+                if not sirve.any():
+                    break
+                cand, costos, holgura = cand[sirve], costos[sirve], holgura[sirve]
+                i = np.lexsort((-prod[slot_m[cand], j], costos))[0]
+                k, p = cand[i], prod[slot_m[cand[i]], j]
+                a = min(holgura[i], rem[j] / p)
+                caja[k, usados[k]], horas_seg[k, usados[k]] = j, a
+                setup[k] += costos[i]
+                usados[k] += 1
+                rem[j] = max(rem[j] - a * p, 0.0)
+
+        # --- Plan con claves de build_model ---
+        for k in np.flatnonzero(usados > 0):
+            m, t = M[slot_m[k]], int(slot_t[k])
+            for i in range(usados[k]):
+                s = S_segmentos[i]
+                plan['x'][(m, B[caja[k, i]], d, t, s)] = 1.0
+                plan['y'][(m, B[caja[k, i]], d, t, s)] = float(horas_seg[k, i])
+            plan['T'][(m, d, t)] = float(setup[k])
+        for j in np.flatnonzero(rem > 1e-6 * dem + TOL):
+            faltante[(d, B[j])] = float(rem[j])
+
+    return plan, faltante
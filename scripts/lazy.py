@@ -0,0 +1,400 @@
+"""
+Generación perezosa de las filas de setup R6 (w >= x_s + x_(s+1) - 1).
+
+En la IR McCormick (`scripts/matrix_ir.py`) hay una fila
+R6_w_ge_summinus1 por cada par (b1,b2) con setup y turno, O(|B|²), pero en
+el óptimo casi ninguna es activa: sólo importan los pares que de verdad
+corren en segmentos consecutivos. `solve_lazy` parte del modelo sin esas
+filas (w queda libre hacia abajo y T subestima el setup) y en cada ronda:
+
+  1) resuelve el modelo relajado;
+  2) calcula el setup real de cada (m,d,t) a partir de x y busca los
+     turnos donde T lo subestima;
+  3) corta esos turnos y vuelve a resolver, con el incumbente anterior como
+     MIP start (CPLEX).
+
+Con cortes="agregado" (por defecto) un turno se corta con filas en x y T,
+una "estrella" por caja de origen b1 y segmento s:
+
+    T[m,d,t] >= sum_b2 setup(b1,b2)·x[b2,s+1] - cmax(b1)·(1 - x[b1,s])
+
+con cmax(b1) el mayor setup que sale de b1. Como R4 deja a lo sumo una caja
+por segmento, la fila es válida y, a diferencia de las filas por par, cobra
+el setup de cualquier sucesor: el solver no la esquiva cambiando de par.
+Con dos segmentos las |B| estrellas dejan el turno exacto (en vez de las
+|B|² filas por par); con más se agrega la suma de las estrellas de las
+cajas que corren. Un turno subestimado por segunda vez recibe todas sus
+filas R6_w_ge_summinus1, así que queda exacto. Si se acaban las rondas sin
+cerrar el gap se resuelve el modelo completo con el tiempo restante.
+
+El modelo relajado es una cota inferior. Su incumbente, con w = x_s·x_(s+1)
+y T igual al setup real, es factible para el modelo completo si cabe en el
+turno (R2); el mejor de esos planes es la solución. Cuando no quedan turnos
+subestimados el plan relajado es óptimo para el modelo completo.
+"""
+
+import copy
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from scripts.matrix_ir import FAMILIAS, build_ir, to_docplex, w_x_columns
+from scripts.model import add_plan_start
+from scripts.solvers import (DEFAULT_MIPGAP, DEFAULT_TIMELIMIT, HighsBackend, SolveResult,
+                             _status_from_docplex, _with_fallback, greedy_result)
+
+FAMILIA_LAZY = 'R6_w_ge_summinus1'
+
+CORTES = ("agregado", "violadas", "turno")
+
+FAMILIA_CORTE = -1    # row_family de los cortes agregados (no son filas de la IR)
+
+
+def _with_rows(ir, mask, cortes=None):
+    """
+    Copia de la IR con sólo las filas de `mask` (mismas columnas) y, si se
+    entregan, los cortes (A, ub) como filas "<=" al final.
+    """
+    sub = copy.copy(ir)
+    sub.A = ir.A[mask]
+    sub.row_lb = ir.row_lb[mask]
+    sub.row_ub = ir.row_ub[mask]
+    sub.row_family = ir.row_family[mask]
+    if cortes is not None and cortes[0].shape[0]:
+        A_c, ub_c = cortes
+        sub.A = sp.vstack([sub.A, A_c], format="csr")
+        sub.row_lb = np.concatenate([sub.row_lb, np.full(A_c.shape[0], -np.inf)])
+        sub.row_ub = np.concatenate([sub.row_ub, ub_c])
+        sub.row_family = np.concatenate([sub.row_family,
+                                         np.full(A_c.shape[0], FAMILIA_CORTE, dtype=sub.row_family.dtype)])
+    return sub
+
+
+class _SetupCheck:
+    """Evalúa un incumbente del modelo relajado contra el setup real."""
+
+    def __init__(self, ir):
+        self.ir = ir
+        off = ir.offsets
+        self.off_T, self.off_w = off['T'], off['w']
+        familia = ir.row_family
+        self.lazy_rows = np.flatnonzero(familia == FAMILIAS.index(FAMILIA_LAZY))
+        tdef_rows = np.flatnonzero(familia == FAMILIAS.index('R6_T_def'))
+
+        # Cada fila lazy tiene dos x con coef. 1 y su w con coef. -1
+        A_lazy = ir.A[self.lazy_rows].tocsr()
+        self.A_lazy_x = A_lazy[:, :off['y']]
+        w_lazy = A_lazy[:, self.off_w:].tocoo()
+        self.w_of_lazy = np.empty(len(self.lazy_rows), dtype=np.int64)
+        self.w_of_lazy[w_lazy.row] = w_lazy.col
+
+        # R6_T_def: setup·w - T <= 0, una fila por (m,d,t) con pares w
+        A_tdef = ir.A[tdef_rows].tocsr()
+        self.A_tdef_w = A_tdef[:, self.off_w:]
+        t_tdef = A_tdef[:, self.off_T:self.off_w].tocoo()
+        self.T_of_tdef = np.empty(len(tdef_rows), dtype=np.int64)
+        self.T_of_tdef[t_tdef.row] = t_tdef.col
+        w_tdef = self.A_tdef_w.tocoo()
+        self.tdef_of_w = np.empty(ir.n_w, dtype=np.int64)
+        self.tdef_of_w[w_tdef.col] = w_tdef.row
+        self.setup_w = np.zeros(ir.n_w)
+        self.setup_w[w_tdef.col] = w_tdef.data
+        self.x_keys, self.T_keys = ir.x_keys(), ir.T_keys()
+
+        # Para los cortes agregados: x de origen/destino de cada w y los w
+        # que salen de cada x de origen (misma caja, turno y segmento)
+        self.w_x1, self.w_x2 = w_x_columns(ir)
+        orden = np.argsort(self.w_x1, kind="stable")
+        origenes, inicio = np.unique(self.w_x1[orden], return_index=True)
+        self.w_por_origen = dict(zip(origenes.tolist(), np.split(orden, inicio[1:])))
+
+    def vector(self, values):
+        """Vector de columnas [x|y|T|w] desde un plan x/y/T (w en 0)."""
+        v = np.zeros(self.ir.shape[1])
+        off = self.ir.offsets
+        v[off['x']:off['y']] = [values['x'].get(k, 0.0) for k in self.x_keys]
+        v[off['y']:off['T']] = [values['y'].get(k, 0.0) for k in self.x_keys]
+        v[off['T']:off['w']] = [values['T'].get(k, 0.0) for k in self.T_keys]
+        return v
+
+    def check(self, v, tol=1e-6, cortes="violadas"):
+        """
+        Retorna (filas, subestimados, reparado): filas lazy (índices en la
+        IR) a agregar, máscara de los turnos (filas R6_T_def) con T < setup
+        real y el vector con w = x_s·x_(s+1) y T = max(T, setup real). En los
+        turnos subestimados cortes="violadas" toma sólo los pares que corren
+        (ambas x en 1), cortes="turno" todos los pares que salen o llegan a
+        una caja que corre y cortes="agregado" ninguno (ver `aggregate_cuts`).
+        """
+        act = self.A_lazy_x @ v[:self.A_lazy_x.shape[1]]
+        corre = act > 1.5   # ambas x en 1
+        w_hat = np.zeros(self.ir.n_w)
+        w_hat[self.w_of_lazy[corre]] = 1.0
+        real = self.A_tdef_w @ w_hat
+        T = v[self.off_T + self.T_of_tdef]
+        sub = real > T + tol * np.maximum(1.0, real)
+
+        if cortes == "agregado":
+            violadas = np.zeros(len(self.lazy_rows), dtype=bool)
+        else:
+            violadas = (corre if cortes == "violadas" else act > 0.5) & sub[self.tdef_of_w[self.w_of_lazy]]
+        reparado = v.copy()
+        reparado[self.off_w:] = w_hat
+        reparado[self.off_T + self.T_of_tdef] = np.maximum(T, real)
+        return self.lazy_rows[violadas], sub, reparado
+
+    def shift_rows(self, turnos):
+        """Todas las filas lazy de los turnos (máscara sobre R6_T_def)."""
+        return self.lazy_rows[turnos[self.tdef_of_w[self.w_of_lazy]]]
+
+    def aggregate_cuts(self, v, turnos):
+        """
+        Cortes en estrella de los turnos de la máscara `turnos` (ver el
+        docstring del módulo): uno por caja de origen y segmento y, si en `v`
+        corre más de una transición, su suma para las cajas que corren.
+        Retorna (A, ub) con las filas en forma  sum c·x - T <= ub.
+        """
+        x_on = v[:self.ir.n_x] > 0.5
+        corre_w = x_on[self.w_x1] & x_on[self.w_x2]
+        filas, cols, vals, ub = [], [], [], []
+
+        def estrella(x1):
+            ws = self.w_por_origen[x1]
+            cmax = float(self.setup_w[ws].max())
+            return self.w_x2[ws].tolist() + [x1], self.setup_w[ws].tolist() + [cmax], cmax
+
+        def agregar(partes, tau):
+            for c, val, _ in partes:
+                cols.extend(c)
+                vals.extend(val)
+            cols.append(self.off_T + self.T_of_tdef[tau])
+            vals.append(-1.0)
+            filas.extend([len(ub)] * (len(cols) - len(filas)))
+            ub.append(sum(p[2] for p in partes))
+
+        for tau in np.flatnonzero(turnos):
+            del_turno = self.tdef_of_w == tau
+            for x1 in np.unique(self.w_x1[del_turno]).tolist():
+                agregar([estrella(x1)], tau)
+            corren = np.unique(self.w_x1[corre_w & del_turno]).tolist()
+            if len(corren) > 1:
+                agregar([estrella(x1) for x1 in corren], tau)
+        A = sp.csr_matrix((vals, (filas, cols)), shape=(len(ub), self.ir.shape[1]))
+        A.sum_duplicates()
+        return A, np.array(ub)
+
+    def feasible(self, v, tol=1e-5):
+        """
+        True si `v` cumple todas las filas del modelo completo. La tolerancia
+        absorbe la de integralidad del solver (x redondeada con y > 0 ínfimo).
+        """
+        act = self.ir.A @ v
+        return bool(np.all(act <= self.ir.row_ub + tol * np.maximum(1.0, np.abs(self.ir.row_ub)))
+                    and np.all(act >= self.ir.row_lb - tol * np.maximum(1.0, np.abs(self.ir.row_lb))))
+
+
+class _CplexRelajado:
+    """Modelo docplex relajado que crece fila a fila entre rondas."""
+
+    def __init__(self, ir, mask, mipgap, log_output):
+        self.ir = ir
+        self.mdl, self.x, self.y, _, _ = to_docplex(_with_rows(ir, mask))
+        self.all_vars = list(self.mdl.iter_variables())
+        self.mdl.parameters.mip.tolerances.mipgap = mipgap
+        self.log_output = log_output
+
+    def add_rows(self, filas):
+        self.add_cuts(self.ir.A[filas], self.ir.row_ub[filas])
+
+    def add_cuts(self, A, ub):
+        if A.shape[0]:
+            self.mdl.add_constraints(self.mdl.matrix_constraints(A, self.all_vars, ub, sense='le'))
+
+    def solve(self, timelimit, plan=None):
+        mdl = self.mdl
+        mdl.parameters.timelimit = timelimit
+        mdl.clear_mip_starts()
+        if plan is not None:
+            add_plan_start(mdl, self.x, self.y, plan)
+        t0 = time.perf_counter()
+        sol = mdl.solve(log_output=self.log_output)
+        solve_time = time.perf_counter() - t0
+        details = mdl.solve_details
+        status, texto = _status_from_docplex(sol, details)
+        if sol is None:
+            return SolveResult(status, solve_time=solve_time, backend="cplex",
+                               problem_name=mdl.name, status_string=texto)
+        return SolveResult(status, objective=sol.objective_value,
+                           values=self.ir.split_solution(sol.get_values(self.all_vars)),
+                           gap=getattr(details, 'mip_relative_gap', None),
+                           solve_time=solve_time, backend="cplex",
+                           problem_name=mdl.name, status_string=texto)
+
+
+def solve_lazy(params, backend="highs", timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP,
+               max_rondas=50, tol=1e-6, log_output=False, progress_callback=None,
+               cancel_event=None, heuristic=True, cortes="agregado", **build_kwargs):
+    """
+    Resuelve el modelo agregando las filas R6_w_ge_summinus1 a demanda.
+
+    `timelimit` es el total de todas las rondas. Con backend="cplex" el
+    modelo relajado se mantiene entre rondas y el incumbente anterior es el
+    MIP start de la siguiente; scipy.optimize.milp (HiGHS) no admite MIP
+    start, así que cada ronda resuelve desde cero. `progress_callback`
+    recibe un dict por ronda. Con heuristic=True el plan greedy es el primer
+    incumbente (y MIP start con CPLEX): si su setup ya alcanza la cota del
+    modelo relajado se termina sin agregar filas. `cortes` elige cómo se
+    corta un turno subestimado (ver CORTES, el docstring del módulo y
+    `_SetupCheck.check`). Si tras `max_rondas` el gap sigue abierto se
+    resuelve el modelo completo con el tiempo que quede.
+
+    Retorna (result, reporte): un `SolveResult` con x/y/T en las claves de
+    `build_model` y el reporte de rondas (ver `lazy_summary`).
+    """
+    build_kwargs.pop('fast', None)
+    if build_kwargs.get('setup_formulation', "mccormick") != "mccormick":
+        raise ValueError("La generación perezosa de R6 requiere setup_formulation='mccormick'.")
+    if backend not in ("highs", "cplex"):
+        raise ValueError(f"Backend desconocido: {backend!r}. Usa 'cplex' o 'highs'.")
+    if cortes not in CORTES:
+        raise ValueError(f"Cortes desconocidos: {cortes!r}. Usa {', '.join(CORTES)}.")
+
+    inicial = greedy_result(params, **build_kwargs) if heuristic else None
+    t0 = time.perf_counter()
+    ir = build_ir(**params, **build_kwargs)
+    chequeo = _SetupCheck(ir)
+    activas = np.ones(ir.shape[0], dtype=bool)
+    activas[chequeo.lazy_rows] = False
+    veces = np.zeros(len(chequeo.T_of_tdef), dtype=np.int64)    # rondas subestimado, por turno
+    cortes_A, cortes_ub = [], []
+    build_time = time.perf_counter() - t0
+
+    relajado = _CplexRelajado(ir, activas, mipgap, log_output) if backend == "cplex" else None
+    limite = time.perf_counter() + timelimit
+    rondas = []
+    mejor, mejor_obj, cota = None, np.inf, -np.inf
+    plan = None
+    exacto = False     # última ronda sin turnos subestimados y resuelta al óptimo
+    if inicial is not None and inicial.has_solution:
+        _, _, reparado = chequeo.check(chequeo.vector(inicial.values), tol)
+        if chequeo.feasible(reparado):
+            mejor, mejor_obj = reparado, float(reparado[ir.offsets['T']:ir.offsets['w']].sum())
+            if relajado is not None:
+                plan = inicial.values
+
+    def resolver(restante):
+        if relajado is not None:
+            return relajado.solve(restante, plan)
+        relajada = _with_rows(ir, activas, (sp.vstack(cortes_A, format="csr"), np.concatenate(cortes_ub))
+                              if cortes_A else None)
+        return HighsBackend().solve_ir(relajada, timelimit=restante, mipgap=mipgap,
+                                       log_output=log_output, cancel_event=cancel_event)
+
+    result = SolveResult('no_solution', backend=backend)
+    cerrado = False
+    respaldo = False
+    ronda = 0
+    while True:
+        restante = limite - time.perf_counter()
+        if restante <= 0 or (cancel_event is not None and cancel_event.is_set()):
+            break
+        if ronda == max_rondas:
+            # Sin converger en max_rondas: modelo completo con el tiempo restante
+            faltan = chequeo.lazy_rows[~activas[chequeo.lazy_rows]]
+            activas[faltan] = True
+            if relajado is not None:
+                relajado.add_rows(faltan)
+            respaldo = True
+        ronda += 1
+        result = resolver(restante)
+        if not result.has_solution:
+            break
+        if result.status == 'optimal':
+            # con objetivo 0 el gap relativo puede venir infinito: la cota es 0
+            gap_r = result.gap if result.gap is not None and np.isfinite(result.gap) else 0.0
+            cota = max(cota, result.objective * (1 - gap_r))
+
+        v = chequeo.vector(result.values)
+        filas, sub, reparado = chequeo.check(v, tol, cortes)
+        # sin turnos subestimados el plan relajado ya es factible para el modelo completo
+        if not sub.any() or chequeo.feasible(reparado):
+            objetivo = float(reparado[ir.offsets['T']:ir.offsets['w']].sum())
+            if objetivo < mejor_obj:
+                mejor, mejor_obj = reparado, objetivo
+
+        # Un turno subestimado por segunda vez recibe todas sus filas; los
+        # demás, las filas o el corte agregado según `cortes`
+        veces[sub] += 1
+        completos = sub & (veces >= 2)
+        filas = np.union1d(filas, chequeo.shift_rows(completos))
+        filas = filas[~activas[filas]]
+        A_c, ub_c = (chequeo.aggregate_cuts(v, sub & ~completos) if cortes == "agregado" and not respaldo
+                     else (sp.csr_matrix((0, ir.shape[1])), np.zeros(0)))
+        rondas.append({
+            'ronda': ronda,
+            'objetivo_relajado': result.objective,
+            'estado': result.status,
+            'turnos_subestimados': int(sub.sum()),
+            'filas_agregadas': len(filas),
+            'cortes_agregados': A_c.shape[0],
+            'filas_lazy_activas': int(activas[chequeo.lazy_rows].sum()) + len(filas),
+            'mejor_factible': mejor_obj if mejor is not None else None,
+            'tiempo_s': round(result.solve_time, 3),
+        })
+        if progress_callback is not None:
+            progress_callback(dict(rondas[-1]))
+
+        exacto = not sub.any() and result.status == 'optimal'
+        cerrado = not sub.any() or mejor_obj - cota <= mipgap * max(abs(mejor_obj), 1e-9)
+        if cerrado or respaldo:
+            break
+        activas[filas] = True
+        if A_c.shape[0]:
+            cortes_A.append(A_c)
+            cortes_ub.append(ub_c)
+        if relajado is not None:
+            relajado.add_rows(filas)
+            relajado.add_cuts(A_c, ub_c)
+            plan = ir.split_solution(reparado)
+
+    n_lazy = len(chequeo.lazy_rows)
+    n_activas = int(activas[chequeo.lazy_rows].sum())
+    reporte = {
+        'rondas': rondas,
+        'filas_lazy_total': n_lazy,
+        'filas_lazy_agregadas': n_activas,
+        'fraccion': n_activas / n_lazy if n_lazy else 0.0,
+        'cortes_agregados': sum(A.shape[0] for A in cortes_A),
+        'filas_modelo_completo': ir.shape[0],
+        'filas_modelo_final': int(activas.sum()),
+        'respaldo_completo': respaldo,
+        'cerrado': cerrado,
+        'cota': cota if np.isfinite(cota) else None,
+    }
+
+    total = time.perf_counter() - t0 - build_time
+    if mejor is None:
+        estado = 'cancelled' if result.status == 'cancelled' else \
+            ('infeasible' if result.status == 'infeasible' else 'no_solution')
+        final = SolveResult(estado, solve_time=total, build_time=build_time,
+                            backend=f"{backend}+lazy", status_string=result.status_string)
+        return _with_fallback(final, inicial), reporte
+
+    gap = (mejor_obj - cota) / max(abs(mejor_obj), 1e-9) if np.isfinite(cota) else None
+    optimo = exacto or (gap is not None and gap <= mipgap + 1e-6)
+    final = SolveResult('optimal' if optimo else 'feasible', objective=mejor_obj,
+                        values=ir.split_solution(mejor), gap=max(gap, 0.0) if gap is not None else None,
+                        solve_time=total, build_time=build_time, backend=f"{backend}+lazy",
+                        status_string=f"lazy R6: {len(rondas)} rondas"
+                                      + (" + modelo completo" if respaldo else ""))
+    return final, reporte
+
+
+def lazy_summary(reporte):
+    """Resumen de una línea del reporte de `solve_lazy`."""
+    return (f"[Lazy R6] {len(reporte['rondas'])} rondas | filas w>=x1+x2-1: "
+            f"{reporte['filas_lazy_agregadas']}/{reporte['filas_lazy_total']} "
+            f"({100 * reporte['fraccion']:.1f}%) | cortes en estrella: {reporte['cortes_agregados']} | "
+            f"filas del modelo: {reporte['filas_modelo_final']}/{reporte['filas_modelo_completo']}"
+            + (" | modelo completo tras max_rondas" if reporte['respaldo_completo'] else ""))
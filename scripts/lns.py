@@ -0,0 +1,189 @@
+"""
+Búsqueda en vecindarios grandes (LNS) para plantas donde el MIP completo no
+cierra el gap en el tiempo límite.
+
+Parte de un plan (greedy o el que se entregue) y en cada ronda libera varios
+vecindarios a la vez, uno por proceso:
+
+  - "maquinas": un subconjunto de máquinas (todos sus días y turnos);
+  - "dia": un día completo;
+  - "familia": una familia de cajas (las más parecidas, por máquinas
+    compatibles, a una caja al azar).
+
+Las x fuera del vecindario quedan fijas en el incumbente y el sub-MIP sólo
+conserva las columnas que pueden moverse: x libres, y de las x libres o en 1,
+todas las T y las w cuyas dos x pueden valer 1. Se acepta la mejor mejora de
+la ronda; si ninguna mejora, el vecindario crece. `solve_lns` devuelve la
+curva objetivo vs tiempo para compararla con la resolución monolítica (ver
+`bench_lns` en scripts/benchmarks.py).
+"""
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scripts.matrix_ir import build_ir, solve_fixed, w_x_columns
+from scripts.solvers import DEFAULT_TIMELIMIT, SolveResult, get_backend, greedy_result
+
+VECINDADES = ("maquinas", "dia", "familia")
+
+_IR = None          # IR y mapeos del proceso worker (ver _init_worker)
+_W_X = None
+
+
+def _init_worker(params, build_kwargs):
+    global _IR, _W_X
+    _IR = build_ir(**params, **build_kwargs)
+    _IR.A = _IR.A.tocsc()
+    _W_X = w_x_columns(_IR)
+
+
+def _free_x(ir, vecindad):
+    """Máscara de las x liberadas por un vecindario (tipo, índices)."""
+    tipo, indices = vecindad
+    if tipo == "maquinas":
+        return np.isin(ir.x_m, indices)
+    if tipo == "dia":
+        return np.isin(ir.slot_d[ir.x_slot], indices)
+    if tipo == "familia":
+        return np.isin(ir.x_b, indices)
+    raise ValueError(f"Vecindario desconocido: {tipo!r}. Usa {', '.join(VECINDADES)}.")
+
+
+def _solve_neighborhood(args):
+    """Worker: sub-MIP con las x fuera del vecindario fijas en el incumbente."""
+    x_inc, vecindad, timelimit, mipgap = args
+    resultado = solve_fixed(_IR, x_inc, _free_x(_IR, vecindad), timelimit, mipgap, w_x=_W_X)
+    resultado['vecindad'] = vecindad
+    return resultado
+
+
+def box_families(ir, tamano):
+    """
+    Para cada caja, las `tamano` cajas más parecidas (Jaccard de las máquinas
+    compatibles, según los dominios de la IR), incluida ella misma.
+    """
+    nM, nB = len(ir.M), len(ir.B)
+    compat = np.zeros((nM, nB), dtype=bool)
+    compat[ir.x_m, ir.x_b] = True
+    inter = compat.T.astype(float) @ compat.astype(float)
+    union = compat.sum(axis=0)[:, None] + compat.sum(axis=0)[None, :] - inter
+    jaccard = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    np.fill_diagonal(jaccard, 2.0)    # la propia caja siempre primero
+    return np.argsort(-jaccard, axis=1, kind="stable")[:, :tamano]
+
+
+def _neighborhoods(ir, n, fraccion, rng, tipos, familias):
+    """Genera n vecindarios alternando los tipos pedidos."""
+    nM, nD, nB = len(ir.M), len(ir.D), len(ir.B)
+    vecindades = []
+    for i in range(n):
+        tipo = tipos[i % len(tipos)]
+        if tipo == "maquinas":
+            k = min(nM, max(2, math.ceil(fraccion * nM)))
+            vecindades.append((tipo, np.sort(rng.choice(nM, size=k, replace=False))))
+        elif tipo == "dia":
+            k = min(nD, max(1, math.ceil(fraccion * nD)))
+            vecindades.append((tipo, np.sort(rng.choice(nD, size=k, replace=False))))
+        else:
+            k = min(nB, max(2, math.ceil(fraccion * nB)))
+            vecindades.append((tipo, np.sort(familias[rng.integers(nB), :k])))
+    return vecindades
+
+
+def solve_lns(params, timelimit=DEFAULT_TIMELIMIT, sub_timelimit=10, max_workers=None,
+              vecindades=VECINDADES, fraccion=0.2, fraccion_max=0.6, mipgap_sub=0.0,
+              inicial=None, seed=0, progress_callback=None, cancel_event=None, **build_kwargs):
+    """
+    LNS alrededor de la IR de `build_model`.
+
+    `inicial` es un `SolveResult` con plan; si no se entrega se usa el plan
+    greedy y, si éste no cubre la demanda, una resolución monolítica con HiGHS
+    de `sub_timelimit` segundos. `fraccion` es la fracción de máquinas, días
+    o cajas que libera cada vecindario; crece ×1.5 (hasta `fraccion_max`)
+    tras una ronda sin mejora. Cada ronda evalúa `max_workers` vecindarios en
+    paralelo (por defecto, un proceso por núcleo). `progress_callback` recibe
+    cada punto de la curva.
+
+    Retorna (result, curva): el mejor plan como `SolveResult` y un DataFrame
+    con tiempo_s, objetivo, ronda, vecindario y columnas del sub-MIP de cada
+    mejora (la primera fila es el plan inicial, con las columnas de la IR).
+    """
+    import os
+
+    build_kwargs.pop('fast', None)
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    ir = build_ir(**params, **build_kwargs)
+    build_time = time.perf_counter() - t0
+
+    if inicial is None or not inicial.has_solution:
+        inicial = greedy_result(params, **build_kwargs)
+    if not inicial.has_solution:
+        inicial = get_backend("highs").solve(params, timelimit=sub_timelimit, heuristic=False,
+                                             **build_kwargs)
+    if not inicial.has_solution:
+        return SolveResult(inicial.status, solve_time=time.perf_counter() - t0, build_time=build_time,
+                           backend="lns", status_string="LNS: sin plan inicial"), pd.DataFrame()
+
+    x_keys, T_keys = ir.x_keys(), ir.T_keys()
+    x_inc = np.array([round(inicial.values['x'].get(k, 0.0)) for k in x_keys], dtype=np.int8)
+    valores = {p: dict(inicial.values[p]) for p in ('x', 'y', 'T')}
+    objetivo = sum(inicial.values['T'].get(k, 0.0) for k in T_keys)
+    curva = [{'tiempo_s': time.perf_counter() - t0, 'objetivo': objetivo, 'ronda': 0,
+              'vecindario': inicial.backend, 'columnas_sub': ir.shape[1]}]
+    if progress_callback is not None:
+        progress_callback(dict(curva[-1]))
+
+    tipos = [v for v in VECINDADES if v in vecindades]
+    familias = box_families(ir, len(ir.B)) if "familia" in tipos else None
+    max_workers = max_workers or os.cpu_count() or 1
+    limite = t0 + timelimit
+    ronda = 0
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(params, build_kwargs)) as executor:
+        while objetivo > 1e-9:
+            restante = limite - time.perf_counter()
+            if restante <= 0.5 or (cancel_event is not None and cancel_event.is_set()):
+                break
+            ronda += 1
+            lote = _neighborhoods(ir, max_workers, fraccion, rng, tipos, familias)
+            args = [(x_inc, v, min(sub_timelimit, restante), mipgap_sub) for v in lote]
+            resultados = [r for r in executor.map(_solve_neighborhood, args)
+                          if r['objetivo'] is not None]
+            mejor = min(resultados, key=lambda r: r['objetivo'], default=None)
+            if mejor is None or mejor['objetivo'] >= objetivo - 1e-6:
+                fraccion = min(fraccion * 1.5, fraccion_max)
+                continue
+
+            v = np.zeros(ir.shape[1])
+            v[:ir.n_x] = x_inc
+            v[mejor['columnas']] = mejor['valores']
+            valores = ir.split_solution(v)
+            x_inc = np.round(v[:ir.n_x]).astype(np.int8)
+            objetivo = mejor['objetivo']
+            curva.append({'tiempo_s': time.perf_counter() - t0, 'objetivo': objetivo, 'ronda': ronda,
+                          'vecindario': mejor['vecindad'][0], 'columnas_sub': mejor['n_columnas']})
+            if progress_callback is not None:
+                progress_callback(dict(curva[-1]))
+
+    total = time.perf_counter() - t0
+    result = SolveResult('optimal' if objetivo <= 1e-9 else 'feasible', objective=objetivo,
+                         values=valores, solve_time=total - build_time, build_time=build_time,
+                         backend="lns", status_string=f"LNS: {ronda} rondas",
+                         first_incumbent_time=curva[0]['tiempo_s'])
+    return result, pd.DataFrame(curva)
+
+
+def curve_at(curva, tiempos):
+    """Mejor objetivo de la curva alcanzado hasta cada tiempo (None si aún no hay)."""
+    salida = []
+    for t in tiempos:
+        hasta = curva[curva['tiempo_s'] <= t]
+        salida.append(float(hasta['objetivo'].min()) if len(hasta) else None)
+    return salida
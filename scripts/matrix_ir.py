@@ -0,0 +1,631 @@
+"""
+Representación matricial (IR) del modelo de cajas.
+
+`build_ir` arma la misma formulación que `build_model` (dominios dispersos,
+R1–R6 y objetivo) como una matriz dispersa A con cotas por fila y columna,
+integralidad y vector objetivo, usando aritmética de índices NumPy en vez de
+sumas Python sobre diccionarios con claves tupla.
+
+Orden de columnas: [x | y | T | w]. x e y comparten claves (m,b,d,t,s) en el
+mismo orden que `build_model`, por lo que los nombres coinciden con los de
+docplex ("x_M1_CAJA_1_1_1").
+
+La IR se puede guardar en .npz (`save_npz`/`load_npz`, sin pickle) y cargar
+en docplex en bloque (`to_docplex`). `IRSetup` (parámetros densos, slots,
+dominios y R1) y `RowBlocks` (armado de filas) los comparten `build_ir` y las
+formulaciones de scripts/pools.py y scripts/patterns.py.
+"""
+
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from scripts.model import align_Tturn, machine_classes, segment_lengths
+
+INF = np.inf
+
+
+class ModelIR:
+    """Formulación en forma matricial: row_lb <= A·v <= row_ub, col_lb <= v <= col_ub."""
+
+    def __init__(self, A, row_lb, row_ub, col_lb, col_ub, integrality, c,
+                 M, B, D, S_segmentos, slot_d, slot_t,
+                 x_m, x_slot, x_b, x_s, T_m, T_slot,
+                 w_m, w_slot, w_b1, w_b2, row_family, w_s=None):
+        self.A = A
+        self.row_lb = row_lb
+        self.row_ub = row_ub
+        self.col_lb = col_lb
+        self.col_ub = col_ub
+        self.integrality = integrality
+        self.c = c
+        # Conjuntos e índices de columnas
+        self.M = list(M)
+        self.B = list(B)
+        self.D = list(D)
+        self.S_segmentos = list(S_segmentos)
+        self.slot_d = slot_d          # índice en D de cada slot (d,t)
+        self.slot_t = slot_t          # turno t de cada slot
+        self.x_m, self.x_slot, self.x_b, self.x_s = x_m, x_slot, x_b, x_s
+        self.T_m, self.T_slot = T_m, T_slot
+        self.w_m, self.w_slot, self.w_b1, self.w_b2 = w_m, w_slot, w_b1, w_b2
+        # índice en S del segmento de origen de cada w (transición s -> s+1)
+        self.w_s = np.zeros(len(w_m), dtype=np.int64) if w_s is None else w_s
+        self.row_family = row_family  # código de familia por fila (ver FAMILIAS)
+
+    # --- tamaños y offsets de bloques ---
+    @property
+    def n_x(self):
+        return len(self.x_m)
+
+    @property
+    def n_T(self):
+        return len(self.T_m)
+
+    @property
+    def n_w(self):
+        return len(self.w_m)
+
+    @property
+    def offsets(self):
+        """Inicio de cada bloque de columnas: {'x','y','T','w'}."""
+        nx, nT = self.n_x, self.n_T
+        return {'x': 0, 'y': nx, 'T': 2 * nx, 'w': 2 * nx + nT}
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    # --- claves Python equivalentes a las de build_model ---
+    def x_keys(self):
+        D, M, B, S = self.D, self.M, self.B, self.S_segmentos
+        return [
+            (M[m], B[b], D[self.slot_d[k]], int(self.slot_t[k]), S[s])
+            for m, k, b, s in zip(self.x_m, self.x_slot, self.x_b, self.x_s)
+        ]
+
+    def T_keys(self):
+        return [
+            (self.M[m], self.D[self.slot_d[k]], int(self.slot_t[k]))
+            for m, k in zip(self.T_m, self.T_slot)
+        ]
+
+    def w_keys(self):
+        # Con 2 segmentos (m,b1,b2,d,t); con más se agrega el segmento de origen
+        D, M, B, S = self.D, self.M, self.B, self.S_segmentos
+        claves = [
+            (M[m], B[b1], B[b2], D[self.slot_d[k]], int(self.slot_t[k]))
+            for m, k, b1, b2 in zip(self.w_m, self.w_slot, self.w_b1, self.w_b2)
+        ]
+        if len(S) <= 2:
+            return claves
+        return [clave + (S[s],) for clave, s in zip(claves, self.w_s)]
+
+    def col_names(self):
+        """Nombres de columnas con la convención de docplex (prefijo_clave)."""
+        def fmt(prefix, keys):
+            return [prefix + "_" + "_".join(str(k) for k in key) for key in keys]
+        xk = self.x_keys()
+        return fmt("x", xk) + fmt("y", xk) + fmt("T", self.T_keys()) + fmt("w", self.w_keys())
+
+    def split_solution(self, values):
+        """Separa un vector solución en diccionarios {clave: valor} para x, y, T."""
+        values = np.asarray(values, dtype=float)
+        off = self.offsets
+        xk = self.x_keys()
+        return {
+            'x': dict(zip(xk, values[off['x']:off['y']].tolist())),
+            'y': dict(zip(xk, values[off['y']:off['T']].tolist())),
+            'T': dict(zip(self.T_keys(), values[off['T']:off['w']].tolist())),
+        }
+
+
+FAMILIAS = ['R1_dem', 'R2_time', 'R3_link', 'R4_oneType', 'R5_order',
+            'R6_w_le_s1', 'R6_w_le_s2', 'R6_w_ge_summinus1', 'R6_T_def', 'R7_sym',
+            'R6_flow_out', 'R6_flow_in']
+
+
+def w_x_columns(ir):
+    """Columnas x(m,b1,d,t,s) y x(m,b2,d,t,s+1) de cada w de la IR."""
+    nK, nB, nS = len(ir.slot_d), len(ir.B), len(ir.S_segmentos)
+
+    def pos(m, k, b, s):
+        return ((m * nK + k) * nB + b) * nS + s
+
+    # x va en orden (m,k,b,s): sus códigos son crecientes
+    codigos = pos(ir.x_m, ir.x_slot, ir.x_b, ir.x_s)
+    x1 = np.searchsorted(codigos, pos(ir.w_m, ir.w_slot, ir.w_b1, ir.w_s))
+    x2 = np.searchsorted(codigos, pos(ir.w_m, ir.w_slot, ir.w_b2, ir.w_s + 1))
+    return x1, x2
+
+
+def solve_fixed(ir, x_inc, libre, timelimit, mipgap=0.0, w_x=None):
+    """
+    Sub-MIP de la IR con las x fuera de `libre` fijas en `x_inc` (HiGHS).
+
+    Sólo conserva las columnas que pueden moverse: x libres, y de las x
+    libres o en 1, todas las T y las w cuyas dos x pueden valer 1; las filas
+    sin columnas conservadas se descartan (o, si no se cumplen con las x
+    fijas, no hay solución). `w_x` son las columnas x de cada w (ver
+    `w_x_columns`); se calculan si no se entregan. Lo usan el LNS
+    (scripts/lns.py) y la replanificación (scripts/replan.py).
+
+    Retorna un dict con 'objetivo' (None si no hay solución), 'optimo' (el
+    sub-MIP cerró el gap pedido), 'columnas' y 'valores' (columnas
+    conservadas de la IR y su valor), 'n_columnas', 'n_filas' y 'tiempo'.
+    """
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    t0 = time.perf_counter()
+    w_x1, w_x2 = w_x_columns(ir) if w_x is None else w_x
+    nx = ir.n_x
+    en_cero = ~libre & (x_inc == 0)
+    keep = np.concatenate([
+        libre,
+        libre | (x_inc == 1),
+        np.ones(ir.n_T, dtype=bool),
+        ~(en_cero[w_x1] | en_cero[w_x2]),
+    ])
+    fijo = np.zeros(ir.shape[1])
+    fijo[:nx] = np.where(libre, 0.0, x_inc)
+    desplazamiento = ir.A @ fijo
+
+    A = ir.A[:, keep].tocsr()
+    filas = np.diff(A.indptr) > 0
+    # Una fila sin columnas conservadas queda fija: si no se cumple con las x
+    # fijas (p. ej. demanda nueva de una caja sin x en 1), la fijación es infactible
+    lb, ub = ir.row_lb - desplazamiento, ir.row_ub - desplazamiento
+    if np.any((lb[~filas] > 1e-6) | (ub[~filas] < -1e-6)):
+        return {'objetivo': None, 'n_columnas': int(keep.sum()), 'n_filas': int(filas.sum()),
+                'tiempo': time.perf_counter() - t0}
+    res = milp(
+        c=ir.c[keep],
+        integrality=ir.integrality[keep],
+        bounds=Bounds(ir.col_lb[keep], ir.col_ub[keep]),
+        constraints=LinearConstraint(A[filas], lb[filas], ub[filas]) if filas.any() else None,
+        options={'time_limit': float(timelimit), 'mip_rel_gap': float(mipgap)},
+    )
+    if res.x is None:
+        return {'objetivo': None, 'n_columnas': int(keep.sum()), 'n_filas': int(filas.sum()),
+                'tiempo': time.perf_counter() - t0}
+    return {
+        'objetivo': float(res.fun),
+        'optimo': bool(res.status == 0),
+        'columnas': np.flatnonzero(keep).astype(np.int64),
+        'valores': np.where(ir.integrality[keep] == 1, np.round(res.x), res.x),
+        'n_columnas': int(keep.sum()),
+        'n_filas': int(filas.sum()),
+        'tiempo': time.perf_counter() - t0,
+    }
+
+
+class IRSetup:
+    """
+    Preparación común de las IR matriciales (`build_ir` y las formulaciones
+    de scripts/pools.py y scripts/patterns.py), con los mismos argumentos
+    que `build_model`: parámetros como arreglos densos, slots (d,t) con sus
+    horas y largos de segmento, dominios dispersos y las filas R1. Un cambio
+    en R1 o en los segmentos se hace sólo aquí.
+    """
+
+    def __init__(self, M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem, Tturn,
+                 enforce_tipo=True, Tseg=None, restrict_w_by_tipo=True):
+        self.M, self.B, self.D = list(M), list(B), list(D)
+        self.S_segmentos = list(S_segmentos)
+        M, B, D = self.M, self.B, self.D
+        nM, nB, nD, nS = len(M), len(B), len(D), len(S_segmentos)
+        self.Tturn = align_Tturn(T_turnos, Tturn, default_hours=8.0)
+        self.seg_len = segment_lengths(D, T_turnos, S_segmentos, self.Tturn, Tseg)
+
+        # --- Parámetros como arreglos densos ---
+        self.prod = np.array([[Prod.get((m, b), 0.0) for b in B] for m in M], dtype=float).reshape(nM, nB)
+        self.tipo_ok = np.array([[Tipo.get((m, b), 0) == 1 for b in B] for m in M], dtype=bool).reshape(nM, nB)
+        self.compat = self.tipo_ok if enforce_tipo else self.prod > 0
+        self.disp = np.array([[Disp[(m, d)] for d in D] for m in M], dtype=float).reshape(nM, nD)
+        self.dem = np.array([[Dem.get((d, b), 0.0) for b in B] for d in D], dtype=float).reshape(nD, nB)
+
+        self.b_pos = {b: j for j, b in enumerate(B)}
+        self.m_pos = {m: i for i, m in enumerate(M)}
+        self.setup_val = np.zeros((nM, nB, nB))
+        self.setup_has = np.zeros((nM, nB, nB), dtype=bool)
+        for (m, b1, b2), h in Setup.items():
+            i, j1, j2 = self.m_pos.get(m), self.b_pos.get(b1), self.b_pos.get(b2)
+            if i is None or j1 is None or j2 is None:
+                continue
+            self.setup_val[i, j1, j2] = h
+            self.setup_has[i, j1, j2] = True
+        # Pares con w en build_model: setup definido y no trivial, y (con
+        # restrict_w_by_tipo) ambos tipos asignables. pair_cost = setup_cost
+        eye = np.eye(nB, dtype=bool)
+        self.pair_ok = self.setup_has & ~(eye[None, :, :] & (self.setup_val <= 1e-9))
+        if restrict_w_by_tipo:
+            self.pair_ok &= self.tipo_ok[:, :, None] & self.tipo_ok[:, None, :]
+        self.pair_cost = np.where(self.pair_ok, self.setup_val, 0.0)
+
+        # --- Slots (d,t): horas y largo de cada segmento ---
+        slots = [(k, d, t) for k, d in enumerate(D) for t in T_turnos.get(d, [])]
+        self.slot_d = np.array([k for k, _, _ in slots], dtype=np.int64)
+        self.slot_t = np.array([t for _, _, t in slots], dtype=np.int64)
+        self.slot_index = {(d, t): i for i, (_, d, t) in enumerate(slots)}
+        nK = len(slots)
+        self.hours = np.array([self.Tturn[(d, t)] for _, d, t in slots], dtype=float)
+        self.seg = np.array([[self.seg_len[(d, t, s)] for s in S_segmentos] for _, d, t in slots],
+                            dtype=float).reshape(nK, nS)
+
+        # --- Dominios dispersos ---
+        # allowed[m,k,b]: máquina disponible, caja compatible y con demanda ese día
+        self.allowed = (self.compat[:, None, :]
+                        & (self.dem[self.slot_d, :] > 0)[None, :, :]
+                        & (self.disp[:, self.slot_d] > 0)[:, :, None])
+        self.T_m, self.T_slot = np.nonzero(self.allowed.any(axis=2))     # (m,k) con variables
+        self.T_idx = -np.ones((nM, nK), dtype=np.int64)
+        self.T_idx[self.T_m, self.T_slot] = np.arange(len(self.T_m))
+
+        # --- R1: una fila por (d,b) con Dem > 0 ---
+        self.dem_d, self.dem_b = np.nonzero(self.dem > 0)
+        self.R1_idx = -np.ones((nD, nB), dtype=np.int64)
+        self.R1_idx[self.dem_d, self.dem_b] = np.arange(len(self.dem_d))
+
+    def add_demand_rows(self, filas, dia, caja, cols, coefs):
+        """
+        Agrega R1 a `filas` (RowBlocks): por cada (d,b) con demanda, la suma
+        de coefs·columna de las entradas (dia, caja) va en el rango
+        [Dem, Dem·(1+1e-6)]. `dia` es el índice en D de cada entrada.
+        """
+        rhs = self.dem[self.dem_d, self.dem_b]
+        filas.add(self.R1_idx[dia, caja], cols, coefs, rhs, rhs * (1 + 1e-6), 'R1_dem')
+
+
+def concat(parts, dtype):
+    """Concatena bloques de arreglos (vacío si no hay bloques)."""
+    return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+
+class RowBlocks:
+    """
+    Acumula bloques de filas (filas, columnas, coeficientes, cotas y familia)
+    y arma la matriz dispersa al final. `familias` es la lista de nombres de
+    familia; `row_family` guarda el índice en ella.
+    """
+
+    def __init__(self, familias):
+        self.familias = familias
+        self.rows, self.cols, self.vals = [], [], []
+        self.row_lb, self.row_ub, self.fam = [], [], []
+        self.n_rows = 0
+
+    def add(self, r, cc, v, lb, ub, family):
+        """Bloque de len(lb) filas nuevas; `r` es la fila de cada entrada, relativa al bloque."""
+        self.rows.append(r + self.n_rows)
+        self.cols.append(cc)
+        self.vals.append(v)
+        self.row_lb.append(lb)
+        self.row_ub.append(ub)
+        self.fam.append(np.full(len(lb), self.familias.index(family), dtype=np.int8))
+        self.n_rows += len(lb)
+
+    def build(self, n_cols):
+        """Retorna (A, row_lb, row_ub, row_family) con A en CSR."""
+        A = sp.csr_matrix(
+            (concat(self.vals, float), (concat(self.rows, np.int64), concat(self.cols, np.int64))),
+            shape=(self.n_rows, n_cols)
+        )
+        return A, concat(self.row_lb, float), concat(self.row_ub, float), concat(self.fam, np.int8)
+
+
+def build_ir(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    enforce_tipo=True,
+    Tseg=None,
+    restrict_w_by_tipo=True,
+    symmetry_breaking=False,
+    setup_formulation="mccormick"
+):
+    """
+    Construye la IR matricial con los mismos argumentos que `build_model`.
+
+    R1_dem y R1_dem_ub se representan como una sola fila con rango
+    [Dem, Dem·(1+1e-6)]. R7_sym se escribe como fila "<=":
+    sum y[m_(i+1)] - sum y[m_i] <= 0. Con setup_formulation="flow" la
+    entrada de R6 también va como "<=": x[b2,s+1] - sum w - sum x[b1,s] <= 0.
+    """
+    if setup_formulation not in ("mccormick", "flow"):
+        raise ValueError(f"setup_formulation desconocida: {setup_formulation!r}. Usa 'mccormick' o 'flow'.")
+    # --- 0) Parámetros densos, slots y dominios (ver IRSetup) ---
+    base = IRSetup(M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem, Tturn,
+                   enforce_tipo=enforce_tipo, Tseg=Tseg, restrict_w_by_tipo=restrict_w_by_tipo)
+    M, B, D = base.M, base.B, base.D
+    nM, nB, nS = len(M), len(B), len(S_segmentos)
+    nR = max(nS - 1, 0)                  # transiciones s -> s+1 por turno
+    prod, disp, setup_val, m_pos = base.prod, base.disp, base.setup_val, base.m_pos
+    slot_d, slot_t, hours, seg = base.slot_d, base.slot_t, base.hours, base.seg
+    allowed, T_m, T_slot, T_idx = base.allowed, base.T_m, base.T_slot, base.T_idx
+    nK, nT = len(slot_d), len(T_m)
+
+    # --- 1) Columnas x y w ---
+    xm, xk, xb = np.nonzero(allowed)                      # orden (m,k,b)
+    nxb = len(xm)
+    x_m = np.repeat(xm, nS)
+    x_slot = np.repeat(xk, nS)
+    x_b = np.repeat(xb, nS)
+    x_s = np.tile(np.arange(nS), nxb)
+    nx = len(x_m)
+
+    # w[m,k,b1,b2,s]: ambos tipos asignables y par con w (IRSetup.pair_ok),
+    # uno por transición s -> s+1 (orden (m,k,b1,b2,s))
+    wm, wk, wb1, wb2 = (np.repeat(v, nR) for v in np.nonzero(
+        allowed[:, :, :, None] & allowed[:, :, None, :] & base.pair_ok[:, None, :, :]
+    ))
+    nw = len(wm)
+    ws = np.tile(np.arange(nR), nw // nR if nR else 0)
+
+    # --- 2) Columnas ---
+    off_y, off_T, off_w = nx, 2 * nx, 2 * nx + nT
+    n_cols = off_w + nw
+    col_lb = np.zeros(n_cols)
+    col_ub = np.full(n_cols, INF)
+    col_ub[:nx] = 1.0
+    col_ub[off_w:] = 1.0
+    integrality = np.zeros(n_cols, dtype=np.int8)
+    integrality[:nx] = 1
+    c = np.zeros(n_cols)
+    c[off_T:off_w] = 1.0
+
+    # posición de x(m,k,b,s) por (m,k,b) y s
+    xb_base = np.full((nM, nK, nB), -1, dtype=np.int64)
+    xb_base[xm, xk, xb] = np.arange(nxb) * nS
+
+    filas = RowBlocks(FAMILIAS)
+
+    # --- 3) R1: demanda por (d,b) con Dem > 0 (fila con rango) ---
+    base.add_demand_rows(filas, slot_d[x_slot], x_b, off_y + np.arange(nx), prod[x_m, x_b])
+
+    # --- 4) R2: sum y + T <= Tturn·Disp por (m,d,t) ---
+    r2 = T_idx[x_m, x_slot]
+    filas.add(np.concatenate([r2, np.arange(nT)]),
+              np.concatenate([off_y + np.arange(nx), off_T + np.arange(nT)]),
+              np.ones(nx + nT),
+              np.full(nT, -INF), hours[T_slot] * disp[T_m, slot_d[T_slot]], 'R2_time')
+
+    # --- 5) R3: y - seg_len·x <= 0 ---
+    filas.add(np.concatenate([np.arange(nx), np.arange(nx)]),
+              np.concatenate([off_y + np.arange(nx), np.arange(nx)]),
+              np.concatenate([np.ones(nx), -seg[x_slot, x_s]]),
+              np.full(nx, -INF), np.zeros(nx), 'R3_link')
+
+    # --- 6) R4: sum_b x <= 1 por (m,d,t,s) ---
+    filas.add(T_idx[x_m, x_slot] * nS + x_s, np.arange(nx), np.ones(nx),
+              np.full(nT * nS, -INF), np.ones(nT * nS), 'R4_oneType')
+
+    # --- 7) R5: sum_b x[s+1] - sum_b x[s] <= 0 por (m,d,t) y transición ---
+    sig, ant = x_s >= 1, x_s < nS - 1
+    filas.add(np.concatenate([T_idx[x_m[sig], x_slot[sig]] * nR + x_s[sig] - 1,
+                              T_idx[x_m[ant], x_slot[ant]] * nR + x_s[ant]]),
+              np.concatenate([np.flatnonzero(sig), np.flatnonzero(ant)]),
+              np.concatenate([np.ones(sig.sum()), -np.ones(ant.sum())]),
+              np.full(nT * nR, -INF), np.zeros(nT * nR), 'R5_order')
+
+    # --- 8) R6: linealización de w y definición de T ---
+    x1 = xb_base[wm, wk, wb1] + ws       # x(m,b1,d,t,s)
+    x2 = xb_base[wm, wk, wb2] + ws + 1   # x(m,b2,d,t,s+1)
+    w_cols = off_w + np.arange(nw)
+    ar = np.arange(nw)
+    if setup_formulation == "mccormick":
+        filas.add(np.concatenate([ar, ar]), np.concatenate([w_cols, x1]),
+                  np.concatenate([np.ones(nw), -np.ones(nw)]),
+                  np.full(nw, -INF), np.zeros(nw), 'R6_w_le_s1')
+        filas.add(np.concatenate([ar, ar]), np.concatenate([w_cols, x2]),
+                  np.concatenate([np.ones(nw), -np.ones(nw)]),
+                  np.full(nw, -INF), np.zeros(nw), 'R6_w_le_s2')
+        filas.add(np.concatenate([ar, ar, ar]), np.concatenate([x1, x2, w_cols]),
+                  np.concatenate([np.ones(nw), np.ones(nw), -np.ones(nw)]),
+                  np.full(nw, -INF), np.ones(nw), 'R6_w_ge_summinus1')
+    else:
+        # Flujo s -> s+1 por (m,d,t) (ver build_model): una fila de salida
+        # por caja b1 y una de entrada por caja b2 con pares w, por transición
+        tw = T_idx[wm, wk] * nR + ws
+        out_keys, out_pos = np.unique(tw * nB + wb1, return_inverse=True)
+        n_out = len(out_keys)
+        out_t, out_b = out_keys // nB // nR, out_keys % nB
+        out_s = out_keys // nB % nR
+        filas.add(np.concatenate([out_pos, np.arange(n_out)]),
+                  np.concatenate([w_cols, xb_base[T_m[out_t], T_slot[out_t], out_b] + out_s]),
+                  np.concatenate([np.ones(nw), -np.ones(n_out)]),
+                  np.full(n_out, -INF), np.zeros(n_out), 'R6_flow_out')
+
+        in_keys, in_pos = np.unique(tw * nB + wb2, return_inverse=True)
+        n_in = len(in_keys)
+        in_t, in_b = in_keys // nB // nR, in_keys % nB
+        in_s = in_keys // nB % nR
+        in_m, in_k = T_m[in_t], T_slot[in_t]
+        # b1 asignables en s sin variable w hacia b2 (par sin setup)
+        con_w = np.zeros((n_in, nB), dtype=bool)
+        con_w[in_pos, wb1] = True
+        libre_r, libre_b1 = np.nonzero(allowed[in_m, in_k, :] & ~con_w)
+        filas.add(np.concatenate([np.arange(n_in), in_pos, libre_r]),
+                  np.concatenate([xb_base[in_m, in_k, in_b] + in_s + 1, w_cols,
+                                  xb_base[in_m[libre_r], in_k[libre_r], libre_b1] + in_s[libre_r]]),
+                  np.concatenate([np.ones(n_in), -np.ones(nw), -np.ones(len(libre_r))]),
+                  np.full(n_in, -INF), np.zeros(n_in), 'R6_flow_in')
+
+    ms_w = T_idx[wm, wk]
+    ms_rows, ms_pos = np.unique(ms_w, return_inverse=True)
+    filas.add(np.concatenate([ms_pos, np.arange(len(ms_rows))]),
+              np.concatenate([w_cols, off_T + ms_rows]),
+              np.concatenate([setup_val[wm, wb1, wb2], -np.ones(len(ms_rows))]),
+              np.full(len(ms_rows), -INF), np.zeros(len(ms_rows)), 'R6_T_def')
+
+    # --- 9) R7: ruptura de simetría entre máquinas equivalentes ---
+    if symmetry_breaking:
+        # las columnas y de cada (m,k) son contiguas (orden (m,k,b,s))
+        y_count = np.bincount(T_idx[x_m, x_slot], minlength=nT)
+        y_start = np.concatenate([[0], np.cumsum(y_count)[:-1]])
+        pares = []
+        for d, clases in machine_classes(M, B, D, Prod, Tipo, Setup, Disp).items():
+            ks = np.flatnonzero(slot_d == D.index(d))
+            for ms in clases:
+                idx = [m_pos[m] for m in ms]
+                for i, j in zip(idx, idx[1:]):
+                    for k in ks:
+                        if T_idx[i, k] >= 0 and T_idx[j, k] >= 0:
+                            pares.append((T_idx[i, k], T_idx[j, k]))
+        pares = np.array(pares, dtype=np.int64).reshape(-1, 2)
+        n7 = len(pares)
+        r7, c7, v7 = [], [], []
+        for lado, coef in ((0, -1.0), (1, 1.0)):
+            cnt = y_count[pares[:, lado]]
+            r7.append(np.repeat(np.arange(n7), cnt))
+            base = np.repeat(y_start[pares[:, lado]] - np.cumsum(cnt) + cnt, cnt)
+            c7.append(off_y + base + np.arange(cnt.sum()))
+            v7.append(np.full(cnt.sum(), coef))
+        filas.add(np.concatenate(r7), np.concatenate(c7), np.concatenate(v7),
+                  np.full(n7, -INF), np.zeros(n7), 'R7_sym')
+
+    A, row_lb, row_ub, row_family = filas.build(n_cols)
+    return ModelIR(
+        A=A, row_lb=row_lb, row_ub=row_ub,
+        col_lb=col_lb, col_ub=col_ub, integrality=integrality, c=c,
+        M=M, B=B, D=D, S_segmentos=S_segmentos, slot_d=slot_d, slot_t=slot_t,
+        x_m=x_m, x_slot=x_slot, x_b=x_b, x_s=x_s, T_m=T_m, T_slot=T_slot,
+        w_m=wm, w_slot=wk, w_b1=wb1, w_b2=wb2, w_s=ws,
+        row_family=row_family,
+    )
+
+
+# -------- Serialización .npz --------
+_ARRAYS = ['row_lb', 'row_ub', 'col_lb', 'col_ub', 'integrality', 'c',
+           'slot_d', 'slot_t', 'x_m', 'x_slot', 'x_b', 'x_s', 'T_m', 'T_slot',
+           'w_m', 'w_slot', 'w_b1', 'w_b2', 'w_s', 'row_family']
+
+
+def save_npz(ir, path):
+    """Guarda la IR en un .npz comprimido (sin objetos pickle)."""
+    A = ir.A.tocsr()
+    np.savez_compressed(
+        path,
+        A_data=A.data, A_indices=A.indices, A_indptr=A.indptr, A_shape=np.array(A.shape),
+        M=np.array(ir.M, dtype=str), B=np.array(ir.B, dtype=str),
+        D=np.array(ir.D), S_segmentos=np.array(ir.S_segmentos),
+        **{k: getattr(ir, k) for k in _ARRAYS}
+    )
+
+
+def load_npz(path):
+    """Carga una IR guardada con `save_npz`."""
+    with np.load(path, allow_pickle=False) as z:
+        A = sp.csr_matrix((z['A_data'], z['A_indices'], z['A_indptr']), shape=tuple(z['A_shape']))
+        return ModelIR(
+            A=A,
+            M=z['M'].tolist(), B=z['B'].tolist(), D=z['D'].tolist(),
+            S_segmentos=z['S_segmentos'].tolist(),
+            # las IR guardadas antes de admitir |S| > 2 no traen w_s
+            **{k: z[k] for k in _ARRAYS if k in z}
+        )
+
+
+# -------- Carga en docplex --------
+def _add_matrix_rows(mdl, ir, all_vars):
+    """Filas "<=" y filas con rango (R1) cargadas directamente desde la matriz."""
+    A = ir.A.tocsr()
+    ranged = np.isfinite(ir.row_lb)
+    le_rows = np.nonzero(~ranged)[0]
+    rg_rows = np.nonzero(ranged)[0]
+    if len(le_rows):
+        mdl.add_constraints(mdl.matrix_constraints(A[le_rows], all_vars, ir.row_ub[le_rows], sense='le'))
+    if len(rg_rows):
+        mdl.add_constraints(mdl.matrix_ranges(A[rg_rows], all_vars, ir.row_lb[rg_rows], ir.row_ub[rg_rows]))
+
+
+def to_docplex(ir, name="Optimizacion_Cajas", checker="off"):
+    """
+    Carga la IR en un modelo docplex en bloque.
+
+    Retorna la misma tupla que `build_model`: (mdl, x, y, Tsetup, S_segmentos),
+    con x/y/Tsetup como diccionarios de variables indexados por clave tupla.
+    """
+    from docplex.mp.advmodel import AdvModel
+
+    mdl = AdvModel(name=name, checker=checker)
+    names = ir.col_names()
+    off = ir.offsets
+    nx, nT, nw = ir.n_x, ir.n_T, ir.n_w
+
+    xv = mdl.binary_var_list(nx, name=names[:nx])
+    yv = mdl.continuous_var_list(nx, lb=0, name=names[off['y']:off['T']])
+    Tv = mdl.continuous_var_list(nT, lb=0, name=names[off['T']:off['w']])
+    wv = mdl.continuous_var_list(nw, lb=0, ub=1, name=names[off['w']:])
+    all_vars = xv + yv + Tv + wv
+
+    _add_matrix_rows(mdl, ir, all_vars)
+    mdl.minimize(mdl.sum_vars(Tv))
+
+    xk = ir.x_keys()
+    x = dict(zip(xk, xv))
+    y = dict(zip(xk, yv))
+    Tsetup = dict(zip(ir.T_keys(), Tv))
+    return mdl, x, y, Tsetup, ir.S_segmentos
+
+
+def matrix_to_docplex(ir, name, nombres=("v", "h"), checker="off"):
+    """
+    Carga en docplex cualquier formulación matricial con las columnas enteras
+    primero (pools, patrones): enteras `nombres[0]` y continuas `nombres[1]`,
+    con las cotas y el costo de la IR. Retorna (mdl, variables).
+    """
+    from docplex.mp.advmodel import AdvModel
+
+    n_int = int(np.count_nonzero(ir.integrality))
+    if not ir.integrality[:n_int].all():
+        raise ValueError("matrix_to_docplex espera las columnas enteras al principio.")
+    mdl = AdvModel(name=name, checker=checker)
+    lb, ub = ir.col_lb.tolist(), ir.col_ub.tolist()
+    enteras = mdl.integer_var_list(n_int, lb=lb[:n_int], ub=ub[:n_int], name=nombres[0])
+    continuas = mdl.continuous_var_list(ir.shape[1] - n_int, lb=lb[n_int:], ub=ub[n_int:],
+                                        name=nombres[1])
+    all_vars = enteras + continuas
+    _add_matrix_rows(mdl, ir, all_vars)
+    con_costo = np.flatnonzero(ir.c)
+    mdl.minimize(mdl.scal_prod([all_vars[j] for j in con_costo], ir.c[con_costo]))
+    return mdl, all_vars
+
+
+def solve_matrix_cplex(ir, timelimit, mipgap, log_output=False, progress_callback=None,
+                       cancel_event=None, **docplex_kwargs):
+    """
+    Resuelve con CPLEX una formulación matricial (ver `matrix_to_docplex`,
+    que recibe `docplex_kwargs`) y devuelve un `SolveResult` con x/y/T de
+    `ir.split_solution`, con las columnas enteras redondeadas.
+    """
+    import time
+
+    from scripts.solvers import SolveResult, SolverProgressListener, _status_from_docplex
+
+    if cancel_event is not None and cancel_event.is_set():
+        return SolveResult('cancelled', backend="cplex")
+
+    mdl, all_vars = matrix_to_docplex(ir, **docplex_kwargs)
+    mdl.parameters.timelimit = timelimit
+    mdl.parameters.mip.tolerances.mipgap = mipgap
+    if progress_callback is not None or cancel_event is not None:
+        mdl.add_progress_listener(SolverProgressListener(progress_callback, cancel_event=cancel_event))
+    t0 = time.perf_counter()
+    sol = mdl.solve(log_output=log_output)
+    solve_time = time.perf_counter() - t0
+
+    details = mdl.solve_details
+    status, texto = _status_from_docplex(sol, details)
+    if cancel_event is not None and cancel_event.is_set():
+        status = 'cancelled'
+    if sol is None:
+        return SolveResult(status, solve_time=solve_time, backend="cplex",
+                           problem_name=mdl.name, status_string=texto)
+
+    valores = np.array(sol.get_values(all_vars), dtype=float)
+    valores = np.where(ir.integrality == 1, np.round(valores), valores)
+    return SolveResult(status, objective=sol.objective_value,
+                       values=ir.split_solution(valores),
+                       gap=getattr(details, 'mip_relative_gap', None),
+                       solve_time=solve_time, backend="cplex",
+                       problem_name=mdl.name, status_string=texto)
@@ -18,7 +18,7 @@ class Processing:
         self.df_demanda = df_demanda
         print(planta)
         print(self.df_demanda['DES_PLANTA'].unique())
-        self.df_demanda = self.df_demanda[self.df_demanda['DES_PLANTA'] == 'MOLINA']
+        self.df_demanda = self.df_demanda[self.df_demanda['DES_PLANTA'] == planta].copy()
         print(self.df_demanda['DES_PLANTA'].unique())
         self.inverse_mapping = {
             'C8535133': 'BLISS 500*300',
@@ -29,11 +29,15 @@ class Processing:
             'C4434125': 'MASTER 2 X 2,5 KILOS'
         }
 
-        self.df_demanda['cod_envase'] = self.df_demanda['cod_envase'].map(lambda x: self.inverse_mapping[x] if x in self.inverse_mapping.keys() else 'KILL')
+        # Códigos conocidos -> nombre; si el envase ya viene con el nombre de
+        # una caja de la tabla de productividad (p. ej. instancias sintéticas)
+        # se conserva; el resto se descarta
+        cajas = set(self.df_productividad_maquina_caja['TIPO_CAJA'].astype(str).str.strip())
+        self.df_demanda['cod_envase'] = self.df_demanda['cod_envase'].map(
+            lambda x: self.inverse_mapping.get(x, x if x in cajas else 'KILL'))
         self.df_demanda = self.df_demanda[self.df_demanda['cod_envase']!='KILL']
         self.M = sorted(self.df_disponibilidad_maquinas["MAQUINA"].astype(str).unique().tolist())
         dias = [i for i in self.df_demanda['fecha_planificación'].unique()]
-        sorted([i for i in df_estimacion['fecha_planificación'].unique()])
         print(self.df_demanda['cod_envase'])
         dias = sorted(dias)
         mapper = {}
@@ -233,93 +237,117 @@ class Processing:
         Dem : dict {(d,b): demanda_float}
         (opcional) df : DataFrame con índice días y columnas envases
         """
-        rng = np.random.default_rng(seed)
-
-        # Aseguramos listas ordenadas (opcional, pero ayuda a reproducibilidad)
-        D = list(self.D)
-        B = list(self.B)
-
-        if len(D) == 0 or len(B) == 0:
-            # Nada que generar
-            self.Dem = {}
-            return (self.Dem, pd.DataFrame(index=D, columns=B)) if return_df else self.Dem
-
-        nD, nB = len(D), len(B)
-
-        # --- Construye matriz base según el modo ---
-        if mode not in {"uniform", "normal", "poisson", "dirichlet"}:
-            raise ValueError("mode debe ser 'uniform', 'normal', 'poisson' o 'dirichlet'.")
-
-        if mode == "uniform":
-            mat = rng.uniform(low, high, size=(nD, nB))
-
-        elif mode == "normal":
-            mu = (low + high) / 2.0
-            sigma = max((high - low) / 6.0, 1e-6)
-            mat = rng.normal(mu, sigma, size=(nD, nB))
-            mat = np.clip(mat, 0, None)
-
-        elif mode == "poisson":
-            lam = max((low + high) / 2.0, 1e-6)
-            mat = rng.poisson(lam=lam, size=(nD, nB)).astype(float)
-
-        else:  # "dirichlet"
-            # Totales por día
-            if per_day_totals is None:
-                # default: usa (low+high) como total diario base
-                base_total = max((low + high) / 2.0, 1.0)
-                per_day_totals = {d: base_total for d in D}
-            elif np.isscalar(per_day_totals):
-                per_day_totals = {d: float(per_day_totals) for d in D}
-            elif isinstance(per_day_totals, (pd.Series, dict)):
-                per_day_totals = {d: float(per_day_totals[d]) if d in per_day_totals else 0.0 for d in D}
-            else:
-                raise ValueError("per_day_totals debe ser escalar, dict, Serie o None.")
-
-            # Pesos por envase
-            if weights_per_envase is None:
-                alphas = np.ones(nB, dtype=float)
-            elif isinstance(weights_per_envase, (pd.Series, dict)):
-                alphas = np.array([float(weights_per_envase.get(b, 1.0)) for b in B], dtype=float)
-                alphas[alphas <= 0] = 1e-6  # evitar ceros en Dirichlet
-            else:
-                raise ValueError("weights_per_envase debe ser dict/Serie o None.")
-
-            mat = np.zeros((nD, nB), dtype=float)
-            for i, d in enumerate(D):
-                if per_day_totals[d] <= 0:
-                    continue
-                # proporciones por envase ese día
-                p = rng.dirichlet(alphas)
-                mat[i, :] = p * float(per_day_totals[d])
-
-        # --- Aplica esparsidad (celdas sin demanda) ---
-        if sparsity > 0:
-            mask_zero = rng.random(size=(nD, nB)) < float(sparsity)
-            mat[mask_zero] = 0.0
-
-        # --- Redondeo a enteros si corresponde ---
-        if integer:
-            # Usamos round "bancario" de numpy; si prefieres floor, usa np.floor
-            mat = np.rint(mat).astype(float)
-
-        # --- Construye el diccionario Dem ---
-        Dem = {}
-        for i, d in enumerate(D):
-            for j, b in enumerate(B):
-                Dem[(d, b)] = float(mat[i, j])
-
+        Dem, mat = fake_demanda(self.D, self.B, mode=mode, low=low, high=high,
+                                per_day_totals=per_day_totals,
+                                weights_per_envase=weights_per_envase,
+                                sparsity=sparsity, integer=integer, seed=seed)
         self.Dem = Dem
 
         if return_df:
-            df = pd.DataFrame(mat, index=D, columns=B)
+            df = pd.DataFrame(mat, index=list(self.D), columns=list(self.B))
             return Dem, df
         return Dem
 
 
+def fake_demanda(D, B,
+                 mode: str = "uniform",
+                 low: float = 100.0,
+                 high: float = 1000.0,
+                 per_day_totals=None,
+                 weights_per_envase=None,
+                 sparsity: float = 0.0,
+                 integer: bool = True,
+                 seed: int | None = None):
+    """
+    Demanda ficticia sobre D×B (ver Processing.generate_fake_demanda, que la
+    usa con los días y envases de la planta). Sirve también para fabricar
+    demanda de instancias sintéticas sin un Processing.
+
+    Retorna (Dem, mat): Dem = {(d,b): demanda_float} y mat la matriz días×envases.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Aseguramos listas ordenadas (opcional, pero ayuda a reproducibilidad)
+    D = list(D)
+    B = list(B)
+
+    if len(D) == 0 or len(B) == 0:
+        # Nada que generar
+        return {}, np.zeros((len(D), len(B)))
+
+    nD, nB = len(D), len(B)
+
+    # --- Construye matriz base según el modo ---
+    if mode not in {"uniform", "normal", "poisson", "dirichlet"}:
+        raise ValueError("mode debe ser 'uniform', 'normal', 'poisson' o 'dirichlet'.")
+
+    if mode == "uniform":
+        mat = rng.uniform(low, high, size=(nD, nB))
+
+    elif mode == "normal":
+        mu = (low + high) / 2.0
+        sigma = max((high - low) / 6.0, 1e-6)
+        mat = rng.normal(mu, sigma, size=(nD, nB))
+        mat = np.clip(mat, 0, None)
+
+    elif mode == "poisson":
+        lam = max((low + high) / 2.0, 1e-6)
+        mat = rng.poisson(lam=lam, size=(nD, nB)).astype(float)
+
+    else:  # "dirichlet"
+        # Totales por día
+        if per_day_totals is None:
+            # default: usa (low+high) como total diario base
+            base_total = max((low + high) / 2.0, 1.0)
+            per_day_totals = {d: base_total for d in D}
+        elif np.isscalar(per_day_totals):
+            per_day_totals = {d: float(per_day_totals) for d in D}
+        elif isinstance(per_day_totals, (pd.Series, dict)):
+            per_day_totals = {d: float(per_day_totals[d]) if d in per_day_totals else 0.0 for d in D}
+        else:
+            raise ValueError("per_day_totals debe ser escalar, dict, Serie o None.")
+
+        # Pesos por envase
+        if weights_per_envase is None:
+            alphas = np.ones(nB, dtype=float)
+        elif isinstance(weights_per_envase, (pd.Series, dict)):
+            alphas = np.array([float(weights_per_envase.get(b, 1.0)) for b in B], dtype=float)
+            alphas[alphas <= 0] = 1e-6  # evitar ceros en Dirichlet
+        else:
+            raise ValueError("weights_per_envase debe ser dict/Serie o None.")
+
+        mat = np.zeros((nD, nB), dtype=float)
+        for i, d in enumerate(D):
+            if per_day_totals[d] <= 0:
+                continue
+            # proporciones por envase ese día
+            p = rng.dirichlet(alphas)
+            mat[i, :] = p * float(per_day_totals[d])
+
+    # --- Aplica esparsidad (celdas sin demanda) ---
+    if sparsity > 0:
+        mask_zero = rng.random(size=(nD, nB)) < float(sparsity)
+        mat[mask_zero] = 0.0
+
+    # --- Redondeo a enteros si corresponde ---
+    if integer:
+        # Usamos round "bancario" de numpy; si prefieres floor, usa np.floor
+        mat = np.rint(mat).astype(float)
+
+    # --- Construye el diccionario Dem ---
+    Dem = {}
+    for i, d in enumerate(D):
+        for j, b in enumerate(B):
+            Dem[(d, b)] = float(mat[i, j])
+
+    return Dem, mat
+
+
 
 
 import sys, subprocess, importlib
+import time
+import tracemalloc
 from docplex.mp.model import Model
 from itertools import product
 import random
@@ -327,44 +355,40 @@ import pandas as pd
 
 from docplex.mp.model import Model
 
-def build_model(
-    M, B, D, T_turnos, S_segmentos,
-    Disp, Prod, Tipo, Setup, Dem, Tturn,
-    enforce_tipo=True,
-    Tseg=None,                 # puede ser None, escalar, dict por s, dict por (d,t), dict por (d,t,s)
-    restrict_w_by_tipo=True
-):
-    def align_Tturn(T_turnos, Tturn, default_hours=8.0):
-        Tturn2 = dict(Tturn)  # copia
-        for d, turns in T_turnos.items():
-            for t in turns:
-                Tturn2.setdefault((d, t), float(default_hours))
-        return Tturn2
-
-    # --- 0) Alinea Tturn y valida Disp ---
-    Tturn = align_Tturn(T_turnos, Tturn, default_hours=8.0)
-    missing_disp = [(m, d) for m in M for d in D if (m, d) not in Disp]
-    if missing_disp:
-        raise KeyError(f"Faltan claves en Disp, ej: {missing_disp[:5]} (total={len(missing_disp)})")
-
-    # --- 1) Dominios correctos (t por día) ---
-    xs_keys = []
-    ys_keys = []
-    for m in M:
-        for b in B:
-            for d in D:
-                for t in T_turnos[d]:
-                    for s in S_segmentos:
-                        xs_keys.append((m, b, d, t, s))
-                        ys_keys.append((m, b, d, t, s))
-
-    Tsetup_keys = []
-    for m in M:
-        for d in D:
-            for t in T_turnos[d]:
-                Tsetup_keys.append((m, d, t))
-
-    # --- 2) Duración por segmento: seg_len[(d,t,s)] ---
+# Parámetros del solver por defecto: los usan este script en Watson ML y los
+# backends locales (scripts/solvers.py). DEFAULT_CPLEX_PARAMS va por nombre con
+# puntos ({'emphasis.mip': 1, ...}); elegirlos con scripts/tuning.py
+DEFAULT_TIMELIMIT = 60
+DEFAULT_MIPGAP = 0.01
+DEFAULT_CPLEX_PARAMS = {}
+
+
+def apply_cplex_params(mdl, ajustes):
+    """
+    Fija parámetros de CPLEX por nombre con puntos ('mip.strategy.heuristicfreq')
+    y devuelve los objetos parámetro tocados, para restaurarlos con reset().
+    """
+    tocados = []
+    for nombre, valor in ajustes.items():
+        param = mdl.parameters
+        for parte in nombre.split("."):
+            param = getattr(param, parte)
+        param.set(valor)
+        tocados.append(param)
+    return tocados
+
+
+def align_Tturn(T_turnos, Tturn, default_hours=8.0):
+    """Completa Tturn con default_hours para los (d,t) que falten."""
+    Tturn2 = dict(Tturn)  # copia
+    for d, turns in T_turnos.items():
+        for t in turns:
+            Tturn2.setdefault((d, t), float(default_hours))
+    return Tturn2
+
+
+def segment_lengths(D, T_turnos, S_segmentos, Tturn, Tseg=None):
+    """Duración en horas de cada segmento: {(d,t,s): horas}."""
     # Admite:
     #   - Tseg=None              -> Tturn[(d,t)] / |S|
     #   - Tseg escalar           -> mismo valor por segmento
@@ -418,134 +442,581 @@ def build_model(
             raise TypeError("Formato de Tseg no reconocido. Usa None, escalar, {s:...}, {(d,t):...} o {(d,t,s):...}.")
     else:
         raise TypeError("Tseg debe ser None, escalar o dict.")
+    return seg_len
+
+
+def presolve_instance(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    enforce_tipo=True
+):
+    """
+    Poda la instancia antes de `build_model`, sin cambiar el óptimo:
+
+      - cajas sin demanda en el horizonte y días sin demanda,
+      - máquinas que no pueden producir ninguna caja demandada un día
+        disponible (Disp==0 o sin pares compatibles),
+      - pares (m,b) incompatibles o que nunca se pueden asignar,
+      - setups (m,b1,b2) cuyas cajas nunca coinciden en la máquina un mismo
+        día, y los de la diagonal sin costo (no generan w).
+
+    Retorna (params, reporte): params con las mismas claves que recibe
+    `build_model` y reporte = {'antes': {...}, 'despues': {...}, 'ratio'}
+    con el tamaño de cada conjunto/diccionario y la fracción de entradas que
+    queda (ver `presolve_summary`).
+    """
+    Tturn = align_Tturn(T_turnos, Tturn, default_hours=8.0)
+
+    def compatible(m, b):
+        if enforce_tipo:
+            return Tipo.get((m, b), 0) == 1
+        return Prod.get((m, b), 0.0) > 0
+
+    B_red = [b for b in B if any(Dem.get((d, b), 0.0) > 0 for d in D)]
+    D_red = [d for d in D if any(Dem.get((d, b), 0.0) > 0 for b in B_red)]
+    dias = set(D_red)
+
+    # Cajas asignables por (m,d); de ahí salen M, pares (m,b) y setups útiles
+    cajas_md = {}
+    for m in M:
+        for d in D_red:
+            if Disp.get((m, d), 0) <= 0:
+                continue
+            cajas = [b for b in B_red if Dem.get((d, b), 0.0) > 0 and compatible(m, b)]
+            if cajas:
+                cajas_md[(m, d)] = cajas
+    M_red = [m for m in M if any((m, d) in cajas_md for d in D_red)]
+
+    pares_mb = set()
+    pares_setup = set()
+    for (m, d), cajas in cajas_md.items():
+        pares_mb.update((m, b) for b in cajas)
+        pares_setup.update((m, b1, b2) for b1 in cajas for b2 in cajas)
+
+    params = {
+        'M': M_red,
+        'B': B_red,
+        'D': D_red,
+        'T_turnos': {d: list(T_turnos.get(d, [])) for d in D_red},
+        'S_segmentos': S_segmentos,
+        'Disp': {(m, d): Disp.get((m, d), 0) for m in M_red for d in D_red},
+        'Prod': {k: Prod[k] for k in pares_mb if k in Prod},
+        'Tipo': {k: Tipo[k] for k in pares_mb if k in Tipo},
+        'Setup': {k: h for k, h in Setup.items()
+                  if k in pares_setup and not (k[1] == k[2] and h <= 1e-9)},
+        'Dem': {(d, b): Dem.get((d, b), 0.0) for d in D_red for b in B_red},
+        'Tturn': {(d, t): h for (d, t), h in Tturn.items() if d in dias},
+    }
+
+    def tamanos(M_, B_, D_, Disp_, Prod_, Tipo_, Setup_, Dem_, util):
+        return {'M': len(M_), 'B': len(B_), 'D': len(D_),
+                'maquina_dias': util, 'Disp': len(Disp_), 'Prod': len(Prod_),
+                'Tipo': len(Tipo_), 'Setup': len(Setup_), 'Dem': len(Dem_)}
+
+    antes = tamanos(M, B, D, Disp, Prod, Tipo, Setup, Dem,
+                    sum(1 for m in M for d in D if Disp.get((m, d), 0) > 0))
+    despues = tamanos(params['M'], params['B'], params['D'], params['Disp'], params['Prod'],
+                      params['Tipo'], params['Setup'], params['Dem'], len(cajas_md))
+    entradas = ('Disp', 'Prod', 'Tipo', 'Setup', 'Dem')
+    total_antes = sum(antes[k] for k in entradas)
+    reporte = {
+        'antes': antes,
+        'despues': despues,
+        'ratio': sum(despues[k] for k in entradas) / total_antes if total_antes else 1.0,
+    }
+    return params, reporte
+
+
+def presolve_summary(reporte):
+    """Resumen de una línea del reporte de `presolve_instance`."""
+    antes, despues = reporte['antes'], reporte['despues']
+    partes = [f"{k} {antes[k]}→{despues[k]}"
+              for k in ('M', 'B', 'D', 'maquina_dias', 'Prod', 'Setup')]
+    return (f"[Presolve] {', '.join(partes)} | entradas conservadas: "
+            f"{100 * reporte['ratio']:.1f}%")
+
+
+def setup_cost(Setup, Tipo, m, b1, b2, restrict_w_by_tipo=True):
+    """
+    Horas de setup que paga `build_model` si la máquina m hace b1 en un
+    segmento y b2 en el siguiente: sólo los pares con variable w (setup definido, no trivial en la
+    diagonal y, con restrict_w_by_tipo, ambos tipos asignables).
+    """
+    h = Setup.get((m, b1, b2))
+    if h is None or (b1 == b2 and h <= 1e-9):
+        return 0.0
+    if restrict_w_by_tipo and (Tipo.get((m, b1), 0) == 0 or Tipo.get((m, b2), 0) == 0):
+        return 0.0
+    return float(h)
+
+
+def machine_pools(M, B, D, Prod, Tipo, Setup, Disp):
+    """
+    Agrupa por día las máquinas idénticas: {d: [[m1, m2, ...], ...]}.
+
+    Dos máquinas son idénticas un día d si tienen la misma productividad,
+    compatibilidad (Tipo) y matriz de setup sobre B y la misma disponibilidad
+    (> 0) ese día. Incluye grupos de una sola máquina; las máquinas no
+    disponibles quedan fuera. Los grupos y sus máquinas siguen el orden de M.
+    """
+    perfil = {}
+    for m in M:
+        perfil[m] = (
+            tuple(Prod.get((m, b), 0.0) for b in B),
+            tuple(Tipo.get((m, b), 0) for b in B),
+            tuple(Setup.get((m, b1, b2)) for b1 in B for b2 in B),
+        )
+
+    pools = {}
+    for d in D:
+        grupos = {}
+        for m in M:
+            disp = Disp.get((m, d), 0)
+            if disp > 0:
+                grupos.setdefault((perfil[m], disp), []).append(m)
+        pools[d] = list(grupos.values())
+    return pools
+
+
+def machine_classes(M, B, D, Prod, Tipo, Setup, Disp):
+    """
+    Clases de máquinas intercambiables por día: {d: [[m1, m2, ...], ...]}.
+
+    Son los grupos de `machine_pools` con 2 o más máquinas. Como todas las
+    restricciones salvo R1 son por (m,d,t) y R1 sólo suma sobre máquinas,
+    dentro de un turno se pueden permutar los planes de máquinas de una misma
+    clase sin cambiar el objetivo.
+    """
+    clases = {}
+    for d, grupos in machine_pools(M, B, D, Prod, Tipo, Setup, Disp).items():
+        clases_d = [ms for ms in grupos if len(ms) >= 2]
+        if clases_d:
+            clases[d] = clases_d
+    return clases
+
+
+def build_model(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    enforce_tipo=True,
+    Tseg=None,                 # puede ser None, escalar, dict por s, dict por (d,t), dict por (d,t,s)
+    restrict_w_by_tipo=True,
+    timings=None,              # dict opcional: se llena con segundos por fase de construcción y 'total'
+    memory=False,              # True: timings también lleva 'memoria_MB' y 'memoria_pico_MB' (tracemalloc, ~5x más lento)
+    fast=False,                # True: sin checker ni nombres de restricciones (producción)
+    handles=None,              # dict opcional: se llena con las restricciones R1 por (d,b) y w
+    symmetry_breaking=False,   # True: ordena por carga las máquinas equivalentes (R7)
+    setup_formulation="mccormick"  # "mccormick" (3 filas por w) o "flow" (filas por caja y turno)
+):
+    _t_phase = [time.perf_counter()]
+    t_inicio = _t_phase[0]
+    # Memoria: tracemalloc sólo si se pide (hace la construcción más lenta)
+    medir_memoria = memory and timings is not None
+    if medir_memoria:
+        detener_traza = not tracemalloc.is_tracing()
+        if detener_traza:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, 'reset_peak'):     # Python >= 3.9
+            tracemalloc.reset_peak()
+        mem_inicio = tracemalloc.get_traced_memory()[0]
+
+    def mark(phase):
+        # Registra el tiempo transcurrido desde la marca anterior en timings[phase]
+        now = time.perf_counter()
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + (now - _t_phase[0])
+        _t_phase[0] = now
+
+    # --- 0) Alinea Tturn y valida Disp ---
+    Tturn = align_Tturn(T_turnos, Tturn, default_hours=8.0)
+    missing_disp = [(m, d) for m in M for d in D if (m, d) not in Disp]
+    if missing_disp:
+        raise KeyError(f"Faltan claves en Disp, ej: {missing_disp[:5]} (total={len(missing_disp)})")
+
+    # --- 1) Dominios dispersos ---
+    # Sólo se crean variables donde hay una opción real:
+    #   - (m,b) compatibles (Tipo==1; si enforce_tipo=False, basta Prod>0)
+    #   - (m,d) con Disp==1
+    #   - (d,b) con demanda > 0
+    # Así el tamaño del modelo escala con las opciones reales y no con M×B×D×T×S.
+    def compatible(m, b):
+        if enforce_tipo:
+            return Tipo.get((m, b), 0) == 1
+        return Prod.get((m, b), 0.0) > 0
+
+    boxes_by_md = {}   # (m,d) -> [b] cajas asignables ese día en esa máquina
+    for m in M:
+        for d in D:
+            if Disp[(m, d)] <= 0:
+                continue
+            boxes = [b for b in B if Dem.get((d, b), 0.0) > 0 and compatible(m, b)]
+            if boxes:
+                boxes_by_md[(m, d)] = boxes
+
+    xs_keys = []
+    Tsetup_keys = []
+    for (m, d), boxes in boxes_by_md.items():
+        for t in T_turnos[d]:
+            Tsetup_keys.append((m, d, t))
+            for b in boxes:
+                for s in S_segmentos:
+                    xs_keys.append((m, b, d, t, s))
+    ys_keys = xs_keys
+    mark("dominios")
+
+    # --- 2) Duración por segmento: seg_len[(d,t,s)] ---
+    seg_len = segment_lengths(D, T_turnos, S_segmentos, Tturn, Tseg)
+    mark("seg_len")
 
     # --- 3) Modelo y variables ---
-    mdl = Model(name="Optimizacion_Cajas")
+    # fast=True: sin checker de tipos y sin nombres de restricciones (las
+    # variables conservan su nombre, que usa solution.json / Resultados).
+    if fast:
+        mdl = Model(name="Optimizacion_Cajas", checker="off")
+    else:
+        mdl = Model(name="Optimizacion_Cajas")
+
+    def add_family(cts, names):
+        # Agrega una familia completa con la API por lotes
+        return mdl.add_constraints(cts, names=None if fast else names)
 
     x = mdl.binary_var_dict(xs_keys, name="x")
     y = mdl.continuous_var_dict(ys_keys, lb=0, name="y")
     Tsetup_var = mdl.continuous_var_dict(Tsetup_keys, lb=0, name="T")
+    mark("variables")
 
     # --- 4) R1: Demanda (Dem indexado (d,b)) ---
     # Si tu Dem es (b,d), cambia a Dem.get((b,d),0.0)
+    # Las celdas (d,b) sin demanda no tienen variables ni filas.
+    y_by_db = {}
+    for (m, b, d, t, s) in ys_keys:
+        y_by_db.setdefault((d, b), []).append((m, b, d, t, s))
+
+    R1_keys = []
+    R1_cts, R1_names = [], []
+    R1_ub_cts, R1_ub_names = [], []
     for d in D:
         for b in B:
             demand_db = Dem.get((d, b), 0.0)
-            mdl.add_constraint(
-                mdl.sum(y[(m, b, d, t, s)] * Prod[(m, b)]
-                        for m in M for t in T_turnos[d] for s in S_segmentos) >= demand_db,
-                ctname=f"R1_dem[{b},{d}]"
-            )
-    # además de R1_dem (>=), agrega:
-    for d in D:
-        for b in B:
-            demand_db = Dem.get((d, b), 0.0)
-            mdl.add_constraint(
-                mdl.sum(y[(m,b,d,t,s)]*Prod[(m,b)] for m in M for t in T_turnos[d] for s in S_segmentos)
-                <= demand_db * (1 + 1e-6),
-                ctname=f"R1_dem_ub[{b},{d}]"
-            )
+            if demand_db <= 0:
+                continue
+            R1_keys.append((d, b))
+            keys = y_by_db.get((d, b), [])
+            y_db = [y[k] for k in keys]
+            p_db = [Prod[(k[0], b)] for k in keys]
+            R1_cts.append(mdl.scal_prod(y_db, p_db) >= demand_db)
+            # además de R1_dem (>=), agrega la cota superior:
+            R1_ub_cts.append(mdl.scal_prod(y_db, p_db) <= demand_db * (1 + 1e-6))
+            if not fast:
+                R1_names.append(f"R1_dem[{b},{d}]")
+                R1_ub_names.append(f"R1_dem_ub[{b},{d}]")
+    R1_added = add_family(R1_cts, R1_names)
+    R1_ub_added = add_family(R1_ub_cts, R1_ub_names)
+    if handles is not None:
+        # Permite cambiar la demanda en sitio (ver scripts/persistent.py)
+        handles['R1_dem'] = dict(zip(R1_keys, R1_added))
+        handles['R1_dem_ub'] = dict(zip(R1_keys, R1_ub_added))
+    mark("R1")
 
 
     # --- 5) R2: Tiempo por turno ---
-    for m in M:
-        for d in D:
-            for t in T_turnos[d]:
-                mdl.add_constraint(
-                    mdl.sum(y[(m, b, d, t, s)] for b in B for s in S_segmentos)
-                    + Tsetup_var[(m, d, t)]
-                    <= Tturn[(d, t)] * Disp[(m, d)],
-                    ctname=f"R2_time[{m},{d},{t}]"
-                )
+    cts, names = [], []
+    for (m, d, t) in Tsetup_keys:
+        cts.append(
+            mdl.sum_vars([y[(m, b, d, t, s)] for b in boxes_by_md[(m, d)] for s in S_segmentos])
+            + Tsetup_var[(m, d, t)]
+            <= Tturn[(d, t)] * Disp[(m, d)]
+        )
+        if not fast:
+            names.append(f"R2_time[{m},{d},{t}]")
+    add_family(cts, names)
+    mark("R2")
 
     # --- 6) R3 (link): y <= seg_len[(d,t,s)] * x ---
-    for (m, b, d, t, s) in ys_keys:
-        mdl.add_constraint(
-            y[(m, b, d, t, s)] <= seg_len[(d, t, s)] * x[(m, b, d, t, s)],
-            ctname=f"R3_link[{m},{b},{d},{t},{s}]"
-        )
+    cts = [y[k] <= seg_len[(k[2], k[3], k[4])] * x[k] for k in ys_keys]
+    names = None if fast else [f"R3_link[{m},{b},{d},{t},{s}]" for (m, b, d, t, s) in ys_keys]
+    add_family(cts, names)
+    mark("R3")
 
     # --- 7) R4: Máx 1 tipo por segmento ---
-    for m in M:
-        for d in D:
-            for t in T_turnos[d]:
-                for s in S_segmentos:
-                    mdl.add_constraint(
-                        mdl.sum(x[(m, b, d, t, s)] for b in B) <= 1,
-                        ctname=f"R4_oneType[{m},{d},{t},{s}]"
-                    )
-
-    # --- 8) R5: El segmento s2 sólo si hay algo en s1 ---
-    assert len(S_segmentos) == 2, "Se asumen exactamente 2 segmentos por turno."
-    s1, s2 = S_segmentos[0], S_segmentos[1]
-    for m in M:
-        for d in D:
-            for t in T_turnos[d]:
-                mdl.add_constraint(
-                    mdl.sum(x[(m, b, d, t, s2)] for b in B)
-                    <= mdl.sum(x[(m, b, d, t, s1)] for b in B),
-                    ctname=f"R5_order[{m},{d},{t}]"
-                )
+    cts, names = [], []
+    for (m, d, t) in Tsetup_keys:
+        for s in S_segmentos:
+            cts.append(mdl.sum_vars([x[(m, b, d, t, s)] for b in boxes_by_md[(m, d)]]) <= 1)
+            if not fast:
+                names.append(f"R4_oneType[{m},{d},{t},{s}]")
+    add_family(cts, names)
+    mark("R4")
+
+    # --- 8) R5: Un segmento sólo si hay algo en el anterior ---
+    # Con |S| segmentos los usados forman un prefijo s1, s2, ..., así las
+    # transiciones (y los setups) sólo ocurren entre segmentos consecutivos.
+    transiciones = list(zip(S_segmentos[:-1], S_segmentos[1:]))
+    cts, names = [], []
+    for (m, d, t) in Tsetup_keys:
+        for (sa, sb) in transiciones:
+            cts.append(
+                mdl.sum_vars([x[(m, b, d, t, sb)] for b in boxes_by_md[(m, d)]])
+                <= mdl.sum_vars([x[(m, b, d, t, sa)] for b in boxes_by_md[(m, d)]])
+            )
+            if not fast:
+                names.append(f"R5_order[{m},{d},{t}]" if len(transiciones) == 1
+                             else f"R5_order[{m},{d},{t},{sb}]")
+    add_family(cts, names)
+    mark("R5")
 
     # --- 9) R6: Setup exacto con w ---
+    # w_pairs agrupa los pares (b1,b2) con setup por (m,d,t), así R6_T_def se
+    # arma en tiempo lineal en |w| en vez de re-escanear w_keys por cada turno.
+    # Hay un w por par y transición (sa,sb) entre segmentos consecutivos, de
+    # modo que el modelo crece en forma lineal con |S|. Con 2 segmentos la
+    # clave es (m,b1,b2,d,t); con más se agrega el segmento de origen sa.
+    def w_key(m, b1, b2, d, t, sa):
+        return (m, b1, b2, d, t) if len(transiciones) == 1 else (m, b1, b2, d, t, sa)
+
     w_keys = []
-    for m in M:
-        for d in D:
-            for t in T_turnos[d]:
-                for b1 in B:
-                    for b2 in B:
-                        if (m, b1, b2) not in Setup:
-                            continue
-                        if b1 == b2 and Setup[(m, b1, b2)] <= 1e-9:
-                            continue
-                        if restrict_w_by_tipo and (Tipo[(m, b1)] == 0 or Tipo[(m, b2)] == 0):
-                            continue
-                        w_keys.append((m, b1, b2, d, t))
+    w_pairs = {}   # (m,d,t) -> [(b1,b2)]
+    for (m, d, t) in Tsetup_keys:
+        boxes = boxes_by_md[(m, d)]
+        for b1 in boxes:
+            for b2 in boxes:
+                if (m, b1, b2) not in Setup:
+                    continue
+                if b1 == b2 and Setup[(m, b1, b2)] <= 1e-9:
+                    continue
+                if restrict_w_by_tipo and (Tipo[(m, b1)] == 0 or Tipo[(m, b2)] == 0):
+                    continue
+                w_pairs.setdefault((m, d, t), []).append((b1, b2))
+        for (sa, _) in transiciones:
+            w_keys.extend(w_key(m, b1, b2, d, t, sa) for (b1, b2) in w_pairs.get((m, d, t), []))
 
     w = mdl.continuous_var_dict(w_keys, lb=0, ub=1, name="w")
+    if handles is not None:
+        handles['w'] = w
+
+    def w_tag(k):
+        return "[" + ",".join(str(i) for i in k) + "]"
+
+    if setup_formulation == "mccormick":
+        le_s1, le_s2, ge = [], [], []
+        for (m, d, t), relevant_pairs in w_pairs.items():
+            for (sa, sb) in transiciones:
+                for (b1, b2) in relevant_pairs:
+                    wk = w[w_key(m, b1, b2, d, t, sa)]
+                    xa, xb = x[(m, b1, d, t, sa)], x[(m, b2, d, t, sb)]
+                    le_s1.append(wk <= xa)
+                    le_s2.append(wk <= xb)
+                    ge.append(wk >= xa + xb - 1)
+        if fast:
+            add_family(le_s1, None)
+            add_family(le_s2, None)
+            add_family(ge, None)
+        else:
+            tags = [w_tag(k) for k in w_keys]
+            add_family(le_s1, ["R6_w_le_s1" + tg for tg in tags])
+            add_family(le_s2, ["R6_w_le_s2" + tg for tg in tags])
+            add_family(ge, ["R6_w_ge_summinus1" + tg for tg in tags])
+    elif setup_formulation == "flow":
+        # Transiciones como flujo sa -> sb dentro del turno (filas por caja,
+        # no por par). Con R4 hay a lo sumo una caja por segmento, así que:
+        #   salida  b1: sum_b2 w[b1,b2] <= x[b1,sa]
+        #   entrada b2: x[b2,sb] <= sum_b1 w[b1,b2] + sum_{b1 sin w} x[b1,sa]
+        # fuerzan w = x[b1,sa]·x[b2,sb] en los pares con setup, con una
+        # relajación LP más ajustada que w >= x1 + x2 - 1.
+        out_cts, out_names, in_cts, in_names = [], [], [], []
+        for (m, d, t), relevant_pairs in w_pairs.items():
+            boxes = boxes_by_md[(m, d)]
+            for (sa, sb) in transiciones:
+                sufijo = "" if len(transiciones) == 1 else f",{sa}"
+                por_b1, por_b2 = {}, {}
+                for (b1, b2) in relevant_pairs:
+                    por_b1.setdefault(b1, []).append(w[w_key(m, b1, b2, d, t, sa)])
+                    por_b2.setdefault(b2, set()).add(b1)
+                for b1, ws in por_b1.items():
+                    out_cts.append(mdl.sum_vars(ws) <= x[(m, b1, d, t, sa)])
+                    if not fast:
+                        out_names.append(f"R6_flow_out[{m},{b1},{d},{t}{sufijo}]")
+                for b2, con_w in por_b2.items():
+                    in_cts.append(
+                        x[(m, b2, d, t, sb)]
+                        <= mdl.sum_vars([w[w_key(m, b1, b2, d, t, sa)] for b1 in con_w])
+                        + mdl.sum_vars([x[(m, b1, d, t, sa)] for b1 in boxes if b1 not in con_w])
+                    )
+                    if not fast:
+                        in_names.append(f"R6_flow_in[{m},{b2},{d},{t}{sufijo}]")
+        add_family(out_cts, out_names)
+        add_family(in_cts, in_names)
+    else:
+        raise ValueError(f"setup_formulation desconocida: {setup_formulation!r}. Usa 'mccormick' o 'flow'.")
+
+    cts, names = [], []
+    for (m, d, t), relevant_pairs in w_pairs.items():
+        ws, costos = [], []
+        for (sa, _) in transiciones:
+            ws += [w[w_key(m, bb1, bb2, d, t, sa)] for (bb1, bb2) in relevant_pairs]
+            costos += [Setup[(m, bb1, bb2)] for (bb1, bb2) in relevant_pairs]
+        if not ws:
+            continue   # un solo segmento: no hay transiciones
+        cts.append(Tsetup_var[(m, d, t)] >= mdl.scal_prod(ws, costos))
+        if not fast:
+            names.append(f"R6_T_def[{m},{d},{t}]")
+    add_family(cts, names)
+    mark("R6")
+
+    # --- 10) R7: Ruptura de simetría entre máquinas equivalentes ---
+    # Dentro de cada clase (ver machine_classes) la carga de producción por
+    # turno no crece: sum y[m_i] >= sum y[m_(i+1)]. Las máquinas equivalentes
+    # tienen los mismos dominios, así que ambas están o no en boxes_by_md.
+    if symmetry_breaking:
+        cts, names = [], []
+        for d, clases in machine_classes(M, B, D, Prod, Tipo, Setup, Disp).items():
+            for ms in clases:
+                ms = [m for m in ms if (m, d) in boxes_by_md]
+                for m1, m2 in zip(ms, ms[1:]):
+                    for t in T_turnos[d]:
+                        cts.append(
+                            mdl.sum_vars([y[(m1, b, d, t, s)] for b in boxes_by_md[(m1, d)] for s in S_segmentos])
+                            >= mdl.sum_vars([y[(m2, b, d, t, s)] for b in boxes_by_md[(m2, d)] for s in S_segmentos])
+                        )
+                        if not fast:
+                            names.append(f"R7_sym[{m1},{m2},{d},{t}]")
+        add_family(cts, names)
+        mark("R7")
+
+    # --- 11) Compatibilidad ---
+    # Ya no hacen falta filas Compat (x == 0): los pares incompatibles no
+    # tienen variables en el dominio disperso (ver paso 1).
+
+    # --- 12) Objetivo ---
+    mdl.minimize(mdl.sum_vars(list(Tsetup_var.values())))
+    mark("objetivo")
+
+    if timings is not None:
+        timings['total'] = time.perf_counter() - t_inicio
+    if medir_memoria:
+        # Retenida por el modelo al terminar y pico durante la construcción
+        actual, pico = tracemalloc.get_traced_memory()
+        timings['memoria_MB'] = (actual - mem_inicio) / 2**20
+        timings['memoria_pico_MB'] = (pico - mem_inicio) / 2**20
+        if detener_traza:
+            tracemalloc.stop()
 
-    for (m, b1, b2, d, t) in w_keys:
-        mdl.add_constraint(w[(m, b1, b2, d, t)] <= x[(m, b1, d, t, s1)], ctname=f"R6_w_le_s1[{m},{b1},{b2},{d},{t}]")
-        mdl.add_constraint(w[(m, b1, b2, d, t)] <= x[(m, b2, d, t, s2)], ctname=f"R6_w_le_s2[{m},{b1},{b2},{d},{t}]")
-        mdl.add_constraint(w[(m, b1, b2, d, t)] >= x[(m, b1, d, t, s1)] + x[(m, b2, d, t, s2)] - 1,
-                           ctname=f"R6_w_ge_summinus1[{m},{b1},{b2},{d},{t}]")
+    return mdl, x, y, Tsetup_var, S_segmentos
 
-    for m in M:
-        for d in D:
-            for t in T_turnos[d]:
-                relevant_pairs = [(bb1, bb2) for (mm, bb1, bb2, dd, tt) in w_keys if (mm, dd, tt) == (m, d, t)]
-                if relevant_pairs:
-                    mdl.add_constraint(
-                        Tsetup_var[(m, d, t)] >= mdl.sum(Setup[(m, bb1, bb2)] * w[(m, bb1, bb2, d, t)]
-                                                         for (bb1, bb2) in relevant_pairs),
-                        ctname=f"R6_T_def[{m},{d},{t}]"
-                    )
 
-    # --- 10) Compatibilidad opcional ---
-    if enforce_tipo:
-        for (m, b, d, t, s) in xs_keys:
-            if Tipo[(m, b)] == 0:
-                mdl.add_constraint(x[(m, b, d, t, s)] == 0, ctname=f"Compat[{m},{b},{d},{t},{s}]")
+# --- Arranque en caliente (MIP start) desde un plan previo ---
+# Un "plan" es {'x': {(m,b,d,t,s): v}, 'y': {(m,b,d,t,s): v}, 'T': {(m,d,t): v}};
+# se obtiene de un solution.json (Watson ML o local) o de SolveResult.values.
 
-    # --- 11) Objetivo ---
-    mdl.minimize(mdl.sum(Tsetup_var[(m, d, t)] for (m, d, t) in Tsetup_keys))
+def _parse_index(tok):
+    try:
+        return int(tok)
+    except ValueError:
+        return tok
+
+
+def plan_from_solution_json(sol_dict):
+    """
+    Convierte un solution.json (estructura CPLEXSolution) en un plan.
+
+    Los nombres son prefijo_clave unida por "_" (p. ej.
+    "y_M11_MASTER 2 X 2,5 KILOS_2_1_1"): la máquina es el primer campo, día,
+    turno y segmento los últimos, y la caja lo que queda al medio (puede
+    contener "_"). Las variables w y las que no calzan con el formato se
+    ignoran; las variables ausentes valen 0.
+    """
+    plan = {'x': {}, 'y': {}, 'T': {}}
+    for var in sol_dict.get('CPLEXSolution', {}).get('variables', []):
+        tokens = var.get('name', '').split("_")
+        prefix = tokens[0]
+        if prefix in ('x', 'y') and len(tokens) >= 6:
+            m, b = tokens[1], "_".join(tokens[2:-3])
+            d, t, s = (_parse_index(tok) for tok in tokens[-3:])
+            plan[prefix][(m, b, d, t, s)] = float(var['value'])
+        elif prefix == 'T' and len(tokens) >= 4:
+            m = "_".join(tokens[1:-2])
+            d, t = (_parse_index(tok) for tok in tokens[-2:])
+            plan['T'][(m, d, t)] = float(var['value'])
+    return plan
+
+
+def load_plan(path):
+    """Lee un solution.json y devuelve el plan (ver plan_from_solution_json)."""
+    import json
+    with open(path, "r", encoding="utf-8") as f:
+        return plan_from_solution_json(json.load(f))
 
-    return mdl, x, y, Tsetup_var, S_segmentos
 
+def add_plan_start(mdl, x, y, plan, day_offset=0):
+    """
+    Agrega `plan` como MIP start del modelo (x, y de build_model).
+
+    Las variables se emparejan por clave (m,b,d,t,s), así que el plan sirve
+    aunque los conjuntos hayan cambiado: las claves que ya no existen se
+    descartan y las x nuevas arrancan en 0. `day_offset` desplaza los días del
+    plan (día d del plan -> día d + day_offset del modelo) para replanificar
+    con un horizonte corrido. CPLEX repara el punto si no es factible con los
+    datos nuevos (EffortLevel.Repair).
+
+    Retorna el número de x del modelo que venían en el plan.
+    """
+    from docplex.mp.constants import EffortLevel
+
+    def shift(key):
+        m, b, d, t, s = key
+        return (m, b, d + day_offset if isinstance(d, (int, np.integer)) else d, t, s)
+
+    plan_x = {shift(k): v for k, v in plan.get('x', {}).items()}
+    plan_y = {shift(k): v for k, v in plan.get('y', {}).items()}
+
+    start = mdl.new_solution()
+    n_mapped = 0
+    for key, var in x.items():
+        valor = plan_x.get(key)
+        if valor is not None:
+            n_mapped += 1
+        start.add_var_value(var, round(valor or 0.0))
+    for key, valor in plan_y.items():
+        if key in y:
+            start.add_var_value(y[key], valor)
+
+    mdl.add_mip_start(start, effort_level=EffortLevel.Repair)
+    return n_mapped
+
+
+from docplex.mp.progress import ProgressListener, ProgressClock
+
+
+class FirstIncumbentListener(ProgressListener):
+    """Registra el tiempo hasta la primera solución entera y el último gap."""
+
+    def __init__(self):
+        super().__init__(ProgressClock.Objective)
+        self.first_incumbent_time = None
+        self.last_gap = None
+
+    def notify_progress(self, pdata):
+        if pdata.has_incumbent:
+            if self.first_incumbent_time is None:
+                self.first_incumbent_time = pdata.time
+            self.last_gap = pdata.mip_gap
 
 
 
 
 
-df_turnos = pd.read_csv("Turnos.csv")
-df_disponibilidad_maquinas = pd.read_csv("Disponibilidad_Maquinas.csv")
-df_productividad_maquina_caja = pd.read_csv("Productividad_Maquina_Caja.csv")
-df_tiempo_setup_por_maquina = pd.read_csv("Tiempo_de_Setup_por_maquina.csv")
-df_duracion_turno_dia = pd.read_csv("Duracion_Turno.csv")
-df_estimacion = pd.read_csv("demanda.csv")
-df_planta = pd.read_csv("planta.csv")
 
 if __name__ == "__main__":
+    # Los CSV sólo se leen al ejecutar el script (Watson ML); así el módulo
+    # se puede importar desde la app y desde procesos worker.
+    df_turnos = pd.read_csv("Turnos.csv")
+    df_disponibilidad_maquinas = pd.read_csv("Disponibilidad_Maquinas.csv")
+    df_productividad_maquina_caja = pd.read_csv("Productividad_Maquina_Caja.csv")
+    df_tiempo_setup_por_maquina = pd.read_csv("Tiempo_de_Setup_por_maquina.csv")
+    df_duracion_turno_dia = pd.read_csv("Duracion_Turno.csv")
+    df_estimacion = pd.read_csv("demanda.csv")
+    df_planta = pd.read_csv("planta.csv")
+
     # 3) Obtener insumos
     # 2) Instanciar Processing
     planta = df_planta['PLANTA'].iloc[0]
@@ -579,18 +1050,45 @@ if __name__ == "__main__":
     slots_por_dia = len(M)*len(T_turnos)*len(S_segmentos)
     print(f"[Info] Slots por día: {slots_por_dia} (6 máquinas × 2 turnos × 2 segmentos).")
 
+    # Presolve: sólo se construye la parte de la instancia que puede producir
+    params, reporte = presolve_instance(M, B, D, T_turnos, S_segmentos,
+                                        Disp, Prod, Tipo, Setup, Dem, Tturn)
+    print(presolve_summary(reporte))
+
+    construccion = {}
     mdl, x, y, Tsetup, k = build_model(
-    M,B,D,T_turnos,S_segmentos,
-    Disp,Prod,Tipo,Setup,Dem,Tturn,
+    **params,
     enforce_tipo=True,
     Tseg=None,                # 8/2 = 4h por segmento
-    restrict_w_by_tipo=True
+    restrict_w_by_tipo=True,
+    fast=True,                # sin checker ni nombres de restricciones
+    timings=construccion
     )
-
-    # Parámetros del solver (puedes ajustarlos)
-    mdl.parameters.timelimit = 60
-    mdl.parameters.mip.tolerances.mipgap = 0.01
-
+    # Memoria: pico de RSS del proceso (tracemalloc haría la construcción ~5x más lenta)
+    try:
+        import resource
+        rss = f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB de RSS pico"
+    except ImportError:
+        rss = "RSS no disponible"
+    print(f"[Info] Construcción: {construccion['total']:.2f} s | {rss} | "
+          f"{mdl.number_of_variables} variables, {mdl.number_of_constraints} restricciones.")
+
+    # Parámetros del solver (ver DEFAULT_* al inicio del módulo)
+    mdl.parameters.timelimit = DEFAULT_TIMELIMIT
+    mdl.parameters.mip.tolerances.mipgap = DEFAULT_MIPGAP
+    apply_cplex_params(mdl, DEFAULT_CPLEX_PARAMS)
+
+    # Arranque en caliente: run_model.run empaqueta el plan anterior como mip_start.json
+    import os
+    if os.path.exists("mip_start.json"):
+        n_mapped = add_plan_start(mdl, x, y, load_plan("mip_start.json"))
+        print(f"[Info] MIP start desde mip_start.json: {n_mapped}/{len(x)} variables x mapeadas.")
+
+    listener = FirstIncumbentListener()
+    mdl.add_progress_listener(listener)
     sol = mdl.solve(log_output=True)
     if sol is None:
         print("No factible: si pasa, baja active_max, baja H_max, o sube compatibilidad.")
+    else:
+        print(f"[Info] Primera solución entera: {listener.first_incumbent_time} s | "
+              f"gap final: {mdl.solve_details.mip_relative_gap}")
@@ -0,0 +1,227 @@
+"""
+Formulación por patrones (set partitioning) sobre los turnos de cada máquina.
+
+Cada (m,d,t) corre a lo más un patrón, elegido de una lista enumerada de
+antemano desde Tipo, la demanda y Setup:
+
+  - (b1, b2) : b1 en el segmento 1 y b2 en el segmento 2 (b2 puede ser b1),
+               con setup `setup_cost(Setup, Tipo, m, b1, b2)`.
+  - (b1, -)  : sólo el segmento 1; se omite cuando (b1, b1) no paga setup,
+               porque lo domina.
+
+Variables: z binaria por patrón y las mismas horas y[m,b,d,t,s] de
+`build_model`. Las familias x, w, T y R3–R6 se reemplazan por:
+
+  - P_one  : sum_p z <= 1 por (m,d,t).
+  - P_link : y[m,b,d,t,s] <= seg_len · (z de los patrones con b en s).
+  - P_time : sum y + sum_p setup_p · z <= Tturn·Disp por (m,d,t).
+
+El setup queda en el costo del patrón, sin linealización. `PatternIR` expone
+los mismos atributos que `ModelIR` que usa `HighsBackend.solve_ir` y su
+`split_solution` devuelve x/y/T con las claves de `build_model`.
+"""
+
+import time
+
+import numpy as np
+
+from scripts.matrix_ir import IRSetup, RowBlocks, matrix_to_docplex, solve_matrix_cplex
+from scripts.solvers import DEFAULT_MIPGAP, DEFAULT_TIMELIMIT, HighsBackend
+
+INF = np.inf
+
+FAMILIAS_PATRON = ['R1_dem', 'P_one', 'P_link', 'P_time']
+
+SIN_CAJA = -1     # b2 de los patrones que dejan vacío el segundo segmento
+
+
+class PatternIR:
+    """Formulación por patrones en forma matricial (mismas convenciones que ModelIR)."""
+
+    def __init__(self, A, row_lb, row_ub, col_lb, col_ub, integrality, c, row_family,
+                 M, B, D, S_segmentos, slot_d, slot_t, T_m, T_slot,
+                 y_m, y_slot, y_b, y_s, pat_T, pat_b1, pat_b2, pat_setup):
+        self.A = A
+        self.row_lb = row_lb
+        self.row_ub = row_ub
+        self.col_lb = col_lb
+        self.col_ub = col_ub
+        self.integrality = integrality
+        self.c = c
+        self.row_family = row_family  # código de familia por fila (ver FAMILIAS_PATRON)
+        self.M = list(M)
+        self.B = list(B)
+        self.D = list(D)
+        self.S_segmentos = list(S_segmentos)
+        self.slot_d = slot_d          # índice en D de cada slot (d,t)
+        self.slot_t = slot_t          # turno t de cada slot
+        self.T_m, self.T_slot = T_m, T_slot              # (m,d,t) activos
+        self.y_m, self.y_slot, self.y_b, self.y_s = y_m, y_slot, y_b, y_s
+        self.pat_T = pat_T            # (m,d,t) activo de cada patrón
+        self.pat_b1 = pat_b1          # índice en B de la caja del segmento 1
+        self.pat_b2 = pat_b2          # índice en B del segmento 2 (SIN_CAJA: vacío)
+        self.pat_setup = pat_setup    # horas de setup del patrón
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    @property
+    def n_patterns(self):
+        return len(self.pat_T)
+
+    def y_keys(self):
+        D, M, B, S = self.D, self.M, self.B, self.S_segmentos
+        return [
+            (M[m], B[b], D[self.slot_d[k]], int(self.slot_t[k]), S[s])
+            for m, k, b, s in zip(self.y_m, self.y_slot, self.y_b, self.y_s)
+        ]
+
+    def T_keys(self):
+        return [
+            (self.M[m], self.D[self.slot_d[k]], int(self.slot_t[k]))
+            for m, k in zip(self.T_m, self.T_slot)
+        ]
+
+    def split_solution(self, values):
+        """
+        Traduce una solución [z | y] a x/y/T con las claves de `build_model`:
+        x=1 en los segmentos del patrón elegido y T = su setup.
+        """
+        values = np.asarray(values, dtype=float)
+        nP = self.n_patterns
+        z = np.round(values[:nP])
+        yk = self.y_keys()
+        x = dict.fromkeys(yk, 0.0)
+        T = dict(zip(self.T_keys(), np.zeros(len(self.T_m)).tolist()))
+        s1, s2 = self.S_segmentos
+        for p in np.flatnonzero(z > 0.5):
+            m, k = self.T_m[self.pat_T[p]], self.T_slot[self.pat_T[p]]
+            d, t = self.D[self.slot_d[k]], int(self.slot_t[k])
+            x[(self.M[m], self.B[self.pat_b1[p]], d, t, s1)] = 1.0
+            if self.pat_b2[p] != SIN_CAJA:
+                x[(self.M[m], self.B[self.pat_b2[p]], d, t, s2)] = 1.0
+            T[(self.M[m], d, t)] = float(self.pat_setup[p])
+        return {'x': x, 'y': dict(zip(yk, values[nP:].tolist())), 'T': T}
+
+
+def build_pattern_ir(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    enforce_tipo=True,
+    Tseg=None,
+    restrict_w_by_tipo=True
+):
+    """
+    Construye la formulación por patrones con los mismos argumentos que
+    `build_model`. Su óptimo coincide con el de `build_model`.
+    """
+    if len(S_segmentos) != 2:
+        raise ValueError(f"La formulación por patrones admite exactamente 2 segmentos por turno "
+                         f"(S_segmentos={list(S_segmentos)}); para otro número de segmentos usa build_ir.")
+    # --- 0) Parámetros densos, slots, dominios y R1 compartidos con build_ir ---
+    base = IRSetup(M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem, Tturn,
+                   enforce_tipo=enforce_tipo, Tseg=Tseg, restrict_w_by_tipo=restrict_w_by_tipo)
+    M, B, D = base.M, base.B, base.D
+    nM, nB, nS = len(M), len(B), len(S_segmentos)
+    disp, slot_d, slot_t, hours, seg = base.disp, base.slot_d, base.slot_t, base.hours, base.seg
+    allowed, T_m, T_slot, T_idx = base.allowed, base.T_m, base.T_slot, base.T_idx
+    nK, nT = len(slot_d), len(T_m)
+    # Costo del par = setup_cost: sólo los pares que tendrían w en build_model
+    costo = base.pair_cost
+
+    # --- 1) Columnas y y patrones ---
+    ym, yk, yb = np.nonzero(allowed)                      # orden (m,k,b), como build_ir
+    nyb = len(ym)
+    y_m = np.repeat(ym, nS)
+    y_slot = np.repeat(yk, nS)
+    y_b = np.repeat(yb, nS)
+    y_s = np.tile(np.arange(nS), nyb)
+    ny = len(y_m)
+    yb_base = np.full((nM, nK, nB), -1, dtype=np.int64)
+    yb_base[ym, yk, yb] = np.arange(nyb) * nS
+
+    pm, pk, pb1, pb2 = np.nonzero(allowed[:, :, :, None] & allowed[:, :, None, :])
+    solo = costo[ym, yb, yb] > 0                          # (b,-) no dominado por (b,b)
+    pat_m = np.concatenate([pm, ym[solo]])
+    pat_k = np.concatenate([pk, yk[solo]])
+    pat_b1 = np.concatenate([pb1, yb[solo]])
+    pat_b2 = np.concatenate([pb2, np.full(int(solo.sum()), SIN_CAJA)])
+    pat_setup = np.concatenate([costo[pm, pb1, pb2], np.zeros(int(solo.sum()))])
+    pat_T = T_idx[pat_m, pat_k]
+    nP = len(pat_T)
+
+    # --- 2) Columnas: [z | y] ---
+    off_y = nP
+    n_cols = nP + ny
+    col_lb = np.zeros(n_cols)
+    col_ub = np.full(n_cols, INF)
+    col_ub[:nP] = 1.0
+    integrality = np.zeros(n_cols, dtype=np.int8)
+    integrality[:nP] = 1
+    c = np.zeros(n_cols)
+    c[:nP] = pat_setup
+
+    filas = RowBlocks(FAMILIAS_PATRON)
+
+    # --- 3) R1: demanda por (d,b) con Dem > 0 (fila con rango) ---
+    base.add_demand_rows(filas, slot_d[y_slot], y_b, off_y + np.arange(ny), base.prod[y_m, y_b])
+
+    # --- 4) P_one: un patrón por (m,d,t) ---
+    filas.add(pat_T, np.arange(nP), np.ones(nP), np.full(nT, -INF), np.ones(nT), 'P_one')
+
+    # --- 5) P_link: y - seg_len·(z con la caja en ese segmento) <= 0 ---
+    con_b2 = np.flatnonzero(pat_b2 != SIN_CAJA)
+    fila_s1 = yb_base[pat_m, pat_k, pat_b1]
+    fila_s2 = yb_base[pat_m[con_b2], pat_k[con_b2], pat_b2[con_b2]] + 1
+    filas.add(np.concatenate([np.arange(ny), fila_s1, fila_s2]),
+              np.concatenate([off_y + np.arange(ny), np.arange(nP), con_b2]),
+              np.concatenate([np.ones(ny), -seg[pat_k, 0], -seg[pat_k[con_b2], 1]]),
+              np.full(ny, -INF), np.zeros(ny), 'P_link')
+
+    # --- 6) P_time: sum y + setup·z <= Tturn·Disp por (m,d,t) ---
+    filas.add(np.concatenate([T_idx[y_m, y_slot], pat_T]),
+              np.concatenate([off_y + np.arange(ny), np.arange(nP)]),
+              np.concatenate([np.ones(ny), pat_setup]),
+              np.full(nT, -INF), hours[T_slot] * disp[T_m, slot_d[T_slot]], 'P_time')
+
+    A, row_lb, row_ub, row_family = filas.build(n_cols)
+    return PatternIR(
+        A=A, row_lb=row_lb, row_ub=row_ub,
+        col_lb=col_lb, col_ub=col_ub, integrality=integrality, c=c,
+        row_family=row_family,
+        M=M, B=B, D=D, S_segmentos=S_segmentos, slot_d=slot_d, slot_t=slot_t,
+        T_m=T_m, T_slot=T_slot, y_m=y_m, y_slot=y_slot, y_b=y_b, y_s=y_s,
+        pat_T=pat_T, pat_b1=pat_b1, pat_b2=pat_b2, pat_setup=pat_setup,
+    )
+
+
+def to_docplex(pir, name="Optimizacion_Cajas_Patrones", checker="off"):
+    """Carga la formulación por patrones en docplex; retorna (mdl, variables)."""
+    return matrix_to_docplex(pir, name, nombres=("z", "y"), checker=checker)
+
+
+def solve_patterns(params, backend="highs", timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP,
+                   log_output=False, progress_callback=None, cancel_event=None, **build_kwargs):
+    """
+    Resuelve la formulación por patrones y devuelve un `SolveResult` con x/y/T
+    en las claves de `build_model` (mismo formato que los backends).
+    """
+    build_kwargs.pop('fast', None)
+    t0 = time.perf_counter()
+    pir = build_pattern_ir(**params, **build_kwargs)
+    build_time = time.perf_counter() - t0
+
+    if backend == "highs":
+        result = HighsBackend().solve_ir(pir, timelimit=timelimit, mipgap=mipgap,
+                                         log_output=log_output,
+                                         progress_callback=progress_callback,
+                                         cancel_event=cancel_event)
+    elif backend == "cplex":
+        result = solve_matrix_cplex(pir, timelimit, mipgap, log_output=log_output,
+                                    progress_callback=progress_callback, cancel_event=cancel_event,
+                                    name="Optimizacion_Cajas_Patrones", nombres=("z", "y"))
+    else:
+        raise ValueError(f"Backend desconocido: {backend!r}. Usa 'cplex' o 'highs'.")
+    result.build_time = build_time
+    return result
@@ -0,0 +1,227 @@
+"""
+Modelo persistente para análisis what-if de demanda.
+
+Entre corridas de una misma planta suele cambiar sólo `Dem`. La estructura del
+modelo (x/y/T/w y las familias R2–R6) depende de la demanda únicamente a
+través de su soporte (las celdas (d,b) con Dem > 0), así que mientras el
+soporte no cambie basta con actualizar el lado derecho de R1_dem / R1_dem_ub y
+volver a resolver, partiendo de la solución anterior.
+
+`get_persistent_model` mantiene un caché en memoria por (planta, huella
+estructural); `solve_what_if` es el atajo para resolver una demanda nueva.
+El caché y cada modelo tienen su propio candado, así que varias hebras (p. ej.
+los trabajos de `components/job_manager.py`) pueden usarlos a la vez: dos
+corridas de la misma planta se serializan sobre su modelo.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from scripts.model import build_model
+from scripts.solvers import (CplexBackend, HighsBackend, DEFAULT_TIMELIMIT, DEFAULT_MIPGAP,
+                             _with_fallback, greedy_result)
+
+R1_UB_TOL = 1e-6          # holgura de R1_dem_ub, igual que en build_model
+MAX_CACHED_MODELS = 4     # modelos persistentes que se mantienen en memoria
+
+
+def demand_support(D, B, Dem):
+    """Celdas (d,b) con demanda positiva, en el orden de las filas R1."""
+    return tuple((d, b) for d in D for b in B if Dem.get((d, b), 0.0) > 0)
+
+
+def _canon(value):
+    # Forma canónica (hashable y con orden estable) de los parámetros
+    if isinstance(value, dict):
+        items = [(_canon(k), _canon(v)) for k, v in value.items()]
+        return tuple(sorted(items, key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_canon(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def structural_fingerprint(params, backend="cplex", **build_kwargs):
+    """
+    Huella de todo lo que define la estructura del modelo: todos los
+    parámetros salvo los valores de `Dem` (sí su soporte), las opciones de
+    construcción y el backend.
+    """
+    h = hashlib.sha1()
+    for nombre in sorted(params):
+        if nombre == 'Dem':
+            continue
+        h.update(nombre.encode())
+        h.update(repr(_canon(params[nombre])).encode())
+    h.update(b'Dem_support')
+    h.update(repr(_canon(demand_support(params['D'], params['B'], params['Dem']))).encode())
+    opciones = {k: v for k, v in build_kwargs.items() if k not in ('fast', 'timings', 'handles')}
+    h.update(repr(_canon(opciones)).encode())
+    h.update(backend.encode())
+    return h.hexdigest()
+
+
+class PersistentModel:
+    """
+    Modelo construido una sola vez y re-resuelto con distintas demandas.
+
+    backend="cplex": modelo docplex; la demanda se cambia en el RHS de las
+        restricciones R1 y cada resolución parte de la solución anterior
+        (MIP start).
+    backend="highs": IR matricial; la demanda se cambia en las cotas de las
+        filas R1 (scipy.optimize.milp no admite MIP start).
+
+    `lock` protege el modelo: `update_demand` y `solve` lo toman, y quien
+    necesite que la demanda no cambie entre ambos debe tomarlo alrededor de
+    los dos (como hace `solve_what_if`).
+    """
+
+    def __init__(self, params, backend="cplex", **build_kwargs):
+        self.params = dict(params)
+        self.backend = backend
+        self.build_kwargs = dict(build_kwargs)
+        self.support = demand_support(params['D'], params['B'], params['Dem'])
+        self.fingerprint = structural_fingerprint(params, backend=backend, **build_kwargs)
+        self.last_result = None
+        self.n_solves = 0
+        self.lock = threading.RLock()
+
+        t0 = time.perf_counter()
+        if backend == "cplex":
+            handles = {}
+            kwargs = dict(build_kwargs)
+            kwargs.setdefault('fast', True)
+            self.mdl, self.x, self.y, self.Tsetup, _ = build_model(**params, handles=handles, **kwargs)
+            self._R1 = handles['R1_dem']
+            self._R1_ub = handles['R1_dem_ub']
+        elif backend == "highs":
+            from scripts.matrix_ir import FAMILIAS, build_ir
+
+            kwargs = {k: v for k, v in build_kwargs.items() if k != 'fast'}
+            self.ir = build_ir(**params, **kwargs)
+            # build_ir agrega las filas R1 en el mismo orden que demand_support
+            self._R1_rows = np.flatnonzero(self.ir.row_family == FAMILIAS.index('R1_dem'))
+        else:
+            raise ValueError(f"Backend sin soporte persistente: {backend!r}. Usa 'cplex' o 'highs'.")
+        self.build_time = time.perf_counter() - t0
+
+    def accepts(self, Dem):
+        """True si `Dem` tiene el mismo soporte y puede cargarse sin reconstruir."""
+        return demand_support(self.params['D'], self.params['B'], Dem) == self.support
+
+    def update_demand(self, Dem):
+        """Actualiza en sitio el lado derecho de R1_dem / R1_dem_ub."""
+        if not self.accepts(Dem):
+            raise ValueError("El soporte de la demanda cambió: hay que reconstruir el modelo.")
+
+        with self.lock:
+            if self.backend == "cplex":
+                for key in self.support:
+                    valor = float(Dem[key])
+                    self._R1[key].rhs = valor
+                    self._R1_ub[key].rhs = valor * (1 + R1_UB_TOL)
+            else:
+                valores = np.array([Dem[key] for key in self.support], dtype=float)
+                self.ir.row_lb[self._R1_rows] = valores
+                self.ir.row_ub[self._R1_rows] = valores * (1 + R1_UB_TOL)
+            self.params['Dem'] = dict(Dem)
+
+    def solve(self, timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP,
+              warm_start=True, log_output=False, threads=None, mip_start=None,
+              progress_callback=None, cancel_event=None, heuristic=True):
+        """
+        Resuelve con la demanda actual; devuelve un `SolveResult`.
+
+        Con warm_start=True (sólo cplex) parte de la solución anterior, o de
+        `mip_start` si se entrega un plan explícito; en la primera resolución
+        parte del plan greedy. Con heuristic=True el plan greedy también es el
+        respaldo si el solver termina sin incumbente.
+        """
+        with self.lock:
+            inicial = greedy_result(self.params, **self.build_kwargs) if heuristic else None
+            if self.backend == "cplex":
+                if mip_start is None and warm_start and self.last_result is not None:
+                    mip_start = self.last_result.values
+                if mip_start is None and inicial is not None and inicial.has_solution:
+                    mip_start = inicial.values
+                result = CplexBackend().solve_built(self.mdl, self.x, self.y, self.Tsetup,
+                                                    timelimit=timelimit, mipgap=mipgap,
+                                                    log_output=log_output, threads=threads,
+                                                    mip_start=mip_start if warm_start else None,
+                                                    progress_callback=progress_callback,
+                                                    cancel_event=cancel_event)
+            else:
+                result = HighsBackend().solve_ir(self.ir, timelimit=timelimit, mipgap=mipgap,
+                                                 log_output=log_output,
+                                                 progress_callback=progress_callback,
+                                                 cancel_event=cancel_event)
+
+            # El tiempo de construcción sólo se paga en la primera resolución
+            result.build_time = self.build_time if self.n_solves == 0 else 0.0
+            result = _with_fallback(result, inicial)
+            self.n_solves += 1
+            self.last_result = result
+            return result
+
+
+_CACHE = OrderedDict()   # (planta, huella) -> PersistentModel, en orden LRU
+_CACHE_LOCK = threading.Lock()
+
+
+def _cached_model(planta, params, backend, build_kwargs):
+    """Modelo en caché para estos parámetros (lo construye si no está), sin tocar su demanda."""
+    key = (planta, structural_fingerprint(params, backend=backend, **build_kwargs))
+    with _CACHE_LOCK:
+        model = _CACHE.get(key)
+        if model is not None:
+            _CACHE.move_to_end(key)
+            return model
+
+    # Se construye fuera del candado para no frenar a las otras plantas; si
+    # otra hebra guardó el mismo modelo entretanto, se usa el suyo
+    nuevo = PersistentModel(params, backend=backend, **build_kwargs)
+    with _CACHE_LOCK:
+        model = _CACHE.setdefault(key, nuevo)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > MAX_CACHED_MODELS:
+            _CACHE.popitem(last=False)
+    return model
+
+
+def get_persistent_model(planta, params, backend="cplex", **build_kwargs):
+    """
+    Devuelve el modelo persistente de la planta para estos parámetros,
+    reutilizando (con la demanda actualizada) uno en caché si la huella
+    estructural coincide.
+    """
+    model = _cached_model(planta, params, backend, build_kwargs)
+    model.update_demand(params['Dem'])
+    return model
+
+
+def clear_cache():
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def solve_what_if(planta, params, backend="cplex", timelimit=DEFAULT_TIMELIMIT,
+                  mipgap=DEFAULT_MIPGAP, warm_start=True, log_output=False,
+                  mip_start=None, progress_callback=None, cancel_event=None, heuristic=True,
+                  **build_kwargs):
+    """
+    Resuelve `params` reutilizando el modelo persistente de la planta. El
+    candado del modelo se mantiene desde que se carga la demanda hasta que
+    termina la resolución, así que otra corrida de la misma planta espera.
+    """
+    model = _cached_model(planta, params, backend, build_kwargs)
+    with model.lock:
+        model.update_demand(params['Dem'])
+        return model.solve(timelimit=timelimit, mipgap=mipgap, warm_start=warm_start,
+                           log_output=log_output, mip_start=mip_start,
+                           progress_callback=progress_callback, cancel_event=cancel_event,
+                           heuristic=heuristic)
@@ -0,0 +1,264 @@
+"""
+Formulación agregada por pools de máquinas idénticas.
+
+Las máquinas con la misma productividad, compatibilidad, matriz de setup y
+disponibilidad (ver `scripts.model.machine_pools`) forman un pool por día.
+En vez de x/y/w por máquina, cada slot (pool, d, t) elige cuántas máquinas
+corren cada patrón de turno:
+
+  - (b1, -)  : b1 en el segmento 1 y nada en el segmento 2.
+  - (b1, b2) : b1 en el segmento 1 y b2 en el segmento 2, con setup
+               Setup[(m,b1,b2)] si el par tiene w en `build_model`.
+
+Variables por (pool, slot, patrón): v entera en [0, n] (máquinas con ese
+patrón) y horas h1/h2 por segmento, sumadas sobre esas máquinas. Las filas
+son lineales homogéneas en v, así que repartir h entre las v máquinas en
+partes iguales cumple las restricciones por máquina de `build_model`: la
+formulación es exacta y el tamaño ya no crece con el número de máquinas del
+pool. `PoolIR.split_solution` hace ese reparto y devuelve x/y/T con las
+claves de `build_model`.
+
+La IR expone los mismos atributos que `ModelIR` que usa
+`HighsBackend.solve_ir`, por lo que se resuelve con él directamente.
+"""
+
+import time
+
+import numpy as np
+
+from scripts.model import machine_pools
+from scripts.matrix_ir import IRSetup, RowBlocks, concat, matrix_to_docplex, solve_matrix_cplex
+from scripts.solvers import DEFAULT_MIPGAP, DEFAULT_TIMELIMIT, HighsBackend
+
+INF = np.inf
+
+FAMILIAS_POOL = ['R1_dem', 'P_count', 'P_seg1', 'P_seg2', 'P_time']
+
+SIN_CAJA = -1     # b2 de los patrones que dejan vacío el segundo segmento
+
+
+class PoolIR:
+    """Formulación por pools en forma matricial (mismas convenciones que ModelIR)."""
+
+    def __init__(self, A, row_lb, row_ub, col_lb, col_ub, integrality, c, row_family,
+                 M, B, D, S_segmentos, pools, slots, pat_slot, pat_b1, pat_b2, pat_setup,
+                 col_v, col_h1, col_h2, domain):
+        self.A = A
+        self.row_lb = row_lb
+        self.row_ub = row_ub
+        self.col_lb = col_lb
+        self.col_ub = col_ub
+        self.integrality = integrality
+        self.c = c
+        self.row_family = row_family  # código de familia por fila (ver FAMILIAS_POOL)
+        self.M = list(M)
+        self.B = list(B)
+        self.D = list(D)
+        self.S_segmentos = list(S_segmentos)
+        self.pools = pools            # lista de listas de máquinas, una por pool-día
+        self.slots = slots            # (índice de pool, d, t) de cada slot
+        self.pat_slot = pat_slot      # slot de cada patrón
+        self.pat_b1 = pat_b1          # índice en B de la caja del segmento 1
+        self.pat_b2 = pat_b2          # índice en B del segmento 2 (SIN_CAJA: vacío)
+        self.pat_setup = pat_setup    # horas de setup por máquina
+        self.col_v = col_v            # columna v de cada patrón
+        self.col_h1 = col_h1          # columna h1 de cada patrón
+        self.col_h2 = col_h2          # columna h2 de cada patrón (-1 si no hay)
+        self.domain = domain          # {(m, d): [cajas]} de x/y en build_model
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    @property
+    def n_patterns(self):
+        return len(self.pat_slot)
+
+    def split_solution(self, values):
+        """
+        Desagrega una solución por pools en x/y/T por máquina, con las mismas
+        claves que `build_model` (los valores no usados quedan en 0).
+        """
+        values = np.asarray(values, dtype=float)
+        s1, s2 = self.S_segmentos
+        x, y, T = {}, {}, {}
+        for p, d, t in self.slots:
+            for m in self.pools[p]:
+                T[(m, d, t)] = 0.0
+                for b in self.domain[(m, d)]:
+                    for s in self.S_segmentos:
+                        x[(m, b, d, t, s)] = 0.0
+                        y[(m, b, d, t, s)] = 0.0
+
+        libres = {}   # slot -> máquinas del pool aún sin patrón
+        for j in range(self.n_patterns):
+            n = int(round(values[self.col_v[j]]))
+            if n <= 0:
+                continue
+            k = self.pat_slot[j]
+            p, d, t = self.slots[k]
+            cola = libres.setdefault(k, list(self.pools[p]))
+            b1 = self.B[self.pat_b1[j]]
+            h1 = values[self.col_h1[j]] / n
+            h2 = values[self.col_h2[j]] / n if self.col_h2[j] >= 0 else 0.0
+            for _ in range(n):
+                m = cola.pop(0)
+                x[(m, b1, d, t, s1)] = 1.0
+                y[(m, b1, d, t, s1)] = h1
+                if self.pat_b2[j] != SIN_CAJA:
+                    b2 = self.B[self.pat_b2[j]]
+                    x[(m, b2, d, t, s2)] = 1.0
+                    y[(m, b2, d, t, s2)] = h2
+                T[(m, d, t)] = float(self.pat_setup[j])
+        return {'x': x, 'y': y, 'T': T}
+
+
+def build_pool_ir(
+    M, B, D, T_turnos, S_segmentos,
+    Disp, Prod, Tipo, Setup, Dem, Tturn,
+    enforce_tipo=True,
+    Tseg=None,
+    restrict_w_by_tipo=True
+):
+    """
+    Construye la formulación por pools con los mismos argumentos que
+    `build_model`. Su óptimo coincide con el de `build_model`.
+    """
+    if len(S_segmentos) != 2:
+        raise ValueError(f"La formulación por pools admite exactamente 2 segmentos por turno "
+                         f"(S_segmentos={list(S_segmentos)}); para otro número de segmentos usa build_ir.")
+    # --- 0) Parámetros densos, slots y R1 compartidos con build_ir ---
+    base = IRSetup(M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem, Tturn,
+                   enforce_tipo=enforce_tipo, Tseg=Tseg, restrict_w_by_tipo=restrict_w_by_tipo)
+    M, B, D = base.M, base.B, base.D
+
+    # --- 1) Pools, slots y patrones ---
+    pools, slots, domain = [], [], {}
+    pat_slot, pat_b1, pat_b2, pat_setup = [], [], [], []
+    slot_cap, slot_k, slot_m0 = [], [], []
+    for k_d, d in enumerate(D):
+        for grupo in machine_pools(M, B, [d], Prod, Tipo, Setup, Disp)[d]:
+            i0 = base.m_pos[grupo[0]]
+            cj = np.flatnonzero(base.compat[i0] & (base.dem[k_d] > 0))
+            if not len(cj):
+                continue
+            for m in grupo:
+                domain[(m, d)] = [B[j] for j in cj]
+            p = len(pools)
+            pools.append(grupo)
+            costo = base.pair_cost[i0][np.ix_(cj, cj)]
+            # (b,-) está dominado por (b,b) cuando este no paga setup
+            solo = np.diag(costo) > 0
+            i1, i2 = np.nonzero(np.ones_like(costo, dtype=bool))
+            for t in T_turnos.get(d, []):
+                k = len(slots)
+                slots.append((p, d, t))
+                slot_cap.append(len(grupo))
+                slot_k.append(base.slot_index[(d, t)])
+                slot_m0.append(i0)
+
+                pat_slot.append(np.full(len(i1) + solo.sum(), k))
+                pat_b1.append(np.concatenate([cj[i1], cj[solo]]))
+                pat_b2.append(np.concatenate([cj[i2], np.full(solo.sum(), SIN_CAJA)]))
+                pat_setup.append(np.concatenate([costo[i1, i2], np.zeros(solo.sum())]))
+
+    pat_slot = concat(pat_slot, np.int64)
+    pat_b1 = concat(pat_b1, np.int64)
+    pat_b2 = concat(pat_b2, np.int64)
+    pat_setup = concat(pat_setup, float)
+    slot_k = np.array(slot_k, dtype=np.int64)
+    slot_m0 = np.array(slot_m0, dtype=np.int64)
+    slot_cap = np.array(slot_cap, dtype=float)
+    slot_dia = base.slot_d[slot_k]
+    slot_hours = base.hours[slot_k] * base.disp[slot_m0, slot_dia]
+    slot_seg = base.seg[slot_k]
+    slot_prod = base.prod[slot_m0]
+
+    # --- 2) Columnas: [v | h1 | h2] ---
+    nP, nK = len(pat_slot), len(slots)
+    con_b2 = np.flatnonzero(pat_b2 != SIN_CAJA)
+    n2 = len(con_b2)
+    col_v = np.arange(nP)
+    col_h1 = nP + np.arange(nP)
+    col_h2 = -np.ones(nP, dtype=np.int64)
+    col_h2[con_b2] = 2 * nP + np.arange(n2)
+    n_cols = 2 * nP + n2
+
+    col_lb = np.zeros(n_cols)
+    col_ub = np.full(n_cols, INF)
+    col_ub[:nP] = slot_cap[pat_slot]
+    integrality = np.zeros(n_cols, dtype=np.int8)
+    integrality[:nP] = 1
+    c = np.zeros(n_cols)
+    c[:nP] = pat_setup
+
+    filas = RowBlocks(FAMILIAS_POOL)
+
+    # --- 3) R1: demanda por (d,b) con Dem > 0 (fila con rango) ---
+    k1, k2 = pat_slot, pat_slot[con_b2]
+    b2 = pat_b2[con_b2]
+    base.add_demand_rows(filas,
+                         np.concatenate([slot_dia[k1], slot_dia[k2]]),
+                         np.concatenate([pat_b1, b2]),
+                         np.concatenate([col_h1, col_h2[con_b2]]),
+                         np.concatenate([slot_prod[k1, pat_b1], slot_prod[k2, b2]]))
+
+    # --- 4) Máquinas por slot: sum v <= n ---
+    filas.add(pat_slot, col_v, np.ones(nP), np.full(nK, -INF), slot_cap, 'P_count')
+
+    # --- 5) Largo de segmentos: h1 <= seg1·v, h2 <= seg2·v ---
+    ar = np.arange(nP)
+    filas.add(np.concatenate([ar, ar]), np.concatenate([col_h1, col_v]),
+              np.concatenate([np.ones(nP), -slot_seg[pat_slot, 0]]),
+              np.full(nP, -INF), np.zeros(nP), 'P_seg1')
+    ar2 = np.arange(n2)
+    filas.add(np.concatenate([ar2, ar2]), np.concatenate([col_h2[con_b2], con_b2]),
+              np.concatenate([np.ones(n2), -slot_seg[pat_slot[con_b2], 1]]),
+              np.full(n2, -INF), np.zeros(n2), 'P_seg2')
+
+    # --- 6) Horas del turno (R2 por máquina): h1 + h2 + (setup - Tturn·Disp)·v <= 0 ---
+    filas.add(np.concatenate([ar, ar, con_b2]),
+              np.concatenate([col_v, col_h1, col_h2[con_b2]]),
+              np.concatenate([pat_setup - slot_hours[pat_slot], np.ones(nP), np.ones(n2)]),
+              np.full(nP, -INF), np.zeros(nP), 'P_time')
+
+    A, row_lb, row_ub, row_family = filas.build(n_cols)
+    return PoolIR(
+        A=A, row_lb=row_lb, row_ub=row_ub,
+        col_lb=col_lb, col_ub=col_ub, integrality=integrality, c=c,
+        row_family=row_family,
+        M=M, B=B, D=D, S_segmentos=S_segmentos, pools=pools, slots=slots,
+        pat_slot=pat_slot, pat_b1=pat_b1, pat_b2=pat_b2, pat_setup=pat_setup,
+        col_v=col_v, col_h1=col_h1, col_h2=col_h2, domain=domain,
+    )
+
+
+def to_docplex(pir, name="Optimizacion_Cajas_Pools", checker="off"):
+    """Carga la formulación por pools en docplex; retorna (mdl, variables)."""
+    return matrix_to_docplex(pir, name, nombres=("v", "h"), checker=checker)
+
+
+def solve_pools(params, backend="highs", timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP,
+                log_output=False, progress_callback=None, cancel_event=None, **build_kwargs):
+    """
+    Resuelve la formulación por pools y devuelve un `SolveResult` con x/y/T
+    ya desagregados por máquina (mismo formato que los backends).
+    """
+    build_kwargs.pop('fast', None)
+    t0 = time.perf_counter()
+    pir = build_pool_ir(**params, **build_kwargs)
+    build_time = time.perf_counter() - t0
+
+    if backend == "highs":
+        result = HighsBackend().solve_ir(pir, timelimit=timelimit, mipgap=mipgap,
+                                         log_output=log_output,
+                                         progress_callback=progress_callback,
+                                         cancel_event=cancel_event)
+    elif backend == "cplex":
+        result = solve_matrix_cplex(pir, timelimit, mipgap, log_output=log_output,
+                                    progress_callback=progress_callback, cancel_event=cancel_event,
+                                    name="Optimizacion_Cajas_Pools", nombres=("v", "h"))
+    else:
+        raise ValueError(f"Backend desconocido: {backend!r}. Usa 'cplex' o 'highs'.")
+    result.build_time = build_time
+    return result
@@ -0,0 +1,216 @@
+"""
+Replanificación por eventos (fix-and-optimize) tras un cambio en la planta.
+
+Cuando una máquina se cae a mitad de semana (o cambia la duración de un
+turno o la demanda de un día) no hace falta resolver de nuevo todo el
+horizonte. Como el modelo se separa de forma exacta por día (ver
+`scripts/decomposition.py`), `replan` sólo reconstruye los días tocados por
+el cambio y, dentro de cada uno, parte liberando únicamente los turnos
+afectados; el resto de las x queda fija en el plan vigente:
+
+  nivel 0: turnos (m,d,t) afectados por el cambio;
+  nivel 1: además, los turnos de las máquinas compatibles con las cajas que
+           se producían en los turnos afectados (o cuya demanda cambió);
+  nivel 2: el día completo.
+
+Si un nivel no tiene solución se pasa al siguiente. Si la tiene pero el
+setup del día queda más de `holgura` horas sobre el del plan vigente, y
+queda tiempo, se prueba el nivel siguiente partiendo del mejor plan y se
+conserva el mejor. Los días ya ejecutados (antes de `desde_dia`) y los días
+sin cambios conservan el plan tal cual, así que la latencia crece con el
+tamaño de la perturbación y no con el horizonte.
+"""
+
+import time
+
+import numpy as np
+
+from scripts.decomposition import split_by_day
+from scripts.matrix_ir import build_ir, solve_fixed, w_x_columns
+from scripts.solvers import SolveResult
+
+NIVELES = ("turnos", "compatibles", "dia")
+
+DELTA_CLAVES = {'Disp': ('m', 'd'), 'Tturn': ('d', 't'), 'Dem': ('d', 'b')}
+
+
+def _day_of(parametro, clave):
+    return clave[DELTA_CLAVES[parametro].index('d')]
+
+
+def apply_delta(params, delta, desde_dia=None):
+    """
+    Aplica un cambio {'Disp': {(m,d): v}, 'Tturn': {(d,t): h}, 'Dem': {(d,b): q}}
+    a una copia de los parámetros. Las entradas de días ya ejecutados (antes
+    de `desde_dia`) no se aplican.
+
+    Retorna (params_nuevos, aplicados, ignorados) con los cambios de cada tipo.
+    """
+    desconocidos = set(delta) - set(DELTA_CLAVES)
+    if desconocidos:
+        raise ValueError(f"Cambios no soportados: {sorted(desconocidos)}. Usa {', '.join(DELTA_CLAVES)}.")
+
+    nuevos = dict(params)
+    aplicados, ignorados = {}, {}
+    for parametro, cambios in delta.items():
+        valores = dict(params[parametro])
+        for clave, valor in cambios.items():
+            d = _day_of(parametro, clave)
+            if desde_dia is not None and d < desde_dia:
+                ignorados.setdefault(parametro, {})[clave] = valor
+                continue
+            if parametro == 'Disp' and clave not in valores:
+                raise KeyError(f"Disp no tiene la clave {clave}")
+            valores[clave] = valor
+            aplicados.setdefault(parametro, {})[clave] = valor
+        nuevos[parametro] = valores
+    return nuevos, aplicados, ignorados
+
+
+def _day_changes(aplicados, d):
+    """Máquinas, turnos y cajas con cambios el día d."""
+    maquinas = {m for (m, dd) in aplicados.get('Disp', {}) if dd == d}
+    turnos = {t for (dd, t) in aplicados.get('Tturn', {}) if dd == d}
+    cajas = {b for (dd, b) in aplicados.get('Dem', {}) if dd == d}
+    return maquinas, turnos, cajas
+
+
+def _free_levels(ir, x_inc, plan_x, d, maquinas, turnos, cajas):
+    """Máscaras de x libres por nivel (ver NIVELES) para la IR de un día."""
+    m_pos = {m: i for i, m in enumerate(ir.M)}
+    b_pos = {b: j for j, b in enumerate(ir.B)}
+    x_t = ir.slot_t[ir.x_slot]
+
+    # Turnos afectados: máquinas con cambio de Disp, turnos con cambio de
+    # Tturn y turnos que producían cajas con cambio de demanda
+    afectado = np.isin(ir.x_m, [m_pos[m] for m in maquinas if m in m_pos]) | np.isin(x_t, list(turnos))
+    cajas_idx = [b_pos[b] for b in cajas if b in b_pos]
+    con_caja = (x_inc == 1) & np.isin(ir.x_b, cajas_idx)
+    codigo = ir.x_m * len(ir.slot_d) + ir.x_slot     # turno (m,k) de cada x
+    afectado |= np.isin(codigo, codigo[con_caja])
+
+    # Cajas que se producían en los turnos afectados (incluye máquinas que ya
+    # no están disponibles y no tienen columnas en la IR nueva)
+    perdidas = {b for (m, b, dd, t, s), v in plan_x.items()
+                if dd == d and v > 0.5 and (m in maquinas or t in turnos)}
+    perdidas |= {ir.B[j] for j in ir.x_b[afectado & (x_inc == 1)]}
+    perdidas |= set(cajas)
+    compatibles = np.isin(ir.x_b, [b_pos[b] for b in perdidas if b in b_pos])
+    maq_compat = np.unique(ir.x_m[compatibles])
+    nivel1 = afectado | np.isin(ir.x_m, maq_compat)
+    return [afectado, nivel1, np.ones(ir.n_x, dtype=bool)]
+
+
+def replan(params, plan, delta, desde_dia=None, timelimit=30, mipgap=0.0, holgura=0.0,
+           **build_kwargs):
+    """
+    Replanifica sólo lo que toca un cambio en Disp, Tturn o Dem.
+
+    `plan` es el plan vigente ({'x','y','T'} o un `SolveResult`), con las
+    claves de `build_model`. `desde_dia` es el primer día que aún se puede
+    cambiar: los anteriores ya se ejecutaron y se conservan. `timelimit` es
+    el tiempo por día replanificado. `holgura` (horas) es cuánto puede subir
+    el setup de un día frente al plan vigente antes de ampliar al nivel
+    siguiente; con None se amplía mientras quede tiempo.
+
+    Retorna (result, reporte): el plan completo del horizonte como
+    `SolveResult` y, por día replanificado, el nivel del mejor plan, los
+    turnos y columnas liberados frente al día completo, el setup antes y
+    después, si el día quedó óptimo y el tiempo (ver `replan_summary`). El
+    resultado es 'optimal' si todos los días replanificados se resolvieron
+    completos al óptimo (con el resto del horizonte fijo) y 'feasible' si no.
+    """
+    t0 = time.perf_counter()
+    build_kwargs.pop('fast', None)
+    valores = plan.values if isinstance(plan, SolveResult) else plan
+    nuevos, aplicados, ignorados = apply_delta(params, delta, desde_dia)
+    dias = sorted({_day_of(p, k) for p, cambios in aplicados.items() for k in cambios})
+
+    plan_nuevo = {p: {k: v for k, v in valores[p].items() if k[2 if p != 'T' else 1] not in dias}
+                  for p in ('x', 'y', 'T')}
+    por_dia = {}
+    infactibles = []
+    for d in dias:
+        t_dia = time.perf_counter()
+        sub = dict(M=nuevos['M'], B=nuevos['B'], S_segmentos=nuevos['S_segmentos'],
+                   Prod=nuevos['Prod'], Tipo=nuevos['Tipo'], Setup=nuevos['Setup'],
+                   **split_by_day(nuevos['M'], nuevos['B'], nuevos['D'], nuevos['T_turnos'],
+                                  nuevos['Disp'], nuevos['Dem'], nuevos['Tturn'], d))
+        ir = build_ir(**sub, **build_kwargs)
+        x_inc = np.array([round(valores['x'].get(k, 0.0)) for k in ir.x_keys()], dtype=np.int8)
+        w_x = w_x_columns(ir)
+        maquinas, turnos, cajas = _day_changes(aplicados, d)
+        niveles = _free_levels(ir, x_inc, valores['x'], d, maquinas, turnos, cajas)
+
+        setup_antes = sum(v for (m, dd, t), v in valores['T'].items() if dd == d)
+        codigo = ir.x_m * len(ir.slot_d) + ir.x_slot
+        mejor, nivel, libre_mejor, optimo = None, None, None, False
+        x_actual, previo = x_inc, None
+        for nombre, libre in zip(NIVELES, niveles):
+            if previo is not None and np.array_equal(libre, previo):
+                continue      # el nivel no libera nada nuevo
+            restante = timelimit - (time.perf_counter() - t_dia)
+            if restante <= 0:
+                break
+            resultado = solve_fixed(ir, x_actual, libre, restante, mipgap, w_x=w_x)
+            previo = libre
+            if resultado['objetivo'] is None:
+                continue
+            if mejor is None or resultado['objetivo'] < mejor['objetivo'] - 1e-9:
+                v = np.zeros(ir.shape[1])
+                v[:ir.n_x] = x_actual
+                v[resultado['columnas']] = resultado['valores']
+                mejor, nivel, libre_mejor = dict(resultado, vector=v), nombre, libre
+                x_actual = np.round(v[:ir.n_x]).astype(np.int8)
+            optimo = bool(libre.all() and resultado['optimo'])
+            if optimo or (holgura is not None and mejor['objetivo'] <= setup_antes + holgura + 1e-9):
+                break
+
+        por_dia[d] = {
+            'nivel': nivel,
+            'turnos_liberados': len(np.unique(codigo[libre_mejor])) if nivel else None,
+            'turnos_dia': len(ir.T_m),
+            'columnas_sub': mejor['n_columnas'] if nivel else None,
+            'columnas_dia': ir.shape[1],
+            'setup_antes': setup_antes,
+            'setup_despues': mejor['objetivo'] if nivel else None,
+            'optimo': optimo,
+            'tiempo_s': time.perf_counter() - t_dia,
+        }
+        if nivel is None:
+            infactibles.append(d)
+            continue
+        for p, vals in ir.split_solution(mejor['vector']).items():
+            plan_nuevo[p].update({k: val for k, val in vals.items() if abs(val) > 1e-9})
+
+    reporte = {
+        'dias_replanificados': dias,
+        'ignorados': ignorados,
+        'por_dia': por_dia,
+        'tiempo_s': time.perf_counter() - t0,
+    }
+    if infactibles:
+        return SolveResult('infeasible', solve_time=reporte['tiempo_s'], backend="replan",
+                           status_string=f"replan: sin plan para los días {infactibles}"), reporte
+    optimo = bool(dias) and all(r['optimo'] for r in por_dia.values())
+    return SolveResult('optimal' if optimo else 'feasible', objective=sum(plan_nuevo['T'].values(), 0.0),
+                       values=plan_nuevo,
+                       solve_time=reporte['tiempo_s'], backend="replan",
+                       status_string=f"replan: {len(dias)} días"), reporte
+
+
+def replan_summary(reporte):
+    """Resumen legible del reporte de `replan`, una línea por día."""
+    lineas = [f"[Replan] {len(reporte['dias_replanificados'])} días replanificados "
+              f"en {reporte['tiempo_s']:.2f} s"]
+    for d, r in reporte['por_dia'].items():
+        if r['nivel'] is None:
+            lineas.append(f"  día {d}: sin plan factible")
+            continue
+        lineas.append(f"  día {d}: nivel '{r['nivel']}', {r['turnos_liberados']}/{r['turnos_dia']} turnos, "
+                      f"{r['columnas_sub']}/{r['columnas_dia']} columnas, setup "
+                      f"{r['setup_antes']:.2f} → {r['setup_despues']:.2f} h"
+                      f"{' (óptimo)' if r['optimo'] else ''} ({r['tiempo_s']:.2f} s)")
+    for p, cambios in reporte['ignorados'].items():
+        lineas.append(f"  {len(cambios)} cambios de {p} en días ya ejecutados no se aplicaron")
+    return "\n".join(lineas)
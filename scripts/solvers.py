@@ -0,0 +1,500 @@
+"""
+Backends de resolución para el modelo de cajas.
+
+Todos los backends reciben el mismo diccionario de parámetros que
+`build_model` (M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem,
+Tturn) y devuelven un `SolveResult` con los valores de x/y/T indexados por las
+mismas claves tupla, más un `solution.json` con la estructura que genera
+CPLEX en Watson ML (lo que lee la página de Resultados).
+
+  - "cplex": docplex + CPLEX local (requiere el paquete `cplex`).
+  - "highs": HiGHS en proceso vía `scipy.optimize.milp` sobre la IR matricial
+    (`scripts/matrix_ir.py`); no requiere CPLEX ni Watson ML.
+"""
+
+import json
+import multiprocessing
+import time
+
+import numpy as np
+from docplex.mp.progress import ProgressListener, ProgressClock
+
+from scripts.model import (DEFAULT_CPLEX_PARAMS, DEFAULT_MIPGAP, DEFAULT_TIMELIMIT,
+                           FirstIncumbentListener, add_plan_start, apply_cplex_params,
+                           build_model)
+
+
+class SolveResult:
+    """Resultado de una resolución, independiente del backend."""
+
+    def __init__(self, status, objective=None, values=None, gap=None,
+                 solve_time=0.0, build_time=0.0, backend="",
+                 problem_name="Optimizacion_Cajas", status_string="",
+                 first_incumbent_time=None, mip_start_vars=0, alternatives=None):
+        self.status = status                # 'optimal' | 'feasible' | 'infeasible' | 'no_solution' | 'cancelled'
+        self.objective = objective
+        self.values = values                # {'x': {...}, 'y': {...}, 'T': {...}} o None
+        self.gap = gap
+        self.solve_time = solve_time
+        self.build_time = build_time
+        self.backend = backend
+        self.problem_name = problem_name
+        self.status_string = status_string or status
+        self.first_incumbent_time = first_incumbent_time   # s hasta la 1.ª solución entera
+        self.mip_start_vars = mip_start_vars               # x tomadas del MIP start
+        self.alternatives = alternatives or []             # otros planes del pool (SolveResult)
+
+    @property
+    def has_solution(self):
+        return self.values is not None
+
+    def to_solution_json(self, tol=1e-9):
+        """Estructura CPLEXSolution (variables no nulas) como la de Watson ML."""
+        variables = []
+        if self.values is not None:
+            index = 0
+            for prefix in ('x', 'y', 'T'):
+                for key, value in self.values[prefix].items():
+                    if abs(value) > tol:
+                        variables.append({
+                            'index': str(index),
+                            'name': prefix + "_" + "_".join(str(k) for k in key),
+                            'value': str(float(value)),
+                        })
+                    index += 1
+        return {
+            'CPLEXSolution': {
+                'version': '1.0',
+                'header': {
+                    'problemName': self.problem_name,
+                    'objectiveValue': str(self.objective) if self.objective is not None else None,
+                    'solutionStatusString': self.status_string,
+                    'solutionTime': round(self.solve_time, 4),
+                    'firstIncumbentTime': self.first_incumbent_time,
+                    'mipRelativeGap': self.gap,
+                    'solved_by': self.backend,
+                },
+                'variables': variables,
+            }
+        }
+
+    def write_solution_json(self, path="solution.json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_solution_json(), f, ensure_ascii=False)
+        return path
+
+
+def greedy_result(params, **build_kwargs):
+    """
+    Plan de la heurística greedy (scripts/heuristic.py) como `SolveResult`:
+    'feasible' si cubre toda la demanda, 'no_solution' si no.
+    """
+    from scripts.heuristic import greedy_plan
+
+    opciones = {k: build_kwargs[k] for k in ('enforce_tipo', 'Tseg', 'restrict_w_by_tipo')
+                if k in build_kwargs}
+    t0 = time.perf_counter()
+    plan, faltante = greedy_plan(**params, **opciones)
+    elapsed = time.perf_counter() - t0
+    if faltante:
+        return SolveResult('no_solution', solve_time=elapsed, backend="greedy",
+                           status_string=f"heurística: {len(faltante)} celdas (d,b) sin cubrir")
+    return SolveResult('feasible', objective=sum(plan['T'].values(), 0.0), values=plan,
+                       solve_time=elapsed, backend="greedy", status_string="heurística greedy",
+                       first_incumbent_time=elapsed)
+
+
+def _with_fallback(result, inicial):
+    """Si el solver terminó sin incumbente, devuelve el plan heurístico."""
+    if result.status != 'no_solution' or inicial is None or not inicial.has_solution:
+        return result
+    return SolveResult('feasible', objective=inicial.objective, values=inicial.values,
+                       solve_time=result.solve_time, build_time=result.build_time,
+                       backend=f"{result.backend}+greedy", problem_name=result.problem_name,
+                       status_string="sin incumbente del solver: plan heurístico",
+                       mip_start_vars=result.mip_start_vars)
+
+
+def _distinct_pool(principal, candidatos, pool_size, tol=0.5):
+    """
+    Hasta pool_size-1 planes de `candidatos` [(objetivo, values)], ordenados
+    por objetivo, cuyas asignaciones x difieren del principal y entre sí.
+    """
+    def firma(values):
+        return frozenset(k for k, v in values['x'].items() if v > tol)
+
+    vistos = {firma(principal)}
+    alternativas = []
+    for objetivo, values in sorted(candidatos, key=lambda c: c[0]):
+        if len(alternativas) >= pool_size - 1:
+            break
+        clave = firma(values)
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        alternativas.append((objetivo, values))
+    return alternativas
+
+
+def _status_from_docplex(sol, details):
+    texto = str(details.status) if details is not None else ""
+    if sol is None:
+        return ('infeasible' if 'infeasible' in texto.lower() else 'no_solution'), texto
+    return ('optimal' if 'optimal' in texto.lower() else 'feasible'), texto
+
+
+class SolverProgressListener(ProgressListener):
+    """
+    Reenvía el avance de CPLEX a `callback(info)` mientras resuelve.
+
+    `info` es un dict con 'tiempo', 'incumbente', 'cota', 'gap' y 'nodos'
+    (incumbente y gap en None mientras no hay solución entera). Los avisos se
+    limitan a uno cada `min_interval` segundos, salvo cuando cambia el
+    incumbente. Si `cancel_event` (threading.Event) se activa, se aborta la
+    búsqueda en el siguiente aviso de CPLEX.
+    """
+
+    def __init__(self, callback=None, min_interval=0.5, cancel_event=None):
+        super().__init__(ProgressClock.All)
+        self.callback = callback
+        self.min_interval = min_interval
+        self.cancel_event = cancel_event
+        self._last_time = None
+        self._last_obj = None
+
+    def notify_progress(self, pdata):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.abort()
+            return
+        if self.callback is None:
+            return
+        obj = pdata.current_objective if pdata.has_incumbent else None
+        if (self._last_time is not None and obj == self._last_obj
+                and pdata.time - self._last_time < self.min_interval):
+            return
+        self._last_time = pdata.time
+        self._last_obj = obj
+        self.callback({
+            'tiempo': pdata.time,
+            'incumbente': obj,
+            'cota': pdata.best_bound,
+            'gap': pdata.mip_gap if pdata.has_incumbent else None,
+            'nodos': pdata.current_nb_nodes,
+        })
+
+
+class CplexBackend:
+    """
+    docplex + CPLEX en el proceso actual.
+
+    Con heuristic=True el plan greedy es el MIP start cuando no se entrega
+    otro, y el respaldo si CPLEX termina sin incumbente. Con pool_size=K > 1
+    se resuelve con populate y `result.alternatives` trae hasta K-1 planes
+    más con asignaciones distintas, del mejor al peor.
+    """
+
+    name = "cplex"
+
+    def solve(self, params, timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP,
+              log_output=False, threads=None, mip_start=None, progress_callback=None,
+              cancel_event=None, heuristic=True, pool_size=1, pool_gap=None, cplex_params=None,
+              **build_kwargs):
+        inicial = greedy_result(params, **build_kwargs) if heuristic else None
+        if mip_start is None and inicial is not None and inicial.has_solution:
+            mip_start = inicial.values
+        t0 = time.perf_counter()
+        build_kwargs.setdefault('fast', True)
+        mdl, x, y, Tsetup, _ = build_model(**params, **build_kwargs)
+        build_time = time.perf_counter() - t0
+        result = self.solve_built(mdl, x, y, Tsetup, timelimit=timelimit, mipgap=mipgap,
+                                  log_output=log_output, threads=threads, mip_start=mip_start,
+                                  progress_callback=progress_callback, cancel_event=cancel_event,
+                                  pool_size=pool_size, pool_gap=pool_gap,
+                                  cplex_params=cplex_params)
+        result.build_time = build_time
+        return _with_fallback(result, inicial)
+
+    def solve_built(self, mdl, x, y, Tsetup, timelimit=DEFAULT_TIMELIMIT,
+                    mipgap=DEFAULT_MIPGAP, log_output=False, threads=None, mip_start=None,
+                    progress_callback=None, cancel_event=None, pool_size=1, pool_gap=None,
+                    cplex_params=None):
+        """
+        Resuelve un modelo docplex ya construido (build_model o to_docplex).
+
+        `mip_start` es un plan previo ({'x','y','T'} por clave, ver
+        scripts/model.load_plan) que se usa como punto de partida.
+        `progress_callback(info)` recibe el avance durante la resolución y
+        `cancel_event` permite abortarla (ver SolverProgressListener); una
+        resolución cancelada conserva el mejor incumbente, si lo hay.
+
+        Con pool_size=K > 1 se llama a populate en vez de solve: el pool de
+        CPLEX guarda las K mejores soluciones (mip.pool.replace=1) y, si se
+        da `pool_gap`, sólo las que están a ese gap relativo del óptimo.
+
+        `cplex_params` ({'emphasis.mip': 1, ...}) se suma a DEFAULT_CPLEX_PARAMS
+        sólo durante esta resolución.
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            return SolveResult('cancelled', backend=self.name, problem_name=mdl.name)
+        if not x:
+            # Sin binarias (p. ej. planta sin demanda tras el presolve): no hay
+            # MIP start que cargar y el plan vacío es óptimo
+            return SolveResult('optimal', objective=0.0,
+                               values={'x': {}, 'y': {}, 'T': {k: 0.0 for k in Tsetup}},
+                               gap=0.0, backend=self.name, problem_name=mdl.name,
+                               status_string="modelo vacío")
+
+        mdl.parameters.timelimit = timelimit
+        mdl.parameters.mip.tolerances.mipgap = mipgap
+        if threads:
+            mdl.parameters.threads = threads
+
+        mdl.clear_mip_starts()
+        mip_start_vars = add_plan_start(mdl, x, y, mip_start) if mip_start else 0
+
+        listener = FirstIncumbentListener()
+        listeners = [listener]
+        if progress_callback is not None or cancel_event is not None:
+            listeners.append(SolverProgressListener(progress_callback, cancel_event=cancel_event))
+        for lst in listeners:
+            mdl.add_progress_listener(lst)
+        tocados = apply_cplex_params(mdl, {**DEFAULT_CPLEX_PARAMS, **(cplex_params or {})})
+        if pool_size > 1:
+            pool = mdl.parameters.mip.pool
+            tocados += [pool.capacity, pool.replace, mdl.parameters.mip.limits.populate]
+            pool.capacity = pool_size
+            pool.replace = 1                       # reemplaza la peor del pool
+            mdl.parameters.mip.limits.populate = 4 * pool_size
+            if pool_gap is not None:
+                pool.relgap = pool_gap
+                tocados.append(pool.relgap)
+        t0 = time.perf_counter()
+        soluciones = None
+        try:
+            if pool_size > 1:
+                soluciones = mdl.populate_solution_pool(log_output=log_output)
+                sol = mdl.solution if soluciones else None
+            else:
+                sol = mdl.solve(log_output=log_output)
+        finally:
+            for lst in listeners:
+                mdl.remove_progress_listener(lst)
+            for param in tocados:
+                param.reset()
+        solve_time = time.perf_counter() - t0
+        # Si CPLEX resuelve en el presolve no se llama al listener
+        first_incumbent = listener.first_incumbent_time
+        if first_incumbent is None and sol is not None:
+            first_incumbent = solve_time
+
+        details = mdl.solve_details
+        status, texto = _status_from_docplex(sol, details)
+        gap_final = getattr(details, 'mip_relative_gap', None)
+        if soluciones and status == 'feasible' and gap_final is not None and gap_final <= mipgap + 1e-9:
+            # populate informa el motivo de término del pool ("pool tolerance",
+            # "populate limit"), no si el mejor plan alcanzó el gap pedido
+            status = 'optimal'
+        if cancel_event is not None and cancel_event.is_set():
+            status = 'cancelled'
+        if progress_callback is not None:
+            # Aviso final: el listener está limitado en frecuencia y puede no
+            # haber reportado el último estado
+            progress_callback({
+                'tiempo': solve_time,
+                'incumbente': sol.objective_value if sol is not None else None,
+                'cota': getattr(details, 'best_bound', None),
+                'gap': getattr(details, 'mip_relative_gap', None) if sol is not None else None,
+                'nodos': getattr(details, 'nb_nodes_processed', None),
+            })
+        if sol is None:
+            return SolveResult(status, solve_time=solve_time, backend=self.name,
+                               problem_name=mdl.name, status_string=texto,
+                               mip_start_vars=mip_start_vars)
+
+        def valores(s):
+            return {
+                'x': dict(zip(x.keys(), s.get_values(x.values()))),
+                'y': dict(zip(y.keys(), s.get_values(y.values()))),
+                'T': dict(zip(Tsetup.keys(), s.get_values(Tsetup.values()))),
+            }
+
+        values = valores(sol)
+        alternativas = []
+        if soluciones:
+            candidatos = [(s.objective_value, valores(s)) for s in soluciones]
+            alternativas = [
+                SolveResult('feasible', objective=obj, values=vals, solve_time=solve_time,
+                            backend=self.name, problem_name=mdl.name,
+                            status_string="alternativa del pool")
+                for obj, vals in _distinct_pool(values, candidatos, pool_size)
+            ]
+        return SolveResult(status, objective=sol.objective_value, values=values,
+                           gap=getattr(details, 'mip_relative_gap', None),
+                           solve_time=solve_time, backend=self.name,
+                           problem_name=mdl.name, status_string=texto,
+                           first_incumbent_time=first_incumbent,
+                           mip_start_vars=mip_start_vars, alternatives=alternativas)
+
+
+def _milp(c, integrality, col_lb, col_ub, A, row_lb, row_ub, options):
+    """scipy.optimize.milp sobre los arreglos de una IR."""
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    return milp(
+        c=c,
+        integrality=integrality,
+        bounds=Bounds(col_lb, col_ub),
+        constraints=LinearConstraint(A, row_lb, row_ub) if A.shape[0] else None,
+        options=options,
+    )
+
+
+def _milp_worker(conn, args):
+    """Proceso hijo de `_milp_cancelable`: resuelve y envía el resultado por `conn`."""
+    try:
+        conn.send(('ok', _milp(*args)))
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _milp_cancelable(args, cancel_event, intervalo=0.2):
+    """
+    `_milp(*args)` en un proceso aparte que se termina si `cancel_event` se
+    activa (HiGHS no tiene callbacks para abortar desde scipy). Retorna el
+    resultado de milp, o None si se canceló.
+    """
+    # spawn: se suele llamar desde un hilo de la app (JobManager)
+    ctx = multiprocessing.get_context("spawn")
+    recibir, enviar = ctx.Pipe(duplex=False)
+    proceso = ctx.Process(target=_milp_worker, args=(enviar, args), daemon=True)
+    proceso.start()
+    enviar.close()
+    try:
+        while not recibir.poll(intervalo):
+            if cancel_event.is_set():
+                proceso.terminate()
+                return None
+        try:
+            estado, valor = recibir.recv()
+        except EOFError:
+            proceso.join()
+            raise RuntimeError(f"El proceso de HiGHS terminó sin resultado "
+                               f"(código {proceso.exitcode}).") from None
+    finally:
+        proceso.join()
+        recibir.close()
+    if estado == 'error':
+        raise RuntimeError(f"HiGHS falló: {valor}")
+    return valor
+
+
+class HighsBackend:
+    """
+    HiGHS vía scipy.optimize.milp sobre la IR matricial (sin CPLEX).
+
+    Con heuristic=True el plan greedy es el respaldo si HiGHS termina sin
+    incumbente (no se puede usar como MIP start). HiGHS no tiene pool de
+    soluciones: `pool_size` se ignora y `alternatives` queda vacío; tampoco
+    usa `cplex_params`. Con `cancel_event`, HiGHS corre en un proceso aparte
+    que se termina al cancelar (ver `_milp_cancelable`).
+    """
+
+    name = "highs"
+
+    def solve(self, params, timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP,
+              log_output=False, threads=None, mip_start=None, progress_callback=None,
+              cancel_event=None, heuristic=True, pool_size=1, pool_gap=None, cplex_params=None,
+              **build_kwargs):
+        # scipy.optimize.milp no expone el número de hilos de HiGHS, ni admite
+        # MIP start ni callbacks: `threads` y `mip_start` se ignoran y
+        # `progress_callback` recibe un único aviso al terminar; para poder
+        # cancelar, `solve_ir` resuelve en un proceso que se puede terminar
+        from scripts.matrix_ir import build_ir
+
+        build_kwargs.pop('fast', None)
+        inicial = greedy_result(params, **build_kwargs) if heuristic else None
+        t0 = time.perf_counter()
+        ir = build_ir(**params, **build_kwargs)
+        build_time = time.perf_counter() - t0
+        result = self.solve_ir(ir, timelimit=timelimit, mipgap=mipgap, log_output=log_output,
+                               progress_callback=progress_callback, cancel_event=cancel_event)
+        result.build_time = build_time
+        return _with_fallback(result, inicial)
+
+    def solve_ir(self, ir, timelimit=DEFAULT_TIMELIMIT, mipgap=DEFAULT_MIPGAP, log_output=False,
+                 progress_callback=None, cancel_event=None):
+        if cancel_event is not None and cancel_event.is_set():
+            return SolveResult('cancelled', backend=self.name)
+        if ir.shape[1] == 0:
+            # Sin variables (p. ej. planta sin demanda): el plan vacío es óptimo
+            return SolveResult('optimal', objective=0.0, values=ir.split_solution(np.zeros(0)),
+                               gap=0.0, backend=self.name, status_string="modelo vacío")
+
+        t0 = time.perf_counter()
+        args = (ir.c, ir.integrality, ir.col_lb, ir.col_ub, ir.A, ir.row_lb, ir.row_ub,
+                {'time_limit': float(timelimit), 'mip_rel_gap': float(mipgap),
+                 'disp': bool(log_output)})
+        if cancel_event is None:
+            res = _milp(*args)
+        else:
+            res = _milp_cancelable(args, cancel_event)
+        solve_time = time.perf_counter() - t0
+        if res is None:
+            return SolveResult('cancelled', solve_time=solve_time, backend=self.name,
+                               status_string="cancelado durante la resolución")
+        if progress_callback is not None:
+            progress_callback({
+                'tiempo': solve_time,
+                'incumbente': float(res.fun) if res.x is not None else None,
+                'cota': getattr(res, 'mip_dual_bound', None),
+                'gap': getattr(res, 'mip_gap', None),
+                'nodos': getattr(res, 'mip_node_count', None),
+            })
+
+        # scipy: 0 óptimo, 1 límite (tiempo/iteraciones), 2 infactible, 3 no acotado, 4 otro
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        if res.x is None:
+            status = 'infeasible' if res.status == 2 else 'no_solution'
+            return SolveResult('cancelled' if cancelled else status, solve_time=solve_time,
+                               backend=self.name, status_string=res.message)
+
+        values = ir.split_solution(np.where(ir.integrality == 1, np.round(res.x), res.x))
+        if cancelled:
+            status = 'cancelled'
+        else:
+            status = 'optimal' if res.status == 0 else 'feasible'
+        return SolveResult(status,
+                           objective=float(res.fun), values=values,
+                           gap=getattr(res, 'mip_gap', None), solve_time=solve_time,
+                           backend=self.name, status_string=res.message)
+
+
+BACKENDS = {
+    CplexBackend.name: CplexBackend,
+    HighsBackend.name: HighsBackend,
+}
+
+
+def get_backend(name="highs"):
+    """Instancia un backend por nombre ('cplex' o 'highs')."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Backend desconocido: {name!r}. Usa uno de {sorted(BACKENDS)}.")
+
+
+def cplex_available():
+    """True si docplex encuentra un motor CPLEX para resolver en este proceso."""
+    from docplex.mp.environment import Environment
+
+    return Environment().has_cplex
+
+
+def default_backend():
+    """
+    Backend local por defecto: 'cplex' si está disponible (reporta avance,
+    admite MIP start y se cancela durante la búsqueda) y si no 'highs'.
+    """
+    return CplexBackend.name if cplex_available() else HighsBackend.name
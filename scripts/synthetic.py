@@ -0,0 +1,215 @@
+"""
+Instancias sintéticas para benchmarks del modelo de cajas.
+
+`synthetic_params` fabrica directamente los diccionarios que consume
+`build_model` (mismas claves que entregan los métodos de `Processing`), con
+tamaño arbitrario de máquinas, tipos de caja, días y turnos.
+`synthetic_tables` lleva la misma instancia al formato de los archivos de
+entrada (hojas de Parametros.xlsx y demanda de Libro7.xlsx), para probar
+también Processing y la app completa a escala.
+
+Uso:
+    python -m scripts.synthetic 50 40 30 outputs/sintetico
+"""
+
+import numpy as np
+
+
+def synthetic_params(n_maquinas=6, n_cajas=6, n_dias=3, n_turnos=2,
+                     densidad_compat=0.6, disponibilidad=0.9,
+                     prod_range=(1000.0, 2500.0), setup_range=(0.25, 2.0),
+                     horas_turno=8.0, carga=0.6, sparsity=0.3,
+                     n_clases=None, seed=None):
+    """
+    Genera un juego de parámetros consistente para `build_model`.
+
+    Parámetros
+    ----------
+    n_maquinas, n_cajas, n_dias, n_turnos : tamaño de M, B, D y turnos por día.
+    densidad_compat : probabilidad de que un par (m,b) sea compatible.
+    disponibilidad : probabilidad de que una máquina esté disponible un día.
+    prod_range : rango (cajas/h) de productividad de los pares compatibles.
+    setup_range : rango (h) de setup entre tipos distintos.
+    horas_turno : duración de cada turno.
+    carga : fracción de la capacidad diaria (horas-máquina) que se pide como
+        demanda, repartida entre las cajas con demanda ese día.
+    sparsity : fracción esperada de celdas (d,b) sin demanda.
+    n_clases : si se entrega, las máquinas copian la compatibilidad,
+        productividad y setup de `n_clases` perfiles (máquina i -> perfil
+        i % n_clases), para generar plantas con máquinas intercambiables.
+    seed : semilla RNG reproducible.
+
+    Retorna
+    -------
+    dict con M, B, D, T_turnos, S_segmentos, Disp, Prod, Tipo, Setup, Dem, Tturn.
+    """
+    rng = np.random.default_rng(seed)
+
+    M = [f"M{i + 1}" for i in range(n_maquinas)]
+    B = [f"CAJA {j + 1}" for j in range(n_cajas)]
+    D = list(range(1, n_dias + 1))
+    T_turnos = {d: list(range(1, n_turnos + 1)) for d in D}
+    Tturn = {(d, t): float(horas_turno) for d in D for t in T_turnos[d]}
+
+    n_perfiles = n_clases or n_maquinas
+    perfil = np.arange(n_maquinas) % n_perfiles
+
+    # --- Compatibilidad / productividad (cada caja con al menos una máquina) ---
+    compat = rng.random((n_perfiles, n_cajas)) < densidad_compat
+    for j in range(n_cajas):
+        if not compat[:, j].any():
+            compat[rng.integers(n_perfiles), j] = True
+    prod = np.where(compat, rng.uniform(*prod_range, size=compat.shape).round(-1), 0.0)
+    compat, prod = compat[perfil], prod[perfil]
+
+    Prod = {(m, b): float(prod[i, j]) for i, m in enumerate(M) for j, b in enumerate(B)}
+    Tipo = {(m, b): int(compat[i, j]) for i, m in enumerate(M) for j, b in enumerate(B)}
+
+    # --- Setup: matriz por máquina, 0 en la diagonal ---
+    mats = []
+    for _ in range(n_perfiles):
+        mat = rng.uniform(*setup_range, size=(n_cajas, n_cajas)).round(2)
+        np.fill_diagonal(mat, 0.0)
+        mats.append(mat)
+    Setup = {}
+    for i, m in enumerate(M):
+        mat = mats[perfil[i]]
+        for j1, b1 in enumerate(B):
+            for j2, b2 in enumerate(B):
+                Setup[(m, b1, b2)] = float(mat[j1, j2])
+
+    # --- Disponibilidad ---
+    disp = (rng.random((n_maquinas, n_dias)) < disponibilidad).astype(int)
+    Disp = {(m, d): int(disp[i, k]) for i, m in enumerate(M) for k, d in enumerate(D)}
+
+    # --- Demanda: una fracción `carga` de la capacidad diaria, en cajas ---
+    Dem = {}
+    for k, d in enumerate(D):
+        horas_dia = disp[:, k].sum() * n_turnos * horas_turno * carga
+        activas = rng.random(n_cajas) >= sparsity
+        if not activas.any():
+            activas[rng.integers(n_cajas)] = True
+        pesos = rng.dirichlet(np.ones(n_cajas)) * activas
+        pesos = pesos / pesos.sum()
+        for j, b in enumerate(B):
+            # productividad media de las máquinas compatibles disponibles
+            ok = compat[:, j] & (disp[:, k] == 1)
+            p_media = prod[ok, j].mean() if ok.any() else 0.0
+            Dem[(d, b)] = float(np.rint(horas_dia * pesos[j] * p_media))
+
+    return {
+        'M': M, 'B': B, 'D': D,
+        'T_turnos': T_turnos, 'S_segmentos': [1, 2],
+        'Disp': Disp, 'Prod': Prod, 'Tipo': Tipo,
+        'Setup': Setup, 'Dem': Dem, 'Tturn': Tturn,
+    }
+
+
+def params_to_tables(params, planta="SINTETICA", fecha_inicio="2025-01-06", seed=None):
+    """
+    Convierte un juego de parámetros (p. ej. de `synthetic_params`) en las
+    tablas de entrada, con el mismo formato que devuelve run_model.read_inputs:
+    {hoja: DataFrame} de Parametros.xlsx (como texto, incluida "Planta") y el
+    DataFrame de demanda de Libro7.xlsx.
+
+    La productividad lista sólo los pares compatibles y el setup los cambios
+    entre cajas compatibles de cada máquina (Processing completa el resto con
+    0). La demanda de cada celda (d,b) se reparte en 1 a 3 pedidos, como en el
+    archivo real; el día d es la fecha `fecha_inicio` + d - 1.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    M, B, D = params['M'], params['B'], params['D']
+    compatibles = {m: [b for b in B if params['Tipo'].get((m, b), 0) == 1] for m in M}
+
+    tablas = {
+        "Planta": pd.DataFrame({'PLANTA': [planta]}),
+        "Turnos": pd.DataFrame(
+            [(planta, d, len(params['T_turnos'][d])) for d in D],
+            columns=['PLANTA', 'DIA', 'CANTIDAD DE TURNOS']),
+        "Disponibilidad Maquinas": pd.DataFrame(
+            [(planta, d, m, params['Disp'][(m, d)]) for d in D for m in M],
+            columns=['PLANTA', 'DIA', 'MAQUINA', 'DISPONIBILIDAD']),
+        "Productividad Máquina_Caja": pd.DataFrame(
+            [(planta, m, b, params['Prod'][(m, b)]) for m in M for b in compatibles[m]],
+            columns=['PLANTA', 'MAQUINA', 'TIPO_CAJA', 'PRODUCTIVIDAD_CAJAS_HORA']),
+        "Tiempo de Setup por máquina": pd.DataFrame(
+            [(planta, m, b1, b2, params['Setup'][(m, b1, b2)])
+             for m in M for b1 in compatibles[m] for b2 in compatibles[m] if b1 != b2],
+            columns=['PLANTA', 'MAQUINA', 'TIPO_CAJA_ACTUAL', 'TIPO_CAJA_A_CAMBIAR', 'HORA_SETUP']),
+        "Duracion Turno": pd.DataFrame(
+            [(planta, d, t, params['Tturn'][(d, t)]) for d in D for t in params['T_turnos'][d]],
+            columns=['PLANTA', 'DIA', 'TURNO', 'HORAS']),
+    }
+    # read_inputs lee las hojas como texto
+    tablas = {hoja: df.astype(str) for hoja, df in tablas.items()}
+
+    fechas = {d: pd.Timestamp(fecha_inicio) + pd.Timedelta(days=k) for k, d in enumerate(D)}
+    pedidos = []
+    for (d, b), cajas in params['Dem'].items():
+        cajas = int(round(cajas))
+        if cajas <= 0:
+            continue
+        n = int(rng.integers(1, 4))
+        cortes = np.sort(rng.choice(np.arange(1, cajas), size=min(n - 1, cajas - 1), replace=False)) \
+            if cajas > 1 else np.zeros(0, dtype=int)
+        for parte in np.diff(np.concatenate(([0], cortes, [cajas]))):
+            pedidos.append((planta, b, fechas[d], int(parte), int(parte)))
+    demanda = pd.DataFrame(pedidos, columns=['DES_PLANTA', 'cod_envase', 'fecha_planificación',
+                                             'cant_cajas', 'cajas_asignadas'])
+    return tablas, demanda
+
+
+def synthetic_tables(n_maquinas=50, n_cajas=40, n_dias=30, planta="SINTETICA",
+                     fecha_inicio="2025-01-06", seed=None, **kwargs):
+    """
+    Instancia sintética completa en formato de archivos de entrada: arma los
+    parámetros con `synthetic_params` (mismos `kwargs`) y los pasa a tablas
+    con `params_to_tables`. Retorna (tablas, demanda, params); `params` es la
+    instancia de referencia que Processing debe reconstruir.
+    """
+    params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                              seed=seed, **kwargs)
+    tablas, demanda = params_to_tables(params, planta=planta, fecha_inicio=fecha_inicio, seed=seed)
+    return tablas, demanda, params
+
+
+def write_tables(tablas, demanda, out_dir, formato="xlsx"):
+    """
+    Escribe las tablas en `out_dir` con el layout de la app: Parametros.xlsx y
+    Libro7.xlsx (formato="xlsx", lo que lee run_model.read_inputs) o los CSV
+    de inputs/csv más demanda.csv (formato="csv").
+    """
+    import pandas as pd
+    from pathlib import Path
+    from run_model import SHEETS
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if formato == "xlsx":
+        with pd.ExcelWriter(out_dir / "Parametros.xlsx") as writer:
+            for hoja, df in tablas.items():
+                df.to_excel(writer, sheet_name=hoja, index=False)
+        demanda.to_excel(out_dir / "Libro7.xlsx", index=False)
+    elif formato == "csv":
+        for hoja, csv_name in SHEETS.items():
+            tablas[hoja].to_csv(out_dir / csv_name, index=False, encoding="utf-8-sig")
+        demanda.to_csv(out_dir / "demanda.csv", index=False)
+    else:
+        raise ValueError("formato debe ser 'xlsx' o 'csv'.")
+    return out_dir
+
+
+if __name__ == "__main__":
+    # python -m scripts.synthetic [máquinas cajas días [carpeta]]
+    import sys
+
+    args = sys.argv[1:]
+    n_maquinas, n_cajas, n_dias = (int(a) for a in args[:3]) if len(args) >= 3 else (50, 40, 30)
+    out_dir = args[3] if len(args) > 3 else "outputs/sintetico"
+    tablas, demanda, _ = synthetic_tables(n_maquinas, n_cajas, n_dias, seed=0)
+    write_tables(tablas, demanda, out_dir)
+    print(f"[Sintético] {n_maquinas} máquinas × {n_cajas} cajas × {n_dias} días: "
+          + ", ".join(f"{hoja} {len(df)}" for hoja, df in tablas.items())
+          + f", demanda {len(demanda)} filas -> {out_dir}")
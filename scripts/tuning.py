@@ -0,0 +1,195 @@
+"""
+Ajuste de parámetros de CPLEX sobre familias de instancias sintéticas.
+
+Cada instancia toma la planta de `synthetic_params` y perturba su demanda con
+`fake_demanda` (la misma de Processing.generate_fake_demanda) en sus distintos
+modos y esparsidad. Cada combinación de parámetros de la grilla resuelve todas
+las instancias, en procesos paralelos, y se ordena por instancias resueltas
+(óptimo probado) y tiempo hasta el óptimo. La mejor fila trae los `ajustes` listos para
+copiar en DEFAULT_CPLEX_PARAMS (scripts/model.py).
+
+Uso:
+    python -m scripts.tuning [ranking.csv]
+"""
+
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+
+from scripts.model import fake_demanda
+from scripts.synthetic import synthetic_params
+
+# Perillas de la grilla -> parámetros de CPLEX (ver CUTS para 'cuts')
+GRILLA = {
+    'emphasis': [0, 1, 2],            # emphasis.mip: balance, factibilidad, optimalidad
+    'threads': [1, 2],
+    'cuts': ['auto', 'off', 'aggressive'],
+    'heuristicfreq': [0, -1, 10],     # mip.strategy.heuristicfreq: auto, nunca, cada 10 nodos
+}
+
+CUT_PARAMS = ['cliques', 'covers', 'disjunctive', 'flowcovers', 'gomory', 'gubcovers',
+              'implied', 'liftproj', 'localimplied', 'mcfcut', 'mircut', 'pathcut',
+              'zerohalfcut']
+CUTS = {'auto': None, 'off': -1, 'aggressive': 2}
+
+# Familias de instancias: tamaños (máquinas, cajas, días) × modo × esparsidad.
+# La edición community de CPLEX admite hasta 1000 variables y filas.
+TAMANOS = ((3, 6, 2), (4, 8, 2))
+MODOS = ('uniform', 'normal', 'poisson', 'dirichlet')
+ESPARSIDAD = (0.0, 0.3)
+
+
+def tuning_instance(n_maquinas, n_cajas, n_dias, mode="uniform", sparsity=0.0,
+                    carga=0.5, seed=0):
+    """
+    Planta sintética con demanda perturbada por `fake_demanda`.
+
+    La demanda de referencia de `synthetic_params` (una fracción `carga` de la
+    capacidad, acorde a las máquinas compatibles con cada caja) se multiplica
+    por un factor de media 1 generado con el modo pedido, y `sparsity` apaga
+    celdas. Así las familias se comparan a igual carga media.
+    """
+    params = synthetic_params(n_maquinas=n_maquinas, n_cajas=n_cajas, n_dias=n_dias,
+                              carga=carga, sparsity=0.0, seed=seed)
+    D, B = params['D'], params['B']
+    base = 100.0
+    factor, _ = fake_demanda(D, B, mode=mode, low=0.5 * base, high=1.5 * base,
+                             per_day_totals=base * len(B), sparsity=sparsity,
+                             integer=False, seed=seed)
+    params['Dem'] = {k: float(np.rint(params['Dem'][k] * f / base)) for k, f in factor.items()}
+    return params
+
+
+def instance_specs(tamanos=TAMANOS, modos=MODOS, esparsidad=ESPARSIDAD, seed=0):
+    """Especificaciones (kwargs de tuning_instance) de todas las familias."""
+    return [
+        {'n_maquinas': m, 'n_cajas': b, 'n_dias': d, 'mode': modo, 'sparsity': sp, 'seed': seed}
+        for (m, b, d), modo, sp in itertools.product(tamanos, modos, esparsidad)
+    ]
+
+
+def spec_name(spec):
+    return (f"{spec['n_maquinas']}x{spec['n_cajas']}x{spec['n_dias']}"
+            f"-{spec['mode']}-sp{spec['sparsity']:g}")
+
+
+def configurations(grilla=None):
+    """Todas las combinaciones de la grilla, como dicts {perilla: valor}."""
+    grilla = GRILLA if grilla is None else grilla
+    nombres = list(grilla)
+    return [dict(zip(nombres, valores)) for valores in itertools.product(*grilla.values())]
+
+
+def config_params(config):
+    """Traduce una combinación de la grilla a parámetros de CPLEX con puntos."""
+    ajustes = {}
+    if 'emphasis' in config:
+        ajustes['emphasis.mip'] = config['emphasis']
+    if 'threads' in config:
+        ajustes['threads'] = config['threads']
+    if 'heuristicfreq' in config:
+        ajustes['mip.strategy.heuristicfreq'] = config['heuristicfreq']
+    if CUTS.get(config.get('cuts')) is not None:
+        for nombre in CUT_PARAMS:
+            ajustes[f'mip.cuts.{nombre}'] = CUTS[config['cuts']]
+    return ajustes
+
+
+def _run_case(args):
+    """Worker: resuelve una instancia con una configuración."""
+    config, spec, timelimit, mipgap = args
+    from scripts.solvers import CplexBackend
+
+    params = tuning_instance(**spec)
+    result = CplexBackend().solve(params, timelimit=timelimit, mipgap=mipgap,
+                                  cplex_params=config_params(config))
+    return {
+        **config,
+        'instancia': spec_name(spec),
+        'estado': result.status,
+        'objetivo': result.objective,
+        'gap': result.gap,
+        'tiempo_s': round(result.solve_time, 3),
+    }
+
+
+def rank(detalle, timelimit, shift=1.0):
+    """
+    Ranking por configuración: instancias resueltas (óptimo o infactibilidad
+    probados; más es mejor) y media geométrica desplazada del tiempo hasta
+    resolver, contando `timelimit` para las no resueltas (menos es mejor).
+    """
+    if detalle.empty:
+        return pd.DataFrame()
+    perillas = [c for c in detalle.columns
+                if c not in ('instancia', 'estado', 'objetivo', 'gap', 'tiempo_s')]
+    resuelta = detalle['estado'].isin(['optimal', 'infeasible'])
+    detalle = detalle.assign(
+        resuelta=resuelta,
+        t_resolver=np.where(resuelta, detalle['tiempo_s'], timelimit),
+    )
+    ranking = detalle.groupby(perillas, dropna=False).agg(
+        resueltas=('resuelta', 'sum'),
+        instancias=('instancia', 'count'),
+        t_geom_s=('t_resolver', lambda t: float(np.exp(np.log(t + shift).mean()) - shift)),
+        t_total_s=('t_resolver', 'sum'),
+        gap_max=('gap', 'max'),
+    ).reset_index()
+    ranking['t_geom_s'] = ranking['t_geom_s'].round(3)
+    ranking['t_total_s'] = ranking['t_total_s'].round(2)
+    ranking['ajustes'] = [config_params(dict(zip(perillas, fila)))
+                          for fila in ranking[perillas].itertuples(index=False)]
+    return ranking.sort_values(['resueltas', 't_geom_s'], ascending=[False, True],
+                               ignore_index=True)
+
+
+def tune(grilla=None, specs=None, timelimit=30, mipgap=0.0, max_workers=None,
+         progress_callback=None):
+    """
+    Barre la grilla sobre las instancias en procesos paralelos.
+
+    Con mipgap=0.0 "resuelta" significa óptimo probado. Las instancias que
+    fallan el chequeo de capacidad (scripts/feasibility.py) se descartan antes
+    de resolver. Por defecto se usan tantos procesos como núcleos, divididos
+    por el máximo de `threads` de la grilla para no sobresuscribir la CPU.
+    `progress_callback` recibe {'casos_listos', 'casos'}.
+
+    Retorna (ranking, detalle) como DataFrames.
+    """
+    import multiprocessing
+    import os
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from scripts.feasibility import capacity_check
+
+    configs = configurations(grilla)
+    specs = instance_specs() if specs is None else specs
+    specs = [s for s in specs if capacity_check(**tuning_instance(**s))['factible']]
+    casos = [(c, s, timelimit, mipgap) for c in configs for s in specs]
+
+    if max_workers is None:
+        hilos = max([c.get('threads') or 1 for c in configs], default=1)
+        max_workers = max((os.cpu_count() or 1) // hilos, 1)
+
+    filas = []
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_run_case, caso) for caso in casos]
+        for future in as_completed(futures):
+            filas.append(future.result())
+            if progress_callback is not None:
+                progress_callback({'casos_listos': len(filas), 'casos': len(casos)})
+
+    detalle = pd.DataFrame(filas)
+    return rank(detalle, timelimit), detalle
+
+
+if __name__ == "__main__":
+    ranking, detalle = tune(progress_callback=lambda info: print(
+        f"\r[Tuning] {info['casos_listos']}/{info['casos']} casos", end="", flush=True))
+    print()
+    print(ranking.to_string(index=False))
+    if len(sys.argv) > 1:
+        ranking.to_csv(sys.argv[1], index=False)
+        print("Ranking en:", sys.argv[1])